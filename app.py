@@ -1,15 +1,32 @@
-from flask import Flask, request, render_template, jsonify, url_for, send_from_directory, session
-from PIL import Image
-import io
-import base64
+from flask import Flask, request, render_template, jsonify, url_for, send_from_directory, session, Response, stream_with_context
+from werkzeug.exceptions import RequestEntityTooLarge
 import logging
 import os
 import subprocess
 import time
-import urllib.request
-import ollama
+import urllib.parse
+import httpx
+import numpy as np
+import image_pipeline
 import secrets
 import threading
+import hashlib
+import gzip
+import itertools
+import json
+import queue
+import re
+import socket
+import sqlite3
+import tempfile
+import types
+import zipfile
+import asyncio
+import click
+import contextlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -20,62 +37,722 @@ app.secret_key = secrets.token_hex(32)
 
 OLLAMA_MODEL = 'qwen2.5vl:7b'
 
-# Server-side storage for dynamically generated pests (replaces broken session approach)
-_dynamic_pests = {}      # pest_key -> pest_data dict
-_generation_jobs = {}    # pest_key -> 'pending' | 'complete' | 'error'
-_pending_metadata = {}   # pest_key -> {'name': str, 'scientific_name': str}
-
-
-def _ensure_ollama_running():
-    """Start Ollama if it isn't already running."""
+# Classification cascade — a small vision model answers first; the full model
+# only sees images it isn't sure about. Set CASCADE_FAST_MODEL = None to disable.
+CASCADE_FAST_MODEL = 'qwen2.5vl:3b'
+CASCADE_MIN_CONFIDENCE = 0.80   # fast-tier CONFIDENCE needed to skip the full model
+
+# Ollama backends — comma-separated base URLs, e.g.
+# OLLAMA_HOSTS=http://gpu1:11434,http://gpu2:11434
+OLLAMA_HOSTS = [h.strip() for h in os.environ.get('OLLAMA_HOSTS', 'http://localhost:11434').split(',') if h.strip()]
+OLLAMA_SLOTS_PER_HOST = 1     # OLLAMA_NUM_PARALLEL on each backend
+OLLAMA_HEALTH_INTERVAL = 10   # seconds between backend health checks
+OLLAMA_HEALTH_TIMEOUT = 2     # seconds before a health check counts as failed
+OLLAMA_EJECT_AFTER = 3        # consecutive server errors before a backend is ejected
+OLLAMA_READMIT_AFTER = 2      # consecutive passing health checks to readmit it
+OLLAMA_AFFINITY_SIZE = 256    # recent image conversations pinned to the backend that served them
+
+# Model residency — every Ollama call (and the warm-up) runs with MODEL_OPTIONS.
+# Options that shape how a model is loaded, like num_ctx, must never differ
+# between calls, or Ollama reloads the model. keep_alive follows traffic.
+MODEL_OPTIONS = {'num_ctx': 2048}
+KEEP_ALIVE_PINNED = -1            # busy: never unload
+KEEP_ALIVE_DEFAULT = '30m'
+KEEP_ALIVE_IDLE = '5m'            # sent by maintain() once traffic has stopped
+RESIDENCY_WINDOW = 15 * 60        # seconds of recent calls the keep_alive choice looks at
+RESIDENCY_BUSY_CALLS = 20         # calls in the window that pin the models
+RESIDENCY_RELEASE_AFTER = 30 * 60  # idle seconds before pinned models are released
+RESIDENCY_CHECK_INTERVAL = 60     # seconds between release checks
+RESIDENCY_LOAD_SECONDS = 0.5      # load_duration above this counts as a model load
+RESIDENCY_MAX_EVENTS = 50         # recent load/unload events kept for /stats
+
+# Persistent storage for dynamically generated pests (survives restarts)
+PROFILE_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pesthub.db')
+PROFILE_CACHE_SIZE = 256   # hot profiles kept in memory
+
+# Rendered pest pages (curated + completed profiles), served with ETags
+RENDER_CACHE_SIZE = 512    # pages kept, each with its gzip variant
+RENDER_GZIP_LEVEL = 6
+
+# Long-poll /pest_status — pending pages block until their profile settles
+STATUS_WAIT_TIMEOUT = 25   # max seconds a single request is held open
+STATUS_MAX_WAITERS = 200   # concurrent held requests before falling back to polling
+STATUS_RETRY_AFTER = 3     # seconds clients wait between plain polls
+
+# Classification cache — repeat / near-duplicate uploads skip the vision call
+CLASSIFICATION_CACHE_SIZE = 512          # max cached results
+CLASSIFICATION_CACHE_TTL = 6 * 60 * 60   # seconds before an entry expires
+PHASH_MAX_DISTANCE = 4                   # max differing bits for a near-duplicate
+
+# Inference scheduler — one worker per Ollama slot across all backends
+INFERENCE_WORKERS = len(OLLAMA_HOSTS) * OLLAMA_SLOTS_PER_HOST
+INFERENCE_QUEUE_LIMIT = 32
+PRIORITY_INTERACTIVE = 0   # /predict classification
+PRIORITY_TEXT = 1          # search + text-only profile generation
+PRIORITY_BATCH = 2         # /predict_batch classification
+PRIORITY_BACKGROUND = 3    # image profile generation for new creatures
+PRIORITY_PREWARM = 4       # watchlist prewarm, only while the server is idle
+
+# Watchlist prewarm — profiles for likely non-catalog creatures generated ahead of time
+WATCHLIST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'watchlist.txt')
+PREWARM_IDLE_SECONDS = 60  # quiet period before the background job generates the next entry
+
+# Image preprocessing runs in a process pool, off the request threads and the GIL
+PREPROCESS_WORKERS = min(4, os.cpu_count() or 1)
+
+# Pre-filter — frames that can't show a creature are answered without the model.
+# Measured on the 336px grayscale thumbnail (0-255).
+PREFILTER_MIN_STDDEV = 6.0      # below this the frame is blank / near-uniform
+PREFILTER_MAX_DARK = 30.0       # 99th-percentile brightness below this is a black frame
+PREFILTER_MIN_BRIGHT = 235.0    # 1st-percentile brightness above this is washed out
+PREFILTER_MIN_SHARPNESS = 4.0   # Laplacian variance of the sharpest grid cell
+PREFILTER_CONFIDENCE = 0.95     # confidence reported for a rejected frame
+
+# Batch classification (/predict_batch)
+BATCH_MAX_IMAGES = 100
+BATCH_MAX_IMAGE_BYTES = 20 * 1024 * 1024
+BATCH_WINDOW = 4           # images decoded / queued for the model at once
+BATCH_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
+MAX_REQUEST_BYTES = 256 * 1024 * 1024   # any request body; larger ones get 413
+
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+
+# Owner recorded on pending jobs: host, pid and start time of this process
+_PROCESS_OWNER = f'{socket.gethostname()}:{os.getpid()}:{time.time():.0f}'
+
+
+def _owner_alive(owner):
+    """False when the process that recorded owner has certainly exited."""
+    host, pid, _ = owner.rsplit(':', 2)
+    if owner == _PROCESS_OWNER or host != socket.gethostname():
+        return True   # ours, or on a host whose processes we can't see
+    if int(pid) == os.getpid():
+        return False  # an earlier process that had our pid
     try:
-        urllib.request.urlopen('http://localhost:11434/', timeout=2)
-        logger.info("Ollama already running")
-        return
-    except Exception:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
         pass
-
-    logger.info("Starting Ollama...")
-    subprocess.Popen(
-        ['ollama', 'serve'],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL,
-        env={**os.environ, 'OLLAMA_FLASH_ATTENTION': '1', 'OLLAMA_NUM_PARALLEL': '1'},
-    )
-    for _ in range(20):
-        time.sleep(0.5)
+    return True
+
+
+class _LazyDb:
+    """SQLite connection opened on first use, so importing app creates no
+    database file. setup(connection) creates the schema once it is open."""
+
+    def __init__(self, path, setup):
+        self.path = path
+        self._setup = setup
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            with self._lock:
+                if self._connection is None:
+                    connection = sqlite3.connect(self.path, check_same_thread=False)
+                    self._setup(connection)
+                    self._connection = connection
+        return getattr(self._connection, name)
+
+
+class _ProfileStore:
+    """SQLite-backed store for generated pest profiles and their generation status.
+
+    Rows are loaded lazily by pest_key and kept in a small in-memory LRU.
+    Each row holds the job status ('pending' | 'complete' | 'error'), the
+    pending-page metadata and, once complete, the generated profile.
+    """
+
+    def __init__(self, path, cache_size, max_waiters):
+        self.cache_size = cache_size
+        self.max_waiters = max_waiters
+        self._cache = OrderedDict()   # pest_key -> (status, metadata, profile)
+        self._lock = threading.Lock()
+        self._settled = {}            # pest_key -> Event set when it leaves 'pending'
+        self._waiters = 0
+        self._waiters_lock = threading.Lock()
+        self.version = 0              # bumped whenever a profile completes
+        self.listeners = []           # callables(pest_key) run after every change
+        self._db = _LazyDb(path, self._create_schema)
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS profiles (
+                pest_key   TEXT PRIMARY KEY,
+                status     TEXT NOT NULL,
+                metadata   TEXT NOT NULL DEFAULT '{}',
+                profile    TEXT,
+                updated_at REAL NOT NULL,
+                owner      TEXT
+            )
+        """)
+        if 'owner' not in {row[1] for row in db.execute('PRAGMA table_info(profiles)')}:
+            db.execute('ALTER TABLE profiles ADD COLUMN owner TEXT')
+        db.commit()
+
+    def recover(self):
+        """Fail jobs left pending by a process that has exited — they will never finish.
+
+        Pending rows record the process running their job, so a worker of a
+        multi-process server leaves the jobs of its live siblings alone.
+        Called once when the server starts, not at import.
+        """
+        with self._lock:
+            rows = self._db.execute("SELECT pest_key, owner FROM profiles WHERE status = 'pending'").fetchall()
+            dead = [pest_key for pest_key, owner in rows if not owner or not _owner_alive(owner)]
+            self._db.executemany("UPDATE profiles SET status = 'error', owner = NULL "
+                                 "WHERE pest_key = ? AND status = 'pending'", [(k,) for k in dead])
+            self._db.commit()
+            for pest_key in dead:
+                self._cache.pop(pest_key, None)
+        if dead:
+            logger.info(f"Marked {len(dead)} interrupted generation job(s) as failed")
+
+    def _load(self, pest_key):
+        with self._lock:
+            if pest_key in self._cache:
+                self._cache.move_to_end(pest_key)
+                return self._cache[pest_key]
+            row = self._db.execute(
+                'SELECT status, metadata, profile FROM profiles WHERE pest_key = ?', (pest_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], json.loads(row[1]), json.loads(row[2]) if row[2] else None)
+            self._remember(pest_key, entry)
+            return entry
+
+    def _remember(self, pest_key, entry):
+        self._cache[pest_key] = entry
+        self._cache.move_to_end(pest_key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _save(self, pest_key, status, metadata=None, profile=None, replace=True):
+        current = self._load(pest_key)
+        if metadata is None:
+            metadata = current[1] if current else {}
+        entry = (status, metadata, profile)
+        with self._lock:
+            if not replace:
+                # Checked under the same lock as the write, so no job can start in between
+                row = self._db.execute('SELECT status FROM profiles WHERE pest_key = ?', (pest_key,)).fetchone()
+                if row and row[0] != 'error':
+                    return False
+            self._db.execute(
+                'INSERT OR REPLACE INTO profiles (pest_key, status, metadata, profile, updated_at, owner) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (pest_key, status, json.dumps(metadata), json.dumps(profile) if profile else None, time.time(),
+                 _PROCESS_OWNER if status == 'pending' else None),
+            )
+            self._db.commit()
+            self._remember(pest_key, entry)
+            if status == 'complete':
+                self.version += 1
+        for listener in self.listeners:
+            listener(pest_key)
+        if status != 'pending':
+            with self._waiters_lock:
+                settled = self._settled.pop(pest_key, None)
+            if settled:
+                settled.set()
+        return True
+
+    def status(self, pest_key):
+        entry = self._load(pest_key)
+        return entry[0] if entry else None
+
+    def metadata(self, pest_key):
+        entry = self._load(pest_key)
+        return entry[1] if entry else {}
+
+    def profile(self, pest_key):
+        """The generated profile, or None unless generation is complete."""
+        entry = self._load(pest_key)
+        return entry[2] if entry and entry[0] == 'complete' else None
+
+    def completed(self):
+        """Yield (pest_key, profile) for every completed profile."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT pest_key, profile FROM profiles WHERE status = 'complete'"
+            ).fetchall()
+        for pest_key, profile in rows:
+            yield pest_key, json.loads(profile)
+
+    def images(self):
+        """{pest_key: image path} of every row: the profile's image when complete,
+        the upload's while pending, and None for failed jobs."""
+        with self._lock:
+            rows = self._db.execute('SELECT pest_key, status, metadata, profile FROM profiles').fetchall()
+        return {pest_key: None if status == 'error' else
+                json.loads(profile if status == 'complete' else metadata).get('image')
+                for pest_key, status, metadata, profile in rows}
+
+    def mark_pending(self, pest_key, metadata):
+        self._save(pest_key, 'pending', metadata)
+
+    def mark_complete(self, pest_key, profile):
+        self._save(pest_key, 'complete', profile=profile)
+
+    def mark_complete_if_absent(self, pest_key, profile):
+        """mark_complete unless pest_key already has a profile or a job generating
+        one (a failed job may be replaced). Returns whether it was stored."""
+        return self._save(pest_key, 'complete', profile=profile, replace=False)
+
+    def mark_error(self, pest_key):
+        self._save(pest_key, 'error')
+
+    def wait_until_settled(self, pest_key, timeout):
+        """Block while pest_key is pending, up to timeout seconds.
+
+        Returns (status, waited); waited is False when too many requests are
+        already held and the caller should fall back to polling.
+        """
+        status = self.status(pest_key)
+        if status != 'pending':
+            return status, True
+        with self._waiters_lock:
+            if self._waiters >= self.max_waiters:
+                return status, False
+            self._waiters += 1
+            settled = self._settled.setdefault(pest_key, threading.Event())
         try:
-            urllib.request.urlopen('http://localhost:11434/', timeout=1)
-            logger.info("Ollama started successfully")
+            if self.status(pest_key) == 'pending':
+                settled.wait(timeout)
+        finally:
+            with self._waiters_lock:
+                self._waiters -= 1
+        return self.status(pest_key), True
+
+
+_profiles = _ProfileStore(PROFILE_DB_PATH, PROFILE_CACHE_SIZE, STATUS_MAX_WAITERS)
+
+
+def _ollama():
+    """The ollama package, imported on first use — it is by far the slowest import."""
+    import ollama
+    return ollama
+
+
+class _OllamaBackend:
+    """One Ollama server: persistent clients plus its health and load counters."""
+
+    def __init__(self, host):
+        self.host = host
+        self._client = None
+        self._health_client = None
+        self._async_client = None
+        self.resident = []   # models loaded on the server, as of the last health check
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.consecutive_passes = 0
+        self.last_error = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = _ollama().Client(host=self.host)
+        return self._client
+
+    @property
+    def health_client(self):
+        if self._health_client is None:
+            self._health_client = _ollama().Client(host=self.host, timeout=OLLAMA_HEALTH_TIMEOUT)
+        return self._health_client
+
+    @property
+    def async_client(self):
+        # Created on first use so it binds to the serving event loop
+        if self._async_client is None:
+            self._async_client = _ollama().AsyncClient(host=self.host)
+        return self._async_client
+
+    @property
+    def is_local(self):
+        return urllib.parse.urlsplit(self.host).hostname in ('localhost', '127.0.0.1', '::1')
+
+
+def _is_backend_failure(exc):
+    """True for errors that say the backend itself is unwell (not the request)."""
+    if isinstance(exc, _ollama().ResponseError):
+        return exc.status_code >= 500
+    return isinstance(exc, (ConnectionError, httpx.TransportError))
+
+
+class _ModelResidency:
+    """Owns the runtime options of every Ollama call and tracks model residency.
+
+    prepare() applies the single options profile and picks keep_alive from
+    the traffic before the call. Models are pinned while busy and otherwise
+    keep KEEP_ALIVE_DEFAULT; a call never shortens it below that, so a lone
+    request after warm-up keeps the warm model. Load-shaping options can't
+    be overridden per call.
+    observe() reads load_duration from replies to record loads (and
+    reloads of a model that was resident) with their cost. Health checks
+    report unloads. maintain() releases pinned models once traffic stops.
+    """
+
+    def __init__(self, options, window):
+        self.options = dict(options)
+        self.window = window
+        self._calls = deque()   # monotonic times of recent calls
+        self._pinned = set()                # models last sent KEEP_ALIVE_PINNED
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=RESIDENCY_MAX_EVENTS)
+        self.counts = {'load': 0, 'reload': 0, 'unload': 0}
+        self.load_seconds = 0.0
+
+    def _recent_calls(self, now):
+        while self._calls and self._calls[0] < now - self.window:
+            self._calls.popleft()
+        return len(self._calls)
+
+    def keep_alive(self):
+        with self._lock:
+            calls = self._recent_calls(time.monotonic())
+        return KEEP_ALIVE_PINNED if calls >= RESIDENCY_BUSY_CALLS else KEEP_ALIVE_DEFAULT
+
+    def prepare(self, kwargs, record=True, keep_alive=None):
+        """kwargs for an Ollama chat call with the runtime profile applied."""
+        keep_alive = self.keep_alive() if keep_alive is None else keep_alive
+        with self._lock:
+            if record:
+                self._calls.append(time.monotonic())
+            if keep_alive == KEEP_ALIVE_PINNED:
+                self._pinned.add(kwargs['model'])
+            else:
+                self._pinned.discard(kwargs['model'])
+        options = {**(kwargs.get('options') or {}), **self.options}
+        return {**kwargs, 'options': options, 'keep_alive': keep_alive}
+
+    def _event(self, kind, backend, model, seconds=None):
+        event = {'at': round(time.time()), 'kind': kind, 'host': backend.host, 'model': model}
+        if seconds is not None:
+            event['seconds'] = round(seconds, 2)
+        with self._lock:
+            self.events.append(event)
+            self.counts[kind] += 1
+            self.load_seconds += seconds or 0.0
+
+    def observe(self, backend, model, response):
+        """Record a model load if the reply's load_duration says one happened."""
+        seconds = (response.get('load_duration') or 0) / 1e9
+        if seconds < RESIDENCY_LOAD_SECONDS:
             return
-        except Exception:
-            pass
-    logger.warning("Ollama did not respond after 10s — AI features may fail")
+        kind = 'reload' if model in backend.resident else 'load'
+        self._event(kind, backend, model, seconds)
+        if kind == 'reload':
+            logger.warning(f"Ollama reloaded {model} on {backend.host} ({seconds:.1f}s) — it was resident")
+        else:
+            logger.info(f"Ollama loaded {model} on {backend.host} in {seconds:.1f}s")
+
+    def observe_resident(self, backend, before, after):
+        """Record models a health check no longer finds loaded."""
+        for model in set(before) - set(after):
+            self._event('unload', backend, model)
+            logger.info(f"Ollama unloaded {model} on {backend.host}")
+
+    def maintain(self, pool):
+        """Hand pinned models back a short keep_alive once traffic has stopped."""
+        with self._lock:
+            idle = not self._calls or time.monotonic() - self._calls[-1] >= RESIDENCY_RELEASE_AFTER
+            models = sorted(self._pinned) if idle else []
+            self._pinned.difference_update(models)
+        for model in models:
+            for backend in pool.backends:
+                try:
+                    # An empty chat only updates the model's keep_alive
+                    backend.client.chat(**self.prepare({'model': model, 'messages': []},
+                                                       record=False, keep_alive=KEEP_ALIVE_IDLE))
+                except Exception as e:
+                    logger.warning(f"Could not release {model} on {backend.host}: {e}")
+            logger.info(f"Traffic stopped — released {model} (keep_alive {KEEP_ALIVE_IDLE})")
+
+    def run_forever(self, pool, interval):
+        while True:
+            time.sleep(interval)
+            self.maintain(pool)
+
+    def stats(self):
+        keep_alive = self.keep_alive()
+        with self._lock:
+            return {
+                'options': self.options,
+                'keep_alive': keep_alive,
+                'recent_calls': self._recent_calls(time.monotonic()),
+                'pinned': sorted(self._pinned),
+                'events': dict(self.counts),
+                'load_seconds': round(self.load_seconds, 1),
+                'recent_events': list(self.events)[-10:],
+            }
 
 
-_ensure_ollama_running()
+_residency = _ModelResidency(MODEL_OPTIONS, RESIDENCY_WINDOW)
+
+
+class _OllamaPool:
+    """Routes Ollama calls across backends by least outstanding requests.
+
+    Calls about an image stick to the backend that last served that image
+    and model while it is healthy, so a follow-up turn (the profile after a
+    classification) finds the conversation in that server's KV cache.
+    Backends are ejected after connection failures or repeated server errors
+    and readmitted once the health checker sees them answer again. When every
+    backend is ejected, calls go to all of them rather than failing outright.
+    Every call runs with the residency manager's options and keep_alive.
+    """
+
+    def __init__(self, hosts, residency):
+        self.backends = [_OllamaBackend(host) for host in hosts]
+        self.residency = residency
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        self._affinity = OrderedDict()   # session -> host that last served it
+
+    @staticmethod
+    def _session(kwargs):
+        """Affinity key of a call: its model and the image that opens the
+        conversation, or None for text-only calls."""
+        messages = kwargs.get('messages') or []
+        images = messages[0].get('images') if messages else None
+        if not images:
+            return None
+        return hashlib.sha1(f"{kwargs.get('model')}:{images[0]}".encode('utf-8')).hexdigest()
+
+    def _acquire(self, exclude=None, session=None):
+        with self._lock:
+            candidates = [b for b in self.backends if b.healthy and b is not exclude]
+            host = self._affinity.get(session)
+            backend = next((b for b in candidates if b.host == host), None)
+            if backend is None:
+                if not candidates:
+                    candidates = [b for b in self.backends if b is not exclude] or self.backends
+                # Rotate the starting point so ties spread across backends
+                start = next(self._next) % len(candidates)
+                rotated = candidates[start:] + candidates[:start]
+                backend = min(rotated, key=lambda b: b.outstanding)
+            if session is not None:
+                self._affinity[session] = backend.host
+                self._affinity.move_to_end(session)
+                while len(self._affinity) > OLLAMA_AFFINITY_SIZE:
+                    self._affinity.popitem(last=False)
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def _release(self, backend, error=None):
+        with self._lock:
+            backend.outstanding -= 1
+            if error is None or not _is_backend_failure(error):
+                backend.consecutive_failures = 0
+                return
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            backend.last_error = str(error)
+            if backend.healthy and (not isinstance(error, _ollama().ResponseError)
+                                    or backend.consecutive_failures >= OLLAMA_EJECT_AFTER):
+                backend.healthy = False
+                backend.consecutive_passes = 0
+                logger.warning(f"Ejected Ollama backend {backend.host}: {error}")
+
+    def chat(self, **kwargs):
+        """ollama.chat on the least-loaded healthy backend. A refused connection
+        is retried once on another backend."""
+        kwargs = self.residency.prepare(kwargs)
+        session = self._session(kwargs)
+        if kwargs.get('stream'):
+            return self._stream(session, kwargs)
+        backend = self._acquire(session=session)
+        try:
+            response = backend.client.chat(**kwargs)
+        except ConnectionError as e:
+            # Refused before the request reached the server — safe to resend
+            self._release(backend, e)
+            if len(self.backends) == 1:
+                raise
+            backend = self._acquire(exclude=backend, session=session)
+            try:
+                response = backend.client.chat(**kwargs)
+            except Exception as e:
+                self._release(backend, e)
+                raise
+        except Exception as e:
+            self._release(backend, e)
+            raise
+        self._release(backend)
+        self.residency.observe(backend, kwargs['model'], response)
+        return response
+
+    def _stream(self, session, kwargs):
+        # Acquired in the generator body, so a stream that is never iterated
+        # never holds a backend slot
+        backend = self._acquire(session=session)
+        error = None
+        try:
+            for part in backend.client.chat(**kwargs):
+                if part.get('done'):
+                    self.residency.observe(backend, kwargs['model'], part)
+                yield part
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(backend, error)
+
+    async def achat(self, **kwargs):
+        """Async chat on the least-loaded healthy backend (non-streaming)."""
+        kwargs = self.residency.prepare(kwargs)
+        backend = self._acquire(session=self._session(kwargs))
+        error = None
+        try:
+            response = await backend.async_client.chat(**kwargs)
+            self.residency.observe(backend, kwargs['model'], response)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._release(backend, error)
+
+    async def achat_stream(self, **kwargs):
+        """Async generator of streamed chat parts from the least-loaded healthy backend."""
+        kwargs = self.residency.prepare(kwargs)
+        backend = self._acquire(session=self._session(kwargs))
+        error = None
+        stream = None
+        try:
+            stream = await backend.async_client.chat(stream=True, **kwargs)
+            async for part in stream:
+                if part.get('done'):
+                    self.residency.observe(backend, kwargs['model'], part)
+                yield part
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if stream is not None:
+                await stream.aclose()
+            self._release(backend, error)
+
+    def check(self, backend, readmit_after=OLLAMA_READMIT_AFTER):
+        """Probe one backend; eject or readmit it based on the result."""
+        try:
+            loaded = backend.health_client.ps()
+        except Exception as e:
+            with self._lock:
+                backend.consecutive_passes = 0
+                backend.last_error = str(e)
+                if backend.healthy:
+                    backend.healthy = False
+                    logger.warning(f"Ejected Ollama backend {backend.host}: health check failed ({e})")
+            return False
+        resident = [m.get('model') or m.get('name') for m in loaded.get('models') or []]
+        self.residency.observe_resident(backend, backend.resident, resident)
+        with self._lock:
+            backend.resident = resident
+            backend.consecutive_passes += 1
+            if not backend.healthy and backend.consecutive_passes >= readmit_after:
+                backend.healthy = True
+                backend.consecutive_failures = 0
+                logger.info(f"Readmitted Ollama backend {backend.host}")
+        return True
+
+    def run_health_checks(self, interval):
+        while True:
+            time.sleep(interval)
+            for backend in self.backends:
+                self.check(backend)
+
+    def stats(self):
+        with self._lock:
+            return [{
+                'host': b.host,
+                'healthy': b.healthy,
+                'resident': b.resident,
+                'outstanding': b.outstanding,
+                'requests': b.requests,
+                'failures': b.failures,
+                'last_error': b.last_error,
+            } for b in self.backends]
+
+
+_ollama_pool = _OllamaPool(OLLAMA_HOSTS, _residency)
 
 
-def _warmup_model():
-    try:
-        logger.info(f"Pre-warming {OLLAMA_MODEL}...")
-        ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[{'role': 'user', 'content': 'hi'}],
-            options={'num_ctx': 512},
-            keep_alive='1h',
-        )
-        logger.info("Model warm-up complete")
-    except Exception as e:
-        logger.warning(f"Model warm-up failed: {e}")
+def _ensure_ollama_running():
+    """Start Ollama for any local backend that isn't already running."""
+    for backend in _ollama_pool.backends:
+        if _ollama_pool.check(backend):
+            logger.info(f"Ollama already running at {backend.host}")
+            continue
+        if not backend.is_local:
+            logger.warning(f"Ollama backend {backend.host} is not responding — ejected until it recovers")
+            continue
+
+        logger.info(f"Starting Ollama at {backend.host}...")
+        address = urllib.parse.urlsplit(backend.host)
+        try:
+            subprocess.Popen(
+                ['ollama', 'serve'],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env={**os.environ, 'OLLAMA_FLASH_ATTENTION': '1', 'OLLAMA_NUM_PARALLEL': str(OLLAMA_SLOTS_PER_HOST),
+                     'OLLAMA_HOST': f'{address.hostname}:{address.port or 11434}'},
+            )
+        except OSError as e:
+            logger.warning(f"Could not start Ollama ({e}) — AI features will fail until it is running")
+            continue
+        for _ in range(20):
+            time.sleep(0.5)
+            if _ollama_pool.check(backend, readmit_after=1):
+                logger.info("Ollama started successfully")
+                break
+        else:
+            logger.warning("Ollama did not respond after 10s — AI features may fail")
+
 
-threading.Thread(target=_warmup_model, daemon=True).start()
+def _warmup_model():
+    # Load the models on every backend so no node takes a cold first request.
+    # The warm-up uses the same runtime options as real calls, or Ollama
+    # would reload the model on the first of them.
+    for backend in _ollama_pool.backends:
+        for model in filter(None, (CASCADE_FAST_MODEL, OLLAMA_MODEL)):
+            try:
+                logger.info(f"Pre-warming {model} on {backend.host}...")
+                kwargs = _residency.prepare({
+                    'model': model,
+                    'messages': [{'role': 'user', 'content': 'hi'}],
+                    'options': {'num_predict': 1},
+                }, record=False, keep_alive=KEEP_ALIVE_DEFAULT)
+                _residency.observe(backend, model, backend.client.chat(**kwargs))
+                logger.info("Model warm-up complete")
+            except Exception as e:
+                logger.warning(f"Model warm-up of {model} failed on {backend.host}: {e}")
+        # Refresh residency now rather than at the next periodic check
+        _ollama_pool.check(backend)
 
 # Register public_assets directory
 @app.route('/assets/<path:filename>')
 def public_assets(filename):
     return send_from_directory('public_assets', filename)
 
+@app.route('/assets/v/<path:filename>')
+def image_variant(filename):
+    response = send_from_directory(VARIANTS_DIR, filename, max_age=VARIANT_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/favicon.ico')
 def favicon():
     return send_from_directory(
@@ -88,67 +765,70 @@ def favicon():
 def css_assets(filename):
     return send_from_directory('assets/css', filename)
 
+# Pest catalog lookups used by the template filters
+PEST_CATEGORIES = {
+    'Ants': 'crawling',
+    'Beetles': 'crawling',
+    'Caterpillars': 'larval',
+    'Bees': 'flying',
+    'Earthworms': 'crawling',
+    'Earwigs': 'crawling',
+    'Grasshoppers': 'flying',
+    'Moths': 'flying',
+    'Slugs': 'soft-bodied',
+    'Snails': 'soft-bodied',
+    'Wasps': 'flying',
+    'Weevils': 'crawling'
+}
+
+CATEGORY_DISPLAY = {
+    'crawling': 'Crawling Pest',
+    'flying': 'Flying Pest',
+    'larval': 'Larval Pest',
+    'soft-bodied': 'Soft-bodied Pest'
+}
+
+PEST_THREAT_LEVELS = {
+    'Ants': 'medium',
+    'Beetles': 'high',
+    'Caterpillars': 'high',
+    'Bees': 'low',
+    'Earthworms': 'low',
+    'Earwigs': 'medium',
+    'Grasshoppers': 'high',
+    'Moths': 'medium',
+    'Slugs': 'medium',
+    'Snails': 'medium',
+    'Wasps': 'medium',
+    'Weevils': 'high'
+}
+
+THREAT_TEXT = {
+    'low': 'Low Threat',
+    'medium': 'Medium Threat',
+    'high': 'High Threat'
+}
+
 # Add Jinja2 template filters
 @app.template_filter('get_category')
 def get_category(pest_name):
     """Get the category for a pest based on its characteristics"""
-    category_mapping = {
-        'Ants': 'crawling',
-        'Beetles': 'crawling',
-        'Caterpillars': 'larval',
-        'Bees': 'flying',
-        'Earthworms': 'crawling',
-        'Earwigs': 'crawling',
-        'Grasshoppers': 'flying',
-        'Moths': 'flying',
-        'Slugs': 'soft-bodied',
-        'Snails': 'soft-bodied',
-        'Wasps': 'flying',
-        'Weevils': 'crawling'
-    }
-    return category_mapping.get(pest_name, 'crawling')
+    return PEST_CATEGORIES.get(pest_name, 'crawling')
 
 @app.template_filter('get_category_display')
 def get_category_display(pest_name):
     """Get the display name for a pest category"""
-    category = get_category(pest_name)
-    category_display = {
-        'crawling': 'Crawling Pest',
-        'flying': 'Flying Pest',
-        'larval': 'Larval Pest',
-        'soft-bodied': 'Soft-bodied Pest'
-    }
-    return category_display.get(category, 'Crawling Pest')
+    return CATEGORY_DISPLAY.get(get_category(pest_name), 'Crawling Pest')
 
 @app.template_filter('get_threat_level')
 def get_threat_level(pest_name):
     """Get the threat level for a pest"""
-    threat_mapping = {
-        'Ants': 'medium',
-        'Beetles': 'high',
-        'Caterpillars': 'high',
-        'Bees': 'low',
-        'Earthworms': 'low',
-        'Earwigs': 'medium',
-        'Grasshoppers': 'high',
-        'Moths': 'medium',
-        'Slugs': 'medium',
-        'Snails': 'medium',
-        'Wasps': 'medium',
-        'Weevils': 'high'
-    }
-    return threat_mapping.get(pest_name, 'medium')
+    return PEST_THREAT_LEVELS.get(pest_name, 'medium')
 
 @app.template_filter('get_threat_text')
 def get_threat_text(pest_name):
     """Get the threat level text for display"""
-    threat = get_threat_level(pest_name)
-    threat_text = {
-        'low': 'Low Threat',
-        'medium': 'Medium Threat',
-        'high': 'High Threat'
-    }
-    return threat_text.get(threat, 'Medium Threat')
+    return THREAT_TEXT.get(get_threat_level(pest_name), 'Medium Threat')
 
 # Class names
 class_names = ['Ants', 'Bees', 'Beetles', 'Caterpillars', 'Earthworms', 'Earwigs',
@@ -767,213 +1447,1363 @@ pest_info = {
     }
 }
 
-def _pil_to_b64(image: Image.Image) -> str:
-    image.thumbnail((336, 336), Image.LANCZOS)
-    buf = io.BytesIO()
-    image.save(buf, format='JPEG', quality=85)
-    return base64.b64encode(buf.getvalue()).decode('utf-8')
+CATALOG_FUZZY_THRESHOLD = 0.7   # min trigram similarity for a fuzzy catalog match
+
+
+def _singular(word):
+    if word.endswith('ies') and len(word) > 4:
+        return word[:-3] + 'y'
+    if word.endswith('s') and not word.endswith(('ss', 'us', 'is')) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _normalize_name(text):
+    """Lowercase, treat _ and - as spaces, drop punctuation and singularize each word."""
+    words = re.sub(r'[^a-z0-9 ]', '', re.sub(r'[_\-]+', ' ', (text or '').lower())).split()
+    return ' '.join(_singular(w) for w in words)
+
+
+def _trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _PestCatalog:
+    """Immutable lookup index over the curated pest list, built once at startup.
+
+    Maps normalized names, singular/plural forms, slugs, scientific names and
+    common species names to canonical pest_info keys, plus a trigram index
+    for typo-tolerant fuzzy matching.
+    """
+
+    def __init__(self, pests):
+        names = {}    # normalized form -> canonical key (pest name / slug forms)
+        aliases = {}  # normalized form -> canonical key (scientific + species names)
+        ambiguous = set()
+
+        def add(index, form, key):
+            normalized = _normalize_name(form)
+            for variant in (normalized, normalized.replace(' ', '')):
+                if not variant or variant in ambiguous:
+                    continue
+                if index.get(variant, key) != key:
+                    # e.g. Gastropoda is both Slugs and Snails — don't guess
+                    ambiguous.add(variant)
+                    del index[variant]
+                    continue
+                index[variant] = key
+
+        for key, pest in pests.items():
+            add(names, key, key)
+            add(names, pest['name'], key)
+            add(aliases, pest['scientific_name'], key)
+            for species in pest.get('common_species', []):
+                add(aliases, species['name'], key)
+
+        every = dict(aliases)
+        every.update(names)
+        trigram_index = {}
+        for form in every:
+            for gram in _trigrams(form):
+                trigram_index.setdefault(gram, set()).add(form)
+
+        self._names = types.MappingProxyType(names)
+        self._every = types.MappingProxyType(every)
+        self._trigrams = types.MappingProxyType({g: frozenset(f) for g, f in trigram_index.items()})
+
+    def resolve(self, text, fuzzy=True, names_only=False):
+        """Canonical pest_info key for text, or None."""
+        form = _normalize_name(text)
+        if not form:
+            return None
+        index = self._names if names_only else self._every
+        key = index.get(form) or index.get(form.replace(' ', ''))
+        if key or not fuzzy:
+            return key
+        return self._fuzzy(form, index)
+
+    def _fuzzy(self, form, index):
+        grams = _trigrams(form)
+        shared = {}
+        for gram in grams:
+            for candidate in self._trigrams.get(gram, ()):
+                if candidate in index:
+                    shared[candidate] = shared.get(candidate, 0) + 1
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            score = 2 * count / (len(grams) + len(_trigrams(candidate)))
+            if score > best_score:
+                best, best_score = candidate, score
+        if best_score >= CATALOG_FUZZY_THRESHOLD:
+            logger.info(f"Fuzzy catalog match '{form}' -> '{best}' ({best_score:.2f})")
+            return index[best]
+        return None
+
+    def contained(self, text):
+        """Canonical key for the one curated pest name among text's words, or None.
+
+        Catches species-qualified names like 'Red Ants' or 'Leopard Slugs'
+        that don't resolve as a whole. Words naming two different pests
+        are ambiguous and give None.
+        """
+        keys = {self._names[word] for word in _normalize_name(text).split() if word in self._names}
+        return keys.pop() if len(keys) == 1 else None
+
+    def resolve_reply(self, text):
+        """resolve() for a pest name the model gave, falling back to contained()."""
+        return self.resolve(text) or self.contained(text)
+
+
+_catalog = _PestCatalog(pest_info)
 
 
-def predict_image(image_bytes):
+class _StageTimings:
+    """Running totals of per-stage preprocessing time, reported at /stats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+        self.count = 0
+
+    def record(self, timings):
+        with self._lock:
+            self.count += 1
+            for stage, ms in timings.items():
+                self._totals[stage] = self._totals.get(stage, 0.0) + ms
+
+    def stats(self):
+        with self._lock:
+            return {
+                'images': self.count,
+                'avg_ms': {stage: round(total / self.count, 2) for stage, total in self._totals.items()} if self.count else {},
+            }
+
+
+_preprocess_timings = _StageTimings()
+_preprocess_pool = None
+_preprocess_pool_lock = threading.Lock()
+
+
+def _preprocess(fn, *args):
+    """Run an image_pipeline function in the preprocessing process pool."""
+    global _preprocess_pool
+    with _preprocess_pool_lock:
+        if _preprocess_pool is None:
+            _preprocess_pool = ProcessPoolExecutor(max_workers=PREPROCESS_WORKERS)
+        pool = _preprocess_pool
     try:
-        # Load image using PIL
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-        
-        prompt = """You are a life-form detection AI. Examine the image and respond using EXACTLY one of the two formats below.
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        logger.warning("Preprocessing pool broke — running inline and recreating it")
+        with _preprocess_pool_lock:
+            if _preprocess_pool is pool:
+                _preprocess_pool = None
+        return fn(*args)
+
+
+def _prepare_model_input(image_bytes):
+    """Thumbnail + base64 + perceptual hash + frame stats of an upload, computed in the pool."""
+    started = time.perf_counter()
+    img_b64, phash, frame, timings = _preprocess(image_pipeline.prepare_model_input, image_bytes)
+    timings['total'] = (time.perf_counter() - started) * 1000
+    _preprocess_timings.record(timings)
+    logger.info("Preprocessed image: " + ', '.join(f'{k}={v:.1f}ms' for k, v in timings.items()))
+    return img_b64, phash, frame
+
+
+DYNAMIC_PESTS_DIR = os.path.join('public_assets', 'images', 'dynamic_pests')
+DYNAMIC_PESTS_QUOTA = int(os.environ.get('DYNAMIC_PESTS_QUOTA_MB', '512')) * 1024 * 1024
+DYNAMIC_PESTS_JPEG_QUALITY = 90
+
+# Responsive WebP variants of public_assets/images, served from /assets/v/
+VARIANTS_DIR = os.path.join('public_assets', 'variants')
+VARIANT_WIDTHS = (320, 640, 960)
+VARIANT_WEBP_QUALITY = 78
+VARIANT_MAX_AGE = 365 * 24 * 60 * 60   # names are content-hashed, so cache forever
+VARIANT_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class _ImageVariants:
+    """Content-hashed WebP renditions of the images under public_assets/images.
+
+    Variant names are <dir>-<stem>.<hash>.<width>.webp. The hash covers the
+    source bytes and encoder settings, so a URL never changes meaning.
+    Existing files are reused, so only new or changed images are encoded.
+    The manifest maps an image path (relative to public_assets/images) to
+    {width: filename}. Listeners run with the path once its variants exist.
+    """
+
+    def __init__(self, source_dir, variants_dir, widths, quality):
+        self.source_dir = source_dir
+        self.variants_dir = variants_dir
+        self.widths = tuple(widths)
+        self.quality = quality
+        self.listeners = []
+        self._manifest = {}   # image path -> {width: filename}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()   # one build at a time, so none encodes twice
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='variants')
+        self.encoded = 0
+        self.reused = 0
+        self.failed = 0
+
+    def _existing(self, base):
+        try:
+            names = os.listdir(self.variants_dir)
+        except FileNotFoundError:
+            return {}
+        variants = {}
+        for name in names:
+            width = name[len(base) + 1:-len('.webp')]
+            if name.startswith(base + '.') and name.endswith('.webp') and width.isdigit():
+                variants[int(width)] = name
+        return variants
+
+    def build(self, path):
+        """Make sure the variants of path exist and register them."""
+        try:
+            with self._build_lock:
+                variants = self._build(path)
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Could not build image variants for {path}: {e}")
+            return
+        with self._lock:
+            self._manifest[path] = dict(sorted(variants.items()))
+        for listener in self.listeners:
+            listener(path)
+
+    def _build(self, path):
+        with open(os.path.join(self.source_dir, path), 'rb') as f:
+            data = f.read()
+        settings = f'{self.widths}:{self.quality}'.encode()
+        digest = hashlib.sha256(data + settings).hexdigest()[:12]
+        base = os.path.splitext(path)[0].replace('/', '-') + '.' + digest
+        variants = self._existing(base)
+        if variants:
+            self.reused += 1
+            return variants
+        os.makedirs(self.variants_dir, exist_ok=True)
+        encoded = _preprocess(image_pipeline.webp_variants, data, self.widths, self.quality)
+        for width, webp in encoded.items():
+            name = f'{base}.{width}.webp'
+            tmp = os.path.join(self.variants_dir, f'.{name}.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(webp)
+            os.replace(tmp, os.path.join(self.variants_dir, name))
+            variants[width] = name
+        self.encoded += 1
+        return variants
+
+    def build_all(self):
+        """Build variants for every raster image under the source directory."""
+        started = time.perf_counter()
+        for root, _, files in os.walk(self.source_dir):
+            for filename in sorted(files):
+                if filename.lower().endswith(VARIANT_EXTENSIONS):
+                    path = os.path.relpath(os.path.join(root, filename), self.source_dir).replace(os.sep, '/')
+                    self.build(path)
+        logger.info(f"Image variants ready in {time.perf_counter() - started:.1f}s "
+                    f"({self.encoded} encoded, {self.reused} reused, {self.failed} failed)")
+
+    def build_later(self, path):
+        """Build variants for a new upload in the background."""
+        self._background.submit(self.build, path)
+
+    def variants(self, path):
+        with self._lock:
+            return self._manifest.get(path, {})
+
+    def forget(self, path):
+        """Delete the variants of an image that no longer exists."""
+        with self._lock:
+            variants = self._manifest.pop(path, {})
+        for name in variants.values():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.variants_dir, name))
+
+    def stats(self):
+        with self._lock:
+            images = len(self._manifest)
+        return {'images': images, 'encoded': self.encoded, 'reused': self.reused, 'failed': self.failed}
+
+
+_image_variants = _ImageVariants(os.path.join('public_assets', 'images'), VARIANTS_DIR,
+                                 VARIANT_WIDTHS, VARIANT_WEBP_QUALITY)
+
+
+class _BlobStore:
+    """Content-addressed, quota-bounded store for uploaded pest images.
+
+    Blobs are named by the SHA-256 of the upload, so identical uploads are
+    stored (and encoded) once, and are written atomically through a temp
+    file and os.replace. A SQLite reference map records which blob each
+    pest_key shows; it follows the profile store — put() references the
+    blob for the generation job, and reference() moves or drops it when the
+    profile completes or fails. Once the directory is over quota, the least
+    recently used blobs that no pest_key references are deleted. Listeners
+    run with the image path of every evicted blob.
+    """
+
+    def __init__(self, directory, db_path, quota):
+        self.directory = directory
+        self.quota = quota
+        self.listeners = []
+        self._prefix = os.path.basename(directory)
+        self._lock = threading.Lock()
+        self.deduped = 0
+        self.evicted = 0
+        self._over_quota_warned = False
+        self._db = _LazyDb(db_path, self._create_schema)
+
+    @staticmethod
+    def _create_schema(db):
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest    TEXT PRIMARY KEY,
+                size      INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        db.execute("""
+            CREATE TABLE IF NOT EXISTS blob_refs (
+                pest_key TEXT PRIMARY KEY,
+                digest   TEXT NOT NULL
+            )
+        """)
+        db.commit()
+
+    def _file(self, digest):
+        return os.path.join(self.directory, digest + '.jpg')
+
+    def image_path(self, digest):
+        """Path of a blob relative to public_assets/images, as stored in profiles."""
+        return f'{self._prefix}/{digest}.jpg'
+
+    def put(self, pest_key, digest, encode):
+        """Point pest_key at the blob for digest and return its image path.
+
+        encode() produces the JPEG bytes and is only called when the blob is
+        not stored yet. The existence check, the write and the reference
+        happen under one lock, so eviction can't delete the blob in between.
+        """
+        with self._lock:
+            stored = self._stored(digest)
+        data = None if stored else encode()   # the slow part, done outside the lock
+        with self._lock:
+            created = not self._stored(digest)
+            if created:
+                data = encode() if data is None else data
+                self._write(digest, data)
+                self._db.execute('INSERT OR REPLACE INTO blobs (digest, size, last_used) VALUES (?, ?, ?)',
+                                 (digest, len(data), time.time()))
+            else:
+                self.deduped += 1
+                self._db.execute('UPDATE blobs SET last_used = ? WHERE digest = ?', (time.time(), digest))
+            self._db.execute('INSERT OR REPLACE INTO blob_refs (pest_key, digest) VALUES (?, ?)',
+                             (pest_key, digest))
+            self._db.commit()
+        if created:
+            logger.info(f"Stored dynamic pest image {digest[:12]} ({len(data) // 1024} KB) for {pest_key}")
+            self._evict()
+        return self.image_path(digest)
+
+    def _stored(self, digest):
+        known = self._db.execute('SELECT 1 FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        return bool(known) and os.path.exists(self._file(digest))
+
+    def _write(self, digest, data):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._file(digest))
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp)
+            raise
+
+    def _digest(self, image_path):
+        """The blob digest of image_path, or None for images outside the store."""
+        if not image_path or not image_path.startswith(self._prefix + '/'):
+            return None
+        return os.path.splitext(os.path.basename(image_path))[0]
+
+    def reference(self, pest_key, image_path):
+        """Point pest_key at the blob behind image_path, or drop its reference
+        when image_path is None or not in the store."""
+        digest = self._digest(image_path)
+        with self._lock:
+            if digest is None:
+                self._db.execute('DELETE FROM blob_refs WHERE pest_key = ?', (pest_key,))
+            else:
+                self._db.execute('INSERT OR REPLACE INTO blob_refs (pest_key, digest) VALUES (?, ?)',
+                                 (pest_key, digest))
+            self._db.commit()
+
+    def sync(self, images):
+        """Bring the reference map in line with images, a {pest_key: image_path
+        or None} from the profile store. Keys it doesn't list are left alone,
+        so a job another worker has only just stored its image for keeps it."""
+        digests = {pest_key: self._digest(path) for pest_key, path in images.items()}
+        with self._lock:
+            self._db.executemany('DELETE FROM blob_refs WHERE pest_key = ?',
+                                 [(k,) for k, digest in digests.items() if digest is None])
+            self._db.executemany('INSERT OR REPLACE INTO blob_refs (pest_key, digest) VALUES (?, ?)',
+                                 [(k, digest) for k, digest in digests.items() if digest])
+            self._db.commit()
+        self._evict()
+
+    def referrers(self, image_path):
+        """pest_keys whose image is image_path."""
+        digest = self._digest(image_path)
+        with self._lock:
+            rows = self._db.execute('SELECT pest_key FROM blob_refs WHERE digest = ?', (digest,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _evict(self):
+        evicted = []
+        with self._lock:
+            total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+            candidates = self._db.execute(
+                'SELECT digest, size FROM blobs WHERE digest NOT IN (SELECT digest FROM blob_refs) '
+                'ORDER BY last_used'
+            ).fetchall() if total > self.quota else []
+            for digest, size in candidates:
+                if total <= self.quota:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(self._file(digest))
+                self._db.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+                total -= size
+                evicted.append(digest)
+            self._db.commit()
+            self.evicted += len(evicted)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} unreferenced dynamic pest images")
+        if total > self.quota and not self._over_quota_warned:
+            self._over_quota_warned = True
+            logger.warning(f"dynamic_pests holds {total // 2**20} MB of referenced images, "
+                           f"over its {self.quota // 2**20} MB quota")
+        for digest in evicted:
+            for listener in self.listeners:
+                listener(self.image_path(digest))
+
+    def stats(self):
+        with self._lock:
+            blobs, size = self._db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+            referenced = self._db.execute('SELECT COUNT(DISTINCT digest) FROM blob_refs').fetchone()[0]
+        return {
+            'blobs': blobs,
+            'referenced': referenced,
+            'bytes': size,
+            'quota': self.quota,
+            'deduped': self.deduped,
+            'evicted': self.evicted,
+        }
+
+
+_dynamic_images = _BlobStore(DYNAMIC_PESTS_DIR, PROFILE_DB_PATH, DYNAMIC_PESTS_QUOTA)
+_dynamic_images.listeners.append(_image_variants.forget)
+
+
+def _reference_profile_image(pest_key):
+    """Keep pest_key's blob reference on the image its profile shows."""
+    status = _profiles.status(pest_key)
+    if status == 'complete':
+        _dynamic_images.reference(pest_key, _profiles.profile(pest_key).get('image'))
+    elif status == 'error':
+        _dynamic_images.reference(pest_key, None)
+
+
+_profiles.listeners.append(_reference_profile_image)
+
+
+@app.template_filter('image_src')
+def image_src(path, width=640):
+    """URL of the smallest variant of path at least width wide (the original until variants exist)"""
+    variants = _image_variants.variants(path)
+    if not variants:
+        return url_for('public_assets', filename='images/' + path)
+    fits = [w for w in variants if w >= width]
+    return url_for('image_variant', filename=variants[min(fits) if fits else max(variants)])
+
+@app.template_filter('image_srcset')
+def image_srcset(path):
+    """srcset listing every variant of path (empty until variants exist)"""
+    return ', '.join(f"{url_for('image_variant', filename=name)} {width}w"
+                     for width, name in _image_variants.variants(path).items())
+
+
+class _UploadImage:
+    """One uploaded image, carried from classification through background
+    profile generation. Each derived form (digest, model thumbnail, stored
+    JPEG) is computed at most once, on first use."""
+
+    def __init__(self, data):
+        self.data = data
+        self._lock = threading.Lock()
+        self._digest = None
+        self._model_input = None
+        self._stored = None
+        # The classification exchange (messages + assistant reply) once the
+        # model has seen this image, so follow-up calls can extend it
+        self.conversation = None
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.data).hexdigest()
+        return self._digest
+
+    def _thumbnail(self):
+        with self._lock:
+            if self._model_input is None:
+                self._model_input = _prepare_model_input(self.data)
+            return self._model_input
+
+    def model_input(self):
+        """(img_b64, phash) of the model-sized thumbnail."""
+        return self._thumbnail()[:2]
+
+    def frame_stats(self):
+        """image_pipeline.frame_stats() of the model-sized thumbnail."""
+        return self._thumbnail()[2]
+
+    @property
+    def stored(self):
+        """Image path from the last store(), or None if not stored yet."""
+        return self._stored
+
+    def store(self, pest_key):
+        """Save the image in the dynamic_pests blob store as pest_key's image and
+        return its image path (relative to public_assets/images)."""
+        with self._lock:
+            path = _dynamic_images.put(pest_key, self.digest, lambda: _preprocess(
+                image_pipeline.encode_jpeg, self.data, DYNAMIC_PESTS_JPEG_QUALITY))
+            if self._stored is None:
+                _image_variants.build_later(path)
+            self._stored = path
+            return path
+
+
+class _SingleFlight:
+    """Coalesce identical in-flight calls so concurrent callers share one result."""
+
+    def __init__(self):
+        self._inflight = {}   # key -> Future
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._inflight)}
+
+
+class SchedulerBusy(Exception):
+    """Raised when the inference queue is too deep to accept more work."""
+
+
+class _InferenceScheduler:
+    """Bounded worker pool draining a priority queue of inference work.
+
+    Lower priority numbers run first. Background work is shed earlier than
+    interactive work so a backlog of profile generation never blocks /predict.
+    """
+
+    # Fraction of the queue limit each priority class may fill before it is shed
+    _SHED_AT = {PRIORITY_INTERACTIVE: 1.0, PRIORITY_TEXT: 0.75, PRIORITY_BATCH: 0.75,
+                PRIORITY_BACKGROUND: 0.5, PRIORITY_PREWARM: 0.25}
+    _NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_TEXT: 'text',
+              PRIORITY_BATCH: 'batch', PRIORITY_BACKGROUND: 'background', PRIORITY_PREWARM: 'prewarm'}
+
+    def __init__(self, workers, max_queue):
+        self.max_queue = max_queue
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._queued = {p: 0 for p in self._SHED_AT}
+        self._running = 0                     # non-prewarm tasks on a worker
+        self._last_active = time.monotonic()  # when non-prewarm work last finished
+        self.completed = 0
+        self.shed = 0
+        self.workers = workers
+        self._started = False
+
+    def _start(self):
+        # Workers start with the first task, so importing app starts no threads
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f'inference-{i}', daemon=True).start()
+
+    def on_worker(self):
+        return getattr(self._local, 'active', False)
+
+    def submit(self, priority, fn, *args, **kwargs):
+        """Queue fn and return a Future; raises SchedulerBusy when shedding load."""
+        future = Future()
+        if self.on_worker():
+            # Nested call from a running task — already holds the slot
+            future.set_result(fn(*args, **kwargs))
+            return future
+        with self._lock:
+            if sum(self._queued.values()) >= self.max_queue * self._SHED_AT[priority]:
+                self.shed += 1
+                raise SchedulerBusy(f'Inference queue full ({self.max_queue} tasks)')
+            self._queued[priority] += 1
+        self._start()
+        self._queue.put((priority, next(self._seq), future, fn, args, kwargs))
+        return future
+
+    def run(self, priority, fn, *args, **kwargs):
+        return self.submit(priority, fn, *args, **kwargs).result()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority):
+        """`async with` block that holds one worker for its duration.
+
+        For coroutines doing their own non-blocking inference I/O: they wait
+        their turn by priority like any task and are shed the same way, but the
+        worker thread just idles until the block exits.
+        """
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+        released = threading.Event()
+
+        def hold():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+            released.wait()
+
+        future = self.submit(priority, hold)
+        try:
+            await granted
+            yield
+        finally:
+            released.set()
+            future.cancel()
+
+    def busy(self):
+        """True while any work other than prewarm is queued or running."""
+        with self._lock:
+            return self._running > 0 or any(n for p, n in self._queued.items() if p != PRIORITY_PREWARM)
+
+    def idle_for(self):
+        """Seconds since the last non-prewarm task finished (0 while busy)."""
+        if self.busy():
+            return 0.0
+        with self._lock:
+            return time.monotonic() - self._last_active
+
+    def _worker(self):
+        self._local.active = True
+        while True:
+            priority, _, future, fn, args, kwargs = self._queue.get()
+            foreground = priority != PRIORITY_PREWARM
+            with self._lock:
+                self._queued[priority] -= 1
+                self._running += foreground
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            with self._lock:
+                self.completed += 1
+                self._running -= foreground
+                if foreground:
+                    self._last_active = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': {self._NAMES[p]: n for p, n in self._queued.items()},
+                'max_queue': self.max_queue,
+                'completed': self.completed,
+                'shed': self.shed,
+            }
+
+
+_ollama_flight = _SingleFlight()
+_scheduler = _InferenceScheduler(INFERENCE_WORKERS, INFERENCE_QUEUE_LIMIT)
+
+
+def _ollama_chat(messages, options=None, priority=PRIORITY_INTERACTIVE):
+    """ollama.chat run through the scheduler, with identical concurrent requests
+    collapsed into a single call. options only carries per-call settings such
+    as num_predict; the pool applies MODEL_OPTIONS and keep_alive."""
+    kwargs = {'model': OLLAMA_MODEL, 'messages': messages, 'options': options}
+    if _scheduler.on_worker():
+        # Already on the inference slot; waiting on another request here could deadlock
+        return _ollama_pool.chat(**kwargs)
+    key = hashlib.sha256(json.dumps(
+        {'model': OLLAMA_MODEL, 'messages': messages, 'options': options},
+        sort_keys=True,
+    ).encode('utf-8')).hexdigest()
+    return _ollama_flight.do(key, _scheduler.run, priority, _ollama_pool.chat, **kwargs)
+
+
+_STREAM_END = object()
+
+
+def _ollama_chat_stream(messages, options=None, priority=PRIORITY_INTERACTIVE,
+                        model=OLLAMA_MODEL, format=None):
+    """Yield content chunks of a streamed ollama.chat call run on the scheduler.
+
+    Closing the generator early stops the producer and closes the HTTP
+    stream, which makes Ollama abort the generation.
+    """
+    chunks = queue.Queue()
+    stop = threading.Event()
+
+    def produce():
+        stream = None
+        try:
+            stream = _ollama_pool.chat(model=model, messages=messages, options=options,
+                                       format=format, stream=True)
+            for part in stream:
+                if stop.is_set():
+                    break
+                chunks.put(part.message.content or '')
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            if stream is not None:
+                stream.close()
+            chunks.put(_STREAM_END)
+
+    if _scheduler.on_worker():
+        produce()
+    else:
+        _scheduler.submit(priority, produce)
+    try:
+        while True:
+            item = chunks.get()
+            if item is _STREAM_END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+class _LineFieldParser:
+    """Incrementally split streamed text into complete `FIELD: value` lines."""
+
+    def __init__(self):
+        self.text = ''
+        self._pending = ''
+        self.fields = {}
+
+    @property
+    def complete_text(self):
+        """Text up to the last complete line (drops a line cut off mid-stream)."""
+        return self.text[:len(self.text) - len(self._pending)]
+
+    def feed(self, chunk):
+        """Add a chunk; return [(FIELD, value), ...] for lines completed by it."""
+        self.text += chunk
+        self._pending += chunk
+        *lines, self._pending = self._pending.split('\n')
+        return [f for f in map(self._parse, lines) if f]
+
+    def close(self):
+        """Flush the final unterminated line."""
+        line, self._pending = self._pending, ''
+        field = self._parse(line)
+        return [field] if field else []
+
+    def _parse(self, line):
+        name, sep, value = line.strip().partition(':')
+        if not sep or not name.replace('_', '').isalnum() or not name.isupper():
+            return None
+        self.fields[name] = value.strip()
+        return name, value.strip()
+
+
+class _JsonFieldParser:
+    """Incrementally extract top-level members from a streamed JSON object.
+
+    Same interface as _LineFieldParser: a member is reported once its value is
+    complete, which for numbers and literals means a delimiter has followed it.
+    """
+
+    _SPACE = ' \t\r\n'
+
+    def __init__(self):
+        self.text = ''
+        self.fields = {}
+        self._pos = 0
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk):
+        """Add a chunk; return [(field, value), ...] for members completed by it."""
+        self.text += chunk
+        completed = []
+        member = self._next_member(final=False)
+        while member:
+            completed.append(member)
+            member = self._next_member(final=False)
+        return completed
+
+    def close(self):
+        """Flush a member the stream ended on without a delimiter."""
+        member = self._next_member(final=True)
+        return [member] if member else []
+
+    def _skip(self, pos, chars):
+        while pos < len(self.text) and self.text[pos] in chars:
+            pos += 1
+        return pos
+
+    def _next_member(self, final):
+        try:
+            pos = self._skip(self._pos, self._SPACE + '{,')
+            name, pos = self._decoder.raw_decode(self.text, pos)
+            pos = self._skip(pos, self._SPACE)
+            if not isinstance(name, str) or self.text[pos:pos + 1] != ':':
+                return None
+            value, end = self._decoder.raw_decode(self.text, self._skip(pos + 1, self._SPACE))
+        except ValueError:
+            return None
+        after = self._skip(end, self._SPACE)
+        if not final and self.text[after:after + 1] not in (',', '}'):
+            return None
+        self._pos = after
+        self.fields[name] = value
+        return name, value
+
+
+class _ClassificationCache:
+    """LRU + TTL cache of predict_image results.
+
+    Entries are keyed on the SHA-256 of the uploaded bytes (exact repeats) and
+    on the perceptual hash of the 336px model thumbnail (burst shots / re-saves).
+    Entries put with similar=False match their exact digest only.
+    """
+
+    def __init__(self, max_size, ttl, max_distance):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self._entries = OrderedDict()   # digest -> (phash, result, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    def _expired(self, stored_at):
+        return time.monotonic() - stored_at > self.ttl
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry and not self._expired(entry[2]):
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[digest]
+            return None
+
+    def get_similar(self, phash):
+        with self._lock:
+            for digest, (other, result, stored_at) in reversed(self._entries.items()):
+                if other is None or self._expired(stored_at):
+                    continue
+                if bin(phash ^ other).count('1') <= self.max_distance:
+                    self._entries.move_to_end(digest)
+                    self.near_hits += 1
+                    return result
+            self.misses += 1
+            return None
+
+    def put(self, digest, phash, result, similar=True):
+        with self._lock:
+            self._entries[digest] = (phash if similar else None, result, time.monotonic())
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.near_hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'near_hits': self.near_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+_classification_cache = _ClassificationCache(CLASSIFICATION_CACHE_SIZE, CLASSIFICATION_CACHE_TTL, PHASH_MAX_DISTANCE)
+
+
+class _FramePrefilter:
+    """Rejects frames that cannot show a creature (blank, black, washed out,
+    hopelessly blurred) using the thumbnail's frame statistics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejected = {}
+
+    def check(self, frame):
+        """Rejection reason for a frame, or None when it should go to the model."""
+        if frame['stddev'] < PREFILTER_MIN_STDDEV:
+            reason = 'blank'
+        elif frame['p99'] < PREFILTER_MAX_DARK:
+            reason = 'dark'
+        elif frame['p1'] > PREFILTER_MIN_BRIGHT:
+            reason = 'overexposed'
+        elif frame['sharpness'] is not None and frame['sharpness'] < PREFILTER_MIN_SHARPNESS:
+            reason = 'blurred'
+        else:
+            reason = None
+        with self._lock:
+            self.checked += 1
+            if reason:
+                self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return reason
+
+    def stats(self):
+        with self._lock:
+            return {'checked': self.checked, 'rejected': dict(self.rejected)}
+
+
+_prefilter = _FramePrefilter()
+
+
+def _lookup_classification(image):
+    """Check the classification cache for an _UploadImage.
+
+    Returns (cached_result, digest, phash, img_b64). On an exact-digest hit the
+    image is never decoded and phash/img_b64 are None. Frames the pre-filter
+    rejects come back as a cached 'no creature' result.
+    """
+    digest = image.digest
+    cached = _classification_cache.get(digest)
+    if cached is not None:
+        logger.info(f"Classification cache hit ({digest[:12]})")
+        return cached, digest, None, None
+
+    img_b64, phash = image.model_input()
+
+    cached = _classification_cache.get_similar(phash)
+    if cached is not None:
+        logger.info(f"Classification cache near-duplicate hit ({phash:016x})")
+        _classification_cache.put(digest, phash, cached)
+        return cached, digest, phash, img_b64
+
+    reason = _prefilter.check(image.frame_stats())
+    if reason:
+        logger.info(f"Pre-filter: {reason} frame — no creature detected, skipping the model")
+        cached = (None, PREFILTER_CONFIDENCE, False, None, None, 'none', True)
+        # Exact repeats only: a blank frame's hash is near 0, and so is the
+        # hash of many real photos with a smooth lighting gradient
+        _classification_cache.put(digest, phash, cached, similar=False)
+    return cached, digest, phash, img_b64
+
+
+def predict_image(image, priority=PRIORITY_INTERACTIVE):
+    """Classify an _UploadImage, serving repeat and near-duplicate uploads from cache."""
+    cached, digest, phash, img_b64 = _lookup_classification(image)
+    if cached is not None:
+        return cached
+
+    def classify():
+        result, fields = _classify_image(img_b64, priority)
+        _classification_cache.put(digest, phash, result)
+        return result, fields
+
+    # Concurrent uploads of the same bytes share one classification
+    result, fields = _ollama_flight.do(f'classify:{digest}', classify)
+    if fields is not None:
+        image.conversation = _classification_conversation(img_b64, fields)
+    return result
+
+
+def predict_image_stream(image):
+    """Streaming predict_image.
+
+    Yields ('field', name, value) for each reply field as soon as it is
+    complete, then ('result', prediction) with the same tuple predict_image returns.
+    """
+    cached, digest, phash, img_b64 = _lookup_classification(image)
+    if cached is not None:
+        yield 'result', cached
+        return
+
+    fast = _classify_fast(img_b64)
+    if fast is not None:
+        for name, value in fast.fields.items():
+            yield 'field', name, value
+        result = _interpret_classification(fast.fields)
+        _classification_cache.put(digest, phash, result)
+        yield 'result', result
+        return
+
+    logger.info("Streaming image to Ollama for analysis")
+    started = time.perf_counter()
+    parser = _JsonFieldParser()
+    for name, value in _stream_classification(img_b64, parser):
+        yield 'field', name, value
+
+    logger.info(f"Ollama response: {parser.text}")
+    result = _interpret_classification(parser.fields)
+    _cascade.record('full', 'answered', started)
+    _classification_cache.put(digest, phash, result)
+    image.conversation = _classification_conversation(img_b64, parser.fields)
+    yield 'result', result
+
+
+CLASSIFY_PROMPT = """You are a life-form detection AI. Examine the image and answer with a JSON object.
 
 KNOWN AGRICULTURAL PESTS:
 Ants, Bees, Beetles, Caterpillars, Earthworms, Earwigs, Grasshoppers, Moths, Slugs, Snails, Wasps, Weevils
 
-CONFIDENCE: choose freely from 0.00–1.00 based on image clarity. Do not default to fixed values.
-
-THREAT in an agricultural/garden context:
-high — significant crop or structural damage
-medium — moderate nuisance or damage potential
-low — minimal impact or largely beneficial
-none — no meaningful agricultural threat (humans, dogs, cats, large animals, etc.)
-
-Format A — image clearly shows a creature from the KNOWN AGRICULTURAL PESTS list above:
-MATCH: YES
-PEST: <exact name from the list>
-CONFIDENCE: <0.00–1.00>
-THREAT: <high/medium/low>
-
-Format B — use this for absolutely everything else:
-MATCH: NO
-PEST: <the common name of whatever is in the image, or "none" if truly nothing living is present>
-SCIENTIFIC_NAME: <scientific name, or "n/a">
-CONFIDENCE: <0.00–1.00>
-THREAT: <high/medium/low/none>
-IS_TRADITIONAL_PEST: NO
-DESCRIPTION: <2–3 sentences>
+Fields:
+match — true only if the image clearly shows a creature from the KNOWN AGRICULTURAL PESTS list above, otherwise false
+pest — when match is true, the exact name from the list; otherwise the common name of whatever is in the image, or "none" if truly nothing living is present
+confidence — 0.00–1.00, chosen freely based on image clarity. Do not default to fixed values.
+threat — in an agricultural/garden context:
+  high — significant crop or structural damage
+  medium — moderate nuisance or damage potential
+  low — minimal impact or largely beneficial
+  none — no meaningful agricultural threat (humans, dogs, cats, large animals, etc.)
+scientific_name — the scientific name, or "n/a"
+creature — if any living thing at all is visible (even partly, small or in the background), its short common name like "Human", "Dog", "Spider"; otherwise "none"
 
 CRITICAL EXAMPLES — follow these exactly:
-Image of a human person → MATCH: NO / PEST: Human / THREAT: none
-Image of a dog → MATCH: NO / PEST: Dog / THREAT: none
-Image of a crane fly → MATCH: NO / PEST: Crane Fly / THREAT: low
-Image of a spider → MATCH: NO / PEST: Spider / THREAT: low
-Image of a bird → MATCH: NO / PEST: <bird species name> / THREAT: none
-Image with NO living creature at all → MATCH: NO / PEST: none / THREAT: none
+Image of a human person → match: false, pest: "Human", threat: "none"
+Image of a dog → match: false, pest: "Dog", threat: "none"
+Image of a crane fly → match: false, pest: "Crane Fly", threat: "low"
+Image of a spider → match: false, pest: "Spider", threat: "low"
+Image of a bird → match: false, pest: the bird species name, threat: "none"
+Image with NO living creature at all → match: false, pest: "none", creature: "none", threat: "none"
+"""
+
+# JSON schema passed as Ollama's `format`, so replies are always well-formed and
+# typed. Property order is generation order — the early-stop checks rely on it.
+CLASSIFY_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'match': {'type': 'boolean'},
+        'pest': {'type': 'string'},
+        'confidence': {'type': 'number', 'minimum': 0, 'maximum': 1},
+        'threat': {'type': 'string', 'enum': ['high', 'medium', 'low', 'none']},
+        'scientific_name': {'type': 'string'},
+        'creature': {'type': 'string'},
+    },
+    'required': ['match', 'pest', 'confidence', 'threat', 'scientific_name', 'creature'],
+}
 
-Reply with only the formatted lines. Do not include angle brackets or any other text."""
 
-        img_b64 = _pil_to_b64(image)
+def _classification_messages(img_b64):
+    return [{
+        'role': 'user',
+        'content': CLASSIFY_PROMPT,
+        'images': [img_b64],
+    }]
 
-        logger.info("Sending image to Ollama for analysis")
-        response = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[{
-                'role': 'user',
-                'content': prompt,
-                'images': [img_b64],
-            }],
-            options={'num_ctx': 2048},
-            keep_alive='30m',
-        )
-        response_text = response.message.content.strip()
-        logger.info(f"Ollama response: {response_text}")
-        
-        # Parse response
-        match_type = 'NONE'
-        pest_name = None
-        scientific_name = None
-        confidence = 0.75
-        description = None
-        threat_level = 'medium'
-        is_traditional_pest = True
 
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('MATCH:'):
-                match_type = line.replace('MATCH:', '').strip().upper()
-            elif line.startswith('PEST:'):
-                pest_name = line.replace('PEST:', '').strip()
-            elif line.startswith('SCIENTIFIC_NAME:'):
-                scientific_name = line.replace('SCIENTIFIC_NAME:', '').strip()
-            elif line.startswith('CONFIDENCE:'):
-                try:
-                    confidence = float(line.replace('CONFIDENCE:', '').strip())
-                    confidence = max(0.0, min(1.0, confidence))
-                except ValueError:
-                    pass
-            elif line.startswith('DESCRIPTION:'):
-                description = line.replace('DESCRIPTION:', '').strip()
-            elif line.startswith('THREAT:'):
-                t = line.replace('THREAT:', '').strip().lower()
-                threat_level = t if t in ('high', 'medium', 'low', 'none') else 'medium'
-            elif line.startswith('IS_TRADITIONAL_PEST:'):
-                is_traditional_pest = 'YES' in line.upper()
-
-        # Normalise legacy MATCH: NONE — treat same as MATCH: NO
-        if match_type == 'NONE':
-            match_type = 'NO'
-
-        # Format B with PEST: none / n/a means nothing detected — try fallbacks
-        _no_creature_values = {'none', 'n/a', 'no creature', 'no creature detected', ''}
-        if match_type == 'NO' and (not pest_name or pest_name.lower().strip() in _no_creature_values):
-
-            # Fallback 1: scan the raw response text for any creature keyword
-            _kw_map = [
-                ('human', 'Human'), ('person', 'Human'), ('people', 'Human'),
-                (' man ', 'Human'), ('woman', 'Human'), ('child', 'Human'),
-                ('crane fly', 'Crane Fly'), ('mosquito', 'Mosquito'),
-                ('spider', 'Spider'), ('fly', 'Fly'), ('bee', 'Bee'),
-                ('dog', 'Dog'), ('cat', 'Cat'), ('bird', 'Bird'),
-                ('deer', 'Deer'), ('rabbit', 'Rabbit'), ('squirrel', 'Squirrel'),
-                ('raccoon', 'Raccoon'), ('mouse', 'Mouse'), ('rat', 'Rat'),
-            ]
-            rt_lower = response_text.lower()
-            for kw, name in _kw_map:
-                if kw in rt_lower:
-                    logger.info(f"Keyword '{kw}' found in first-pass response — creature: {name}")
-                    return name, confidence, False, None, None, 'none', False
-
-            # Fallback 2: second Ollama call asking a simpler question
-            logger.info("No keyword match — trying fallback Ollama call")
-            try:
-                fb_response = ollama.chat(
-                    model=OLLAMA_MODEL,
-                    messages=[{
-                        'role': 'user',
-                        'content': "What living creature do you see in this image? Reply with only a short common name like 'Human', 'Dog', 'Spider'. If there is no living creature at all, reply: nothing",
-                        'images': [img_b64],
-                    }],
-                    options={'num_ctx': 512},
-                    keep_alive='30m',
-                )
-                fb_raw = fb_response.message.content.strip()
-                logger.info(f"Fallback Ollama response: {fb_raw}")
-                # Extract creature name — scan for keywords in response too
-                fb_lower = fb_raw.lower()
-                _nothing = {'nothing', 'none', 'no', 'empty', 'n/a', ''}
-                for kw, name in _kw_map:
-                    if kw in fb_lower:
-                        logger.info(f"Fallback keyword match: {name}")
-                        return name, confidence, False, None, None, 'none', False
-                # Use the first line if it looks like a short creature name
-                fb_line = fb_raw.split('\n')[0].strip()
-                if fb_line.lower() not in _nothing and 1 < len(fb_line) < 50:
-                    pest_name = fb_line.title() if fb_line.islower() else fb_line
-                    logger.info(f"Fallback creature: {pest_name}")
-                    return pest_name, confidence, False, None, None, 'none', False
-            except Exception as fb_err:
-                logger.warning(f"Fallback detection failed: {fb_err}")
-
-            logger.info(f'No creature detected (confidence {confidence:.2%})')
-            return None, confidence, False, None, None, 'none', True
-
-        # Format B non-traditional creature
-        if match_type == 'NO':
-            is_traditional_pest = False
-            if not threat_level:
-                threat_level = 'none'
-            logger.info(f'Non-traditional creature: {pest_name} threat={threat_level} confidence={confidence:.2%}')
-            return pest_name, confidence, False, scientific_name, description, threat_level, is_traditional_pest
+def _classification_conversation(img_b64, fields):
+    """The classification exchange as a message list that later turns can extend.
 
-        # Format A — validate known pest name
-        is_known_pest = True
-        if pest_name not in class_names:
-            for class_name in class_names:
-                if class_name.lower() in (pest_name or '').lower() or (pest_name or '').lower() in class_name.lower():
-                    pest_name = class_name
-                    break
-            else:
-                # Model used MATCH: YES for a creature not on the list — demote to non-traditional
-                logger.info(f'Model used MATCH: YES for unknown pest "{pest_name}" — treating as non-traditional creature')
-                is_known_pest = False
-                is_traditional_pest = False
-                if not threat_level or threat_level == 'medium':
-                    threat_level = 'low'
-                logger.info(f'Non-traditional creature: {pest_name} threat={threat_level} confidence={confidence:.2%}')
-                return pest_name, confidence, False, scientific_name, description, threat_level, is_traditional_pest
-
-        # Use static threat level for known pests
-        if is_known_pest:
-            threat_level = get_threat_level(pest_name)
-            is_traditional_pest = True
-
-        logger.info(f"Prediction: {pest_name} known={is_known_pest} traditional={is_traditional_pest} threat={threat_level} confidence={confidence:.2%}")
-        return pest_name, confidence, is_known_pest, scientific_name, description, threat_level, is_traditional_pest
-        
+    Sent again with the same options, its prefix matches what Ollama already
+    has in the KV cache, so the image is not re-encoded. The assistant turn is
+    the parsed fields as JSON — the streamed text may stop mid-object.
+    """
+    return _classification_messages(img_b64) + [{'role': 'assistant', 'content': json.dumps(fields)}]
+
+
+# Cap on classification decode length — a full reply fits well within this
+CLASSIFY_NUM_PREDICT = 160
+
+# pest / creature values that mean nothing living was found
+_NO_CREATURE_VALUES = {'none', 'n/a', 'nothing', 'no', 'empty', 'unknown', 'no creature', 'no creature detected', ''}
+
+
+def _is_no_creature(value):
+    return str(value or '').strip().lower() in _NO_CREATURE_VALUES
+
+
+def _classification_complete(fields):
+    """True once the reply has every field _interpret_classification uses."""
+    if 'match' not in fields:
+        return False
+    if fields['match'] is True:
+        needed = ('pest', 'confidence', 'threat')
+    elif _is_no_creature(fields.get('pest')):
+        # Nothing named as the subject — wait for the creature-name fallback
+        needed = ('pest', 'confidence', 'threat', 'creature')
+    else:
+        needed = ('pest', 'confidence', 'threat', 'scientific_name')
+    return all(name in fields for name in needed)
+
+
+def _stream_classification(img_b64, parser, priority=PRIORITY_INTERACTIVE,
+                           model=OLLAMA_MODEL, complete=_classification_complete):
+    """Yield (field, value) pairs from a streamed classification.
+
+    Generation is cut off as soon as complete(fields) holds — by default once
+    the fields needed for the detected format have arrived — so the model
+    never decodes the unused remainder.
+    """
+    chunks = _ollama_chat_stream(
+        messages=_classification_messages(img_b64),
+        options={'num_predict': CLASSIFY_NUM_PREDICT},
+        priority=priority,
+        model=model,
+        format=CLASSIFY_SCHEMA,
+    )
+    try:
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+            if complete(parser.fields):
+                logger.info("Classification fields complete — stopping generation early")
+                return
+        yield from parser.close()
+    finally:
+        chunks.close()
+
+
+def _fast_tier_done(fields):
+    """Stop the fast tier once it has a full match or has said there is none."""
+    return 'match' in fields and (fields['match'] is not True or _classification_complete(fields))
+
+
+def _fast_tier_accepts(fields):
+    """True when a fast-tier reply is a confident match on a curated pest.
+
+    Only exact name and alias matches count: fuzzy or word-containment
+    matches (a 'Bee Fly' read as Bees) go to the full model instead.
+    """
+    if fields.get('match') is not True or not _catalog.resolve(str(fields.get('pest', '')), fuzzy=False):
+        return False
+    confidence = fields.get('confidence')
+    return isinstance(confidence, (int, float)) and confidence >= CASCADE_MIN_CONFIDENCE
+
+
+class _CascadeStats:
+    """Per-tier call counts, outcomes and latency of the classification cascade."""
+
+    def __init__(self, fast_model):
+        self.fast_model = fast_model
+        self._lock = threading.Lock()
+        self._tiers = {}
+
+    def record(self, tier, outcome, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            counts = self._tiers.setdefault(tier, {'calls': 0, 'total_ms': 0.0})
+            counts['calls'] += 1
+            counts['total_ms'] += elapsed
+            counts[outcome] = counts.get(outcome, 0) + 1
+
+    def disable(self, reason):
+        logger.warning(f"Fast classification tier disabled: {reason}")
+        self.fast_model = None
+
+    def stats(self):
+        with self._lock:
+            tiers = {}
+            for tier, counts in self._tiers.items():
+                summary = {k: v for k, v in counts.items() if k != 'total_ms'}
+                summary['avg_ms'] = round(counts['total_ms'] / counts['calls'], 1)
+                if tier == 'fast':
+                    summary['hit_rate'] = round(counts.get('accepted', 0) / counts['calls'], 3)
+                tiers[tier] = summary
+            return {'fast_model': self.fast_model, 'full_model': OLLAMA_MODEL, 'tiers': tiers}
+
+
+_cascade = _CascadeStats(CASCADE_FAST_MODEL)
+
+
+def _fast_tier_failed(e, started):
+    """Record a fast-tier error; a missing model turns the tier off."""
+    _cascade.record('fast', 'error', started)
+    if isinstance(e, _ollama().ResponseError) and e.status_code == 404:
+        _cascade.disable(f"{_cascade.fast_model} is not available ({e})")
+    else:
+        logger.warning(f"Fast classification tier failed, escalating: {e}")
+
+
+def _classify_fast(img_b64, priority=PRIORITY_INTERACTIVE):
+    """Run the fast tier. Returns its parser when the answer can be used as-is,
+    otherwise None and the caller escalates to the full model."""
+    model = _cascade.fast_model
+    if not model:
+        return None
+    started = time.perf_counter()
+    parser = _JsonFieldParser()
+    try:
+        for _ in _stream_classification(img_b64, parser, priority, model=model, complete=_fast_tier_done):
+            pass
+    except SchedulerBusy:
+        raise
     except Exception as e:
-        logger.error(f"Error in predict_image: {str(e)}", exc_info=True)
+        _fast_tier_failed(e, started)
+        return None
+    if not _fast_tier_accepts(parser.fields):
+        logger.info(f"Fast tier unsure ({parser.fields}) — escalating to {OLLAMA_MODEL}")
+        _cascade.record('fast', 'escalated', started)
+        return None
+    logger.info(f"Fast tier answered: {parser.fields}")
+    _cascade.record('fast', 'accepted', started)
+    return parser
+
+
+def _classify_image(img_b64, priority=PRIORITY_INTERACTIVE):
+    """Classify with the cascade. Returns (result, fields); fields are the full
+    model's parsed reply, or None when the fast tier answered."""
+    try:
+        fast = _classify_fast(img_b64, priority)
+        if fast is not None:
+            return _interpret_classification(fast.fields), None
+
+        logger.info("Sending image to Ollama for analysis")
+        started = time.perf_counter()
+        parser = _JsonFieldParser()
+        for _ in _stream_classification(img_b64, parser, priority):
+            pass
+        logger.info(f"Ollama response: {parser.text}")
+        result = _interpret_classification(parser.fields)
+        _cascade.record('full', 'answered', started)
+        return result, parser.fields
+
+    except Exception as e:
+        logger.error(f"Error in _classify_image: {str(e)}", exc_info=True)
         raise
 
-def generate_pest_info(pest_name, scientific_name, image_bytes, is_traditional_pest=True):
-    """Generate comprehensive pest information using Ollama AI"""
+
+def _interpret_classification(fields):
+    """Turn the structured classification reply into predict_image's result tuple."""
+    is_match = fields.get('match') is True
+    pest_name = str(fields.get('pest') or '').strip() or None
+    scientific_name = str(fields.get('scientific_name') or '').strip() or None
+    description = None
+    threat_level = fields.get('threat') if fields.get('threat') in ('high', 'medium', 'low', 'none') else 'medium'
+    is_traditional_pest = True
     try:
-        image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+        confidence = max(0.0, min(1.0, float(fields.get('confidence', 0.75))))
+    except (TypeError, ValueError):
+        confidence = 0.75
 
-        dynamic_pests_dir = os.path.join('public_assets', 'images', 'dynamic_pests')
-        os.makedirs(dynamic_pests_dir, exist_ok=True)
-        safe_filename = pest_name.lower().replace(' ', '_') + '.jpg'
-        image_path = os.path.join(dynamic_pests_dir, safe_filename)
-        image.save(image_path, 'JPEG', quality=95)
-        logger.info(f"Saved dynamic pest image to {image_path}")
-        image_url = f'dynamic_pests/{safe_filename}'
+    # No subject named — fall back to the creature field from the same reply
+    if not is_match and _is_no_creature(pest_name):
+        creature = str(fields.get('creature') or '').strip()
+        if not _is_no_creature(creature) and len(creature) < 50:
+            pest_name = creature.title() if creature.islower() else creature
+            logger.info(f"Creature-name fallback: {pest_name}")
+            return pest_name, confidence, False, None, None, 'none', False
+
+        logger.info(f'No creature detected (confidence {confidence:.2%})')
+        return None, confidence, False, None, None, 'none', True
+
+    # Non-traditional creature
+    if not is_match:
+        is_traditional_pest = False
+        logger.info(f'Non-traditional creature: {pest_name} threat={threat_level} confidence={confidence:.2%}')
+        return pest_name, confidence, False, scientific_name, description, threat_level, is_traditional_pest
+
+    # Format A — validate known pest name
+    is_known_pest = True
+    if pest_name not in class_names:
+        canonical = _catalog.resolve_reply(pest_name)
+        if canonical:
+            pest_name = canonical
+        else:
+            # Model said match for a creature not on the list — demote to non-traditional
+            logger.info(f'Model matched unknown pest "{pest_name}" — treating as non-traditional creature')
+            is_known_pest = False
+            is_traditional_pest = False
+            if not threat_level or threat_level == 'medium':
+                threat_level = 'low'
+            logger.info(f'Non-traditional creature: {pest_name} threat={threat_level} confidence={confidence:.2%}')
+            return pest_name, confidence, False, scientific_name, description, threat_level, is_traditional_pest
 
-        if is_traditional_pest:
-            prompt = f"""You are an agricultural pest expert. Provide comprehensive information about {pest_name} ({scientific_name or 'provide scientific name'}).
+    # Use static threat level for known pests
+    if is_known_pest:
+        threat_level = get_threat_level(pest_name)
+        is_traditional_pest = True
+
+    logger.info(f"Prediction: {pest_name} known={is_known_pest} traditional={is_traditional_pest} threat={threat_level} confidence={confidence:.2%}")
+    return pest_name, confidence, is_known_pest, scientific_name, description, threat_level, is_traditional_pest
+
+
+def _parse_profile_reply(response_text, pest_data):
+    """Fill pest_data from a SCIENTIFIC_NAME/DESCRIPTION/SYMPTOMS/... profile reply."""
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line.startswith('SCIENTIFIC_NAME:'):
+            pest_data['scientific_name'] = line.replace('SCIENTIFIC_NAME:', '').strip()
+        elif line.startswith('DESCRIPTION:'):
+            pest_data['description'] = line.replace('DESCRIPTION:', '').strip()
+        elif line.startswith('SYMPTOMS:'):
+            pest_data['symptoms'] = [s.strip() for s in line.replace('SYMPTOMS:', '').strip().split('|||') if s.strip()]
+        elif line.startswith('CONCERNS:'):
+            pest_data['symptoms'] = [s.strip() for s in line.replace('CONCERNS:', '').strip().split('|||') if s.strip()]
+        elif line.startswith('ORGANIC_TREATMENT:'):
+            pest_data['organic_treatment'] = [t.strip() for t in line.replace('ORGANIC_TREATMENT:', '').strip().split('|||') if t.strip()]
+        elif line.startswith('MANAGEMENT:'):
+            pest_data['organic_treatment'] = [t.strip() for t in line.replace('MANAGEMENT:', '').strip().split('|||') if t.strip()]
+        elif line.startswith('CHEMICAL_TREATMENT:'):
+            pest_data['chemical_treatment'] = [t.strip() for t in line.replace('CHEMICAL_TREATMENT:', '').strip().split('|||') if t.strip()]
+        elif line.startswith('PREVENTION:'):
+            pest_data['prevention'] = [p.strip() for p in line.replace('PREVENTION:', '').strip().split('|||') if p.strip()]
+        elif line.startswith('SPECIES_1_NAME:'):
+            pest_data['_species_1_name'] = line.replace('SPECIES_1_NAME:', '').strip()
+        elif line.startswith('SPECIES_1_DESC:'):
+            pest_data['common_species'].append({'name': pest_data.get('_species_1_name', 'Species 1'), 'description': line.replace('SPECIES_1_DESC:', '').strip()})
+        elif line.startswith('SPECIES_2_NAME:'):
+            pest_data['_species_2_name'] = line.replace('SPECIES_2_NAME:', '').strip()
+        elif line.startswith('SPECIES_2_DESC:'):
+            pest_data['common_species'].append({'name': pest_data.get('_species_2_name', 'Species 2'), 'description': line.replace('SPECIES_2_DESC:', '').strip()})
+        elif line.startswith('SPECIES_3_NAME:'):
+            pest_data['_species_3_name'] = line.replace('SPECIES_3_NAME:', '').strip()
+        elif line.startswith('SPECIES_3_DESC:'):
+            pest_data['common_species'].append({'name': pest_data.get('_species_3_name', 'Species 3'), 'description': line.replace('SPECIES_3_DESC:', '').strip()})
+    return pest_data
+
+
+def _profile_prompt(pest_name, scientific_name, is_traditional_pest=True):
+    """Profile-generation prompt for a pest (or, for other creatures, a wildlife profile)."""
+    if is_traditional_pest:
+        return f"""You are an agricultural pest expert. Provide comprehensive information about {pest_name} ({scientific_name or 'provide scientific name'}).
 
 Respond in this EXACT format (fill in real values — no brackets in your output):
 
@@ -991,8 +2821,8 @@ SPECIES_3_NAME: third common species name
 SPECIES_3_DESC: description of third species
 
 Be specific and professional. Use ||| to separate list items. Do not include brackets."""
-        else:
-            prompt = f"""You are a wildlife and environmental expert. Provide comprehensive information about {pest_name} ({scientific_name or 'provide scientific name'}) in an agricultural or outdoor context.
+    else:
+        return f"""You are a wildlife and environmental expert. Provide comprehensive information about {pest_name} ({scientific_name or 'provide scientific name'}) in an agricultural or outdoor context.
 
 Respond in this EXACT format (fill in real values — no brackets in your output):
 
@@ -1010,99 +2840,105 @@ SPECIES_3_DESC: description of third species
 
 Be specific and professional. Use ||| to separate list items. Do not include brackets."""
 
-        response = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[{
-                'role': 'user',
-                'content': prompt,
-                'images': [_pil_to_b64(image)],
-            }],
-            options={'num_ctx': 2048},
-            keep_alive='30m',
-        )
-        response_text = response.message.content.strip()
-        logger.info(f"Generated pest info for {pest_name}")
-        
-        # Parse the response
-        pest_data = {
-            'name': pest_name,
-            'scientific_name': scientific_name or pest_name,
-            'image': image_url,
-            'description': '',
-            'symptoms': [],
-            'organic_treatment': [],
-            'chemical_treatment': [],
-            'prevention': [],
-            'common_species': [],
-            'is_traditional_pest': is_traditional_pest,
-        }
 
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('SCIENTIFIC_NAME:'):
-                pest_data['scientific_name'] = line.replace('SCIENTIFIC_NAME:', '').strip()
-            elif line.startswith('DESCRIPTION:'):
-                pest_data['description'] = line.replace('DESCRIPTION:', '').strip()
-            elif line.startswith('SYMPTOMS:'):
-                pest_data['symptoms'] = [s.strip() for s in line.replace('SYMPTOMS:', '').strip().split('|||') if s.strip()]
-            elif line.startswith('CONCERNS:'):
-                pest_data['symptoms'] = [s.strip() for s in line.replace('CONCERNS:', '').strip().split('|||') if s.strip()]
-            elif line.startswith('ORGANIC_TREATMENT:'):
-                pest_data['organic_treatment'] = [t.strip() for t in line.replace('ORGANIC_TREATMENT:', '').strip().split('|||') if t.strip()]
-            elif line.startswith('MANAGEMENT:'):
-                pest_data['organic_treatment'] = [t.strip() for t in line.replace('MANAGEMENT:', '').strip().split('|||') if t.strip()]
-            elif line.startswith('CHEMICAL_TREATMENT:'):
-                pest_data['chemical_treatment'] = [t.strip() for t in line.replace('CHEMICAL_TREATMENT:', '').strip().split('|||') if t.strip()]
-            elif line.startswith('PREVENTION:'):
-                pest_data['prevention'] = [p.strip() for p in line.replace('PREVENTION:', '').strip().split('|||') if p.strip()]
-            elif line.startswith('SPECIES_1_NAME:'):
-                pest_data['_species_1_name'] = line.replace('SPECIES_1_NAME:', '').strip()
-            elif line.startswith('SPECIES_1_DESC:'):
-                pest_data['common_species'].append({'name': pest_data.get('_species_1_name', 'Species 1'), 'description': line.replace('SPECIES_1_DESC:', '').strip()})
-            elif line.startswith('SPECIES_2_NAME:'):
-                pest_data['_species_2_name'] = line.replace('SPECIES_2_NAME:', '').strip()
-            elif line.startswith('SPECIES_2_DESC:'):
-                pest_data['common_species'].append({'name': pest_data.get('_species_2_name', 'Species 2'), 'description': line.replace('SPECIES_2_DESC:', '').strip()})
-            elif line.startswith('SPECIES_3_NAME:'):
-                pest_data['_species_3_name'] = line.replace('SPECIES_3_NAME:', '').strip()
-            elif line.startswith('SPECIES_3_DESC:'):
-                pest_data['common_species'].append({'name': pest_data.get('_species_3_name', 'Species 3'), 'description': line.replace('SPECIES_3_DESC:', '').strip()})
+# Prompt size estimate for follow-up turns. If the conversation and the reply
+# don't fit in num_ctx, Ollama drops the start of the prompt — the image.
+CONTEXT_CHARS_PER_TOKEN = 3    # conservative for English prompt text
+CONTEXT_IMAGE_TOKENS = (image_pipeline.MODEL_IMAGE_SIZE // 28) ** 2   # one 28px token per patch
+CONTEXT_MESSAGE_TOKENS = 8     # chat template tokens around each message
+PROFILE_REPLY_TOKENS = 900     # room kept for the profile reply
+
+
+def _estimate_tokens(messages):
+    """Rough prompt size of messages in tokens."""
+    return sum(len(m['content']) // CONTEXT_CHARS_PER_TOKEN + CONTEXT_MESSAGE_TOKENS
+               + CONTEXT_IMAGE_TOKENS * len(m.get('images') or ()) for m in messages)
+
+
+def _image_profile_messages(image, prompt):
+    """Messages for an image profile call.
+
+    When the upload was classified by the model, the profile prompt is sent as
+    a follow-up turn of that conversation so Ollama reuses the cached image
+    prefix; otherwise (cached classification, or a conversation that would
+    not leave room for the reply in num_ctx) it starts a fresh conversation.
+    """
+    if image.conversation:
+        messages = image.conversation + [{'role': 'user', 'content': prompt}]
+        if _estimate_tokens(messages) + PROFILE_REPLY_TOKENS <= MODEL_OPTIONS['num_ctx']:
+            return messages
+        logger.info("Classification conversation too long for num_ctx — sending the profile prompt alone")
+    img_b64, _ = image.model_input()
+    return [{'role': 'user', 'content': prompt, 'images': [img_b64]}]
+
+
+def _image_profile(pest_name, scientific_name, image_url, is_traditional_pest, response):
+    """Build the stored profile from the model's reply to an image profile call."""
+    logger.info(f"Profile for {pest_name}: prompt_eval_count={response.get('prompt_eval_count')} "
+                f"prompt_eval_duration={(response.get('prompt_eval_duration') or 0) / 1e6:.0f}ms")
+    response_text = response.message.content.strip()
+    logger.info(f"Generated pest info for {pest_name}")
+
+    pest_data = {
+        'name': pest_name,
+        'scientific_name': scientific_name or pest_name,
+        'image': image_url,
+        'description': '',
+        'symptoms': [],
+        'organic_treatment': [],
+        'chemical_treatment': [],
+        'prevention': [],
+        'common_species': [],
+        'is_traditional_pest': is_traditional_pest,
+    }
+    return _parse_profile_reply(response_text, pest_data)
+
+
+def generate_pest_info(pest_name, scientific_name, image, is_traditional_pest=True):
+    """Generate comprehensive pest information using Ollama AI.
+
+    `image` is the request's _UploadImage, so the thumbnail and stored copy
+    made while classifying are reused rather than rebuilt.
+    """
+    try:
+        # The upload route stored the image when it queued this job
+        image_url = image.stored or image.store(pest_name.lower().replace(' ', '_'))
+        prompt = _profile_prompt(pest_name, scientific_name, is_traditional_pest)
+        response = _ollama_chat(
+            messages=_image_profile_messages(image, prompt),
+            priority=PRIORITY_BACKGROUND,
+        )
+        return _image_profile(pest_name, scientific_name, image_url, is_traditional_pest, response)
 
-        return pest_data
-        
     except Exception as e:
         logger.error(f"Error generating pest info: {str(e)}", exc_info=True)
         return None
 
-def generate_pest_info_text(pest_name, scientific_name):
-    """Generate comprehensive pest information using Gemini AI (text-only, no image)"""
+def generate_pest_info_text(pest_name, scientific_name, is_traditional_pest=True,
+                           priority=PRIORITY_TEXT, interrupt=None):
+    """Generate comprehensive pest information using Ollama AI (text-only, no image).
+
+    With `interrupt`, the reply is streamed and generation is abandoned (returning
+    None) as soon as interrupt() is true — used by the prewarm job to give the
+    model back to foreground requests.
+    """
     try:
-        prompt = f"""You are an agricultural pest expert. Provide comprehensive information about {pest_name} ({scientific_name or 'provide scientific name'}).
-
-Respond in this EXACT format:
-
-SCIENTIFIC_NAME: [scientific name]
-DESCRIPTION: [2-3 sentences about the pest]
-SYMPTOMS: [5 damage symptoms, separated by ||| ]
-ORGANIC_TREATMENT: [5 organic treatment methods, separated by ||| ]
-CHEMICAL_TREATMENT: [5 chemical treatment methods, separated by ||| ]
-PREVENTION: [5 prevention strategies, separated by ||| ]
-SPECIES_1_NAME: [common species name]
-SPECIES_1_DESC: [description]
-SPECIES_2_NAME: [common species name]
-SPECIES_2_DESC: [description]
-SPECIES_3_NAME: [common species name]
-SPECIES_3_DESC: [description]
-
-Be specific and professional. Use ||| as separator for list items."""
-
-        response = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[{'role': 'user', 'content': prompt}],
-            options={'num_ctx': 2048},
-            keep_alive='30m',
-        )
-        response_text = response.message.content.strip()
+        messages = [{'role': 'user', 'content': _profile_prompt(pest_name, scientific_name, is_traditional_pest)}]
+        if interrupt is None:
+            response = _ollama_chat(messages=messages, priority=priority)
+            response_text = response.message.content.strip()
+        else:
+            chunks = _ollama_chat_stream(messages, priority=priority)
+            parts = []
+            try:
+                for chunk in chunks:
+                    if interrupt():
+                        logger.info(f"Generation for {pest_name} interrupted")
+                        return None
+                    parts.append(chunk)
+            finally:
+                chunks.close()
+            response_text = ''.join(parts).strip()
         logger.info(f"Generated pest info for {pest_name}")
         
         # Parse the response
@@ -1115,52 +2951,122 @@ Be specific and professional. Use ||| as separator for list items."""
             'organic_treatment': [],
             'chemical_treatment': [],
             'prevention': [],
-            'common_species': []
+            'common_species': [],
+            'is_traditional_pest': is_traditional_pest,
         }
         
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('SCIENTIFIC_NAME:'):
-                pest_data['scientific_name'] = line.replace('SCIENTIFIC_NAME:', '').strip()
-            elif line.startswith('DESCRIPTION:'):
-                pest_data['description'] = line.replace('DESCRIPTION:', '').strip()
-            elif line.startswith('SYMPTOMS:'):
-                symptoms_text = line.replace('SYMPTOMS:', '').strip()
-                pest_data['symptoms'] = [s.strip() for s in symptoms_text.split('|||') if s.strip()]
-            elif line.startswith('ORGANIC_TREATMENT:'):
-                treatment_text = line.replace('ORGANIC_TREATMENT:', '').strip()
-                pest_data['organic_treatment'] = [t.strip() for t in treatment_text.split('|||') if t.strip()]
-            elif line.startswith('CHEMICAL_TREATMENT:'):
-                treatment_text = line.replace('CHEMICAL_TREATMENT:', '').strip()
-                pest_data['chemical_treatment'] = [t.strip() for t in treatment_text.split('|||') if t.strip()]
-            elif line.startswith('PREVENTION:'):
-                prevention_text = line.replace('PREVENTION:', '').strip()
-                pest_data['prevention'] = [p.strip() for p in prevention_text.split('|||') if p.strip()]
-            elif line.startswith('SPECIES_1_NAME:'):
-                species_name = line.replace('SPECIES_1_NAME:', '').strip()
-                pest_data['_species_1_name'] = species_name
-            elif line.startswith('SPECIES_1_DESC:'):
-                species_desc = line.replace('SPECIES_1_DESC:', '').strip()
-                pest_data['common_species'].append({'name': pest_data.get('_species_1_name', 'Common Species 1'), 'description': species_desc})
-            elif line.startswith('SPECIES_2_NAME:'):
-                species_name = line.replace('SPECIES_2_NAME:', '').strip()
-                pest_data['_species_2_name'] = species_name
-            elif line.startswith('SPECIES_2_DESC:'):
-                species_desc = line.replace('SPECIES_2_DESC:', '').strip()
-                pest_data['common_species'].append({'name': pest_data.get('_species_2_name', 'Common Species 2'), 'description': species_desc})
-            elif line.startswith('SPECIES_3_NAME:'):
-                species_name = line.replace('SPECIES_3_NAME:', '').strip()
-                pest_data['_species_3_name'] = species_name
-            elif line.startswith('SPECIES_3_DESC:'):
-                species_desc = line.replace('SPECIES_3_DESC:', '').strip()
-                pest_data['common_species'].append({'name': pest_data.get('_species_3_name', 'Common Species 3'), 'description': species_desc})
-        
+        _parse_profile_reply(response_text, pest_data)
+
         return pest_data
         
     except Exception as e:
         logger.error(f"Error generating pest info: {str(e)}", exc_info=True)
         return None
 
+def _load_watchlist(path=WATCHLIST_PATH):
+    """Parse the watchlist file into (name, scientific_name, is_traditional_pest) entries.
+
+    One creature per line: `Name | Scientific name | pest|creature`. The last
+    two fields are optional; blank lines and `#` comments are ignored. Names
+    /predict resolves to a curated pest are skipped — they never use a
+    generated profile.
+    """
+    entries = []
+    try:
+        with open(path, encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        logger.info(f"No watchlist at {path}")
+        return entries
+    for line in lines:
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        name, scientific_name, kind = (part.strip() for part in (line.split('|') + ['', ''])[:3])
+        curated = _catalog.resolve_reply(name)
+        if curated:
+            logger.warning(f"Watchlist entry {name!r} resolves to the curated {curated!r} — skipped")
+            continue
+        entries.append((name, scientific_name, kind.lower() != 'creature'))
+    return entries
+
+
+class _Prewarmer:
+    """Generates profiles for watchlist creatures before anyone photographs them.
+
+    Profiles land in the profile store under the same key /predict derives
+    from the model's PEST name, so a first encounter finds them complete.
+    """
+
+    def __init__(self, store, scheduler):
+        self._store = store
+        self._scheduler = scheduler
+        self._lock = threading.Lock()   # one prewarm pass at a time
+        self.generated = 0
+        self.interrupted = 0
+
+    def pending(self, entries):
+        """Watchlist entries with no usable profile yet."""
+        return [e for e in entries if self._store.status(e[0].lower().replace(' ', '_')) in (None, 'error')]
+
+    def warm(self, entry, interrupt=None):
+        """Generate and store one entry's profile. Returns True when stored."""
+        name, scientific_name, is_traditional_pest = entry
+        pest_key = name.lower().replace(' ', '_')
+        profile = generate_pest_info_text(name, scientific_name, is_traditional_pest,
+                                          priority=PRIORITY_PREWARM, interrupt=interrupt)
+        if profile is None:
+            if interrupt and interrupt():
+                self.interrupted += 1
+            return False
+        # An upload may have queued image generation meanwhile — let that win
+        if self._store.status(pest_key) in (None, 'error'):
+            self._store.mark_complete(pest_key, profile)
+            self.generated += 1
+            logger.info(f"Prewarmed profile for {name}")
+        return True
+
+    def warm_all(self, entries):
+        """Warm every pending entry in turn, yielding (entry, stored)."""
+        with self._lock:
+            for entry in self.pending(entries):
+                yield entry, self.warm(entry)
+
+    def run_forever(self, idle_seconds):
+        """Background loop: warm one entry at a time, only after idle_seconds of
+        no foreground inference, and abandon it the moment foreground work arrives."""
+        while True:
+            time.sleep(idle_seconds / 4)
+            if self._scheduler.idle_for() < idle_seconds:
+                continue
+            with self._lock:
+                todo = self.pending(_load_watchlist())
+                if todo:
+                    self.warm(todo[0], interrupt=self._scheduler.busy)
+
+    def stats(self):
+        return {'generated': self.generated, 'interrupted': self.interrupted}
+
+
+_prewarmer = _Prewarmer(_profiles, _scheduler)
+
+
+@app.cli.command('prewarm')
+@click.option('--watchlist', default=WATCHLIST_PATH, show_default=True, help='Watchlist file to read.')
+def prewarm_command(watchlist):
+    """Generate profiles for every watchlist creature that doesn't have one yet.
+
+    Meant for deploy time, before or alongside the server.
+    """
+    _ensure_ollama_running()
+    warmed = 0
+    for (name, _, _), stored in _prewarmer.warm_all(_load_watchlist(watchlist)):
+        click.echo(f"{name}: {'ok' if stored else 'failed'}")
+        warmed += 1
+    if not warmed:
+        click.echo('Every watchlist entry already has a profile')
+
+
 def is_pest(class_name, confidence):
     # Placeholder function - in reality, this would use the actual model's confidence threshold
     # and potentially additional verification steps
@@ -1178,20 +3084,126 @@ def classify():
 def about():
     return render_template('about.html')
 
+class _RenderedPage:
+    __slots__ = ('body', 'gzipped', 'etag')
+
+    def __init__(self, body):
+        self.body = body.encode('utf-8')
+        self.gzipped = gzip.compress(self.body, RENDER_GZIP_LEVEL, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+class _RenderCache:
+    """Rendered HTML for pages that only change when their profile does.
+
+    Generated profiles are keyed by pest_key and dropped by invalidate(),
+    which the profile store calls on every change. Curated pages use tuple
+    keys and live until eviction.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._pages = OrderedDict()   # key -> _RenderedPage
+        self._lock = threading.Lock()
+        self._invalidations = 0       # a render that overlaps one is not stored
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        """The cached page for key, rendering it with render() on a miss."""
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+            invalidations = self._invalidations
+        page = _RenderedPage(render())
+        with self._lock:
+            if invalidations != self._invalidations:
+                return page
+            self._pages[key] = page
+            while len(self._pages) > self.max_size:
+                self._pages.popitem(last=False)
+        return page
+
+    def invalidate(self, key):
+        with self._lock:
+            self._invalidations += 1
+            self._pages.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._pages.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._pages),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+_rendered_pages = _RenderCache(RENDER_CACHE_SIZE)
+_profiles.listeners.append(_rendered_pages.invalidate)
+
+
+def _image_variants_ready(path):
+    """Drop rendered pages that were built before path had variants."""
+    if path.startswith('dynamic_pests/'):
+        for pest_key in _dynamic_images.referrers(path):
+            _rendered_pages.invalidate(pest_key)
+    else:
+        _rendered_pages.clear()
+
+
+_image_variants.listeners.append(_image_variants_ready)
+
+
+@app.cli.command('build-images')
+def build_images_command():
+    """Encode WebP variants for every image under public_assets/images."""
+    _image_variants.build_all()
+    click.echo(f"{_image_variants.stats()}")
+
+
+def _cached_page(key, render):
+    """Serve a cached rendered page: strong ETag, 304 on a match, gzip when accepted."""
+    page = _rendered_pages.get(key, render)
+    if request.accept_encodings['gzip']:
+        response = Response(page.gzipped, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(page.etag + '-gz')
+    else:
+        response = Response(page.body, mimetype='text/html')
+        response.set_etag(page.etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
 @app.route('/pest/<pest_name>')
 def pest_details(pest_name):
-    pest_name_normalized = pest_name.replace('_', ' ').title()
+    canonical = _catalog.resolve(pest_name, fuzzy=False, names_only=True)
 
-    if pest_name_normalized in pest_info:
-        return render_template('pest_info.html', pest=pest_info[pest_name_normalized], pending=False, error=False)
+    if canonical:
+        return _cached_page(('curated', canonical), lambda: render_template(
+            'pest_info.html', pest=pest_info[canonical], pending=False, error=False))
 
     pest_key = pest_name.lower()
-    status = _generation_jobs.get(pest_key)
+    status = _profiles.status(pest_key)
 
-    if status == 'complete' and pest_key in _dynamic_pests:
-        return render_template('pest_info.html', pest=_dynamic_pests[pest_key], pending=False, error=False)
+    if status == 'complete':
+        return _cached_page(pest_key, lambda: render_template(
+            'pest_info.html', pest=_profiles.profile(pest_key), pending=False, error=False))
     if status == 'pending':
-        meta = _pending_metadata.get(pest_key, {})
+        meta = _profiles.metadata(pest_key)
         return render_template('pest_info.html', pest=None, pending=True, error=False,
                                pest_key=pest_key,
                                pending_name=meta.get('name', pest_name.replace('_', ' ').title()),
@@ -1204,14 +3216,435 @@ def pest_details(pest_name):
 
 @app.route('/pest_status/<pest_key>')
 def pest_status(pest_key):
-    status = _generation_jobs.get(pest_key)
+    """Generation status. With ?wait=N the request is held (long-poll) until
+    the profile completes or errors, for at most N seconds."""
+    wait = min(request.args.get('wait', 0, type=float), STATUS_WAIT_TIMEOUT)
+    if wait > 0:
+        status, waited = _profiles.wait_until_settled(pest_key, wait)
+    else:
+        status, waited = _profiles.status(pest_key), False
     if status is None:
         return jsonify({'status': 'not_found'})
+    if status == 'pending' and not waited:
+        return jsonify({'status': status, 'retry_after': STATUS_RETRY_AFTER})
     return jsonify({'status': status})
 
+class _Lifecycle:
+    """Server startup, kept out of import so importing app is cheap and side-effect free.
+
+    start() fails jobs whose process has exited and reconciles the image
+    reference map with the stored profiles, then returns at once. Ollama startup,
+    health checks, model warm-up, image variants and idle prewarming run on
+    a background thread. It runs once per process. The state goes
+    'stopped' -> 'starting' -> 'warming' -> 'ready' (warm-up attempted).
+    """
+
+    def __init__(self):
+        self.created_at = time.time()
+        self.started_at = None
+        self.ready_at = None
+        self.state = 'stopped'
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.started_at is not None:
+                return False
+            self.started_at = time.time()
+            self.state = 'starting'
+        _profiles.recover()
+        _dynamic_images.sync(_profiles.images())
+        threading.Thread(target=self._run, name='startup', daemon=True).start()
+        return True
+
+    def _run(self):
+        _ensure_ollama_running()
+        threading.Thread(target=_ollama_pool.run_health_checks, args=(OLLAMA_HEALTH_INTERVAL,),
+                         name='ollama-health', daemon=True).start()
+        threading.Thread(target=_residency.run_forever, args=(_ollama_pool, RESIDENCY_CHECK_INTERVAL),
+                         name='residency', daemon=True).start()
+        threading.Thread(target=_image_variants.build_all, name='variants', daemon=True).start()
+        self.state = 'warming'
+        _warmup_model()
+        self.state = 'ready'
+        self.ready_at = time.time()
+        logger.info(f"Startup finished in {self.ready_at - self.started_at:.1f}s")
+        threading.Thread(target=_prewarmer.run_forever, args=(PREWARM_IDLE_SECONDS,),
+                         name='prewarm', daemon=True).start()
+
+    def ready(self):
+        """True once warm-up has run and some Ollama backend is healthy.
+
+        Residency is not required: an idle unload would otherwise report
+        not-ready until traffic arrived, which readiness itself holds back.
+        """
+        return self.state == 'ready' and any(b.healthy for b in _ollama_pool.backends)
+
+
+_lifecycle = _Lifecycle()
+
+
+@app.before_request
+def _start_lifecycle():
+    # WSGI servers import app without running it; the first request starts it
+    if _lifecycle.started_at is None:
+        _lifecycle.start()
+
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is serving. Never depends on Ollama."""
+    return jsonify({
+        'status': 'ok',
+        'state': _lifecycle.state,
+        'uptime': round(time.time() - _lifecycle.created_at, 1),
+        'ollama': [{'host': b.host, 'healthy': b.healthy} for b in _ollama_pool.backends],
+    })
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once warm-up has run and Ollama is reachable; residency is informational."""
+    ready = _lifecycle.ready()
+    return jsonify({
+        'ready': ready,
+        'state': _lifecycle.state,
+        'model': OLLAMA_MODEL,
+        'ollama': [{'host': b.host, 'healthy': b.healthy, 'resident': b.resident}
+                   for b in _ollama_pool.backends],
+    }), 200 if ready else 503
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'classification_cache': _classification_cache.stats(),
+        'ollama_single_flight': _ollama_flight.stats(),
+        'scheduler': _scheduler.stats(),
+        'cascade': _cascade.stats(),
+        'prefilter': _prefilter.stats(),
+        'ollama_backends': _ollama_pool.stats(),
+        'model_residency': _residency.stats(),
+        'prewarm': _prewarmer.stats(),
+        'preprocessing': _preprocess_timings.stats(),
+        'rendered_pages': _rendered_pages.stats(),
+        'image_variants': _image_variants.stats(),
+        'dynamic_images': _dynamic_images.stats(),
+    })
+
 @app.route('/pests')
 def pest_directory():
-    return render_template('pest_directory.html', pests=pest_info.values())
+    return _cached_page(('curated', 'directory'), lambda: render_template(
+        'pest_directory.html', pests=pest_info.values()))
+
+# Local retrieval over curated + generated profiles (BM25)
+SEARCH_MIN_SCORE = 0.5     # normalized BM25 score a hit needs to skip the model
+SEARCH_MAX_MATCHES = 5
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+_SEARCH_STOPWORDS = frozenset(
+    'a an and are as at be by can do for from how i in is it my of on or the their them these they this '
+    'to what when where which who why with'.split()
+)
+
+
+def _search_tokens(text):
+    return [_singular(w) for w in re.findall(r'[a-z0-9]+', (text or '').lower()) if w not in _SEARCH_STOPWORDS]
+
+
+def _profile_names(profile):
+    """Name, scientific name and common species names of a profile."""
+    return ' '.join([profile.get('name', ''), profile.get('scientific_name', '')]
+                    + [s.get('name', '') for s in profile.get('common_species', [])])
+
+
+def _profile_text(profile):
+    """Searchable text for a profile — names are repeated to weight them higher."""
+    return ' '.join([
+        _profile_names(profile), _profile_names(profile), profile.get('summary', ''),
+        profile.get('description', ''), ' '.join(profile.get('symptoms', [])),
+        ' '.join(s.get('description', '') for s in profile.get('common_species', [])),
+    ])
+
+
+class _ProfileSearchIndex:
+    """BM25 index over curated pest_info and every completed generated profile.
+
+    Postings are held as NumPy arrays so a query is a handful of vectorised
+    adds. The index is rebuilt lazily whenever the profile store's version
+    moves on (a new profile completed).
+    """
+
+    def __init__(self, curated, store):
+        self._curated = curated
+        self._store = store
+        self._lock = threading.Lock()
+        self._built_version = None
+        self._docs = []          # [(kind, key, name)] — kind is 'curated' or 'dynamic'
+        self._name_terms = []    # per-doc frozenset of name tokens
+        self._postings = {}      # term -> (doc indices, term frequencies)
+        self._idf = {}
+        self._norm = np.zeros(0)  # per-doc length normalisation k1 * (1 - b + b * dl / avgdl)
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_version == self._store.version:
+                return
+            version = self._store.version
+            docs, texts, name_terms = [], [], []
+            profiles = [('curated', key, pest) for key, pest in self._curated.items()]
+            profiles += [('dynamic', key, profile) for key, profile in self._store.completed()]
+            for kind, key, profile in profiles:
+                docs.append((kind, key, profile.get('name', key)))
+                texts.append(_search_tokens(_profile_text(profile)))
+                name_terms.append(frozenset(_search_tokens(_profile_names(profile))))
+
+            postings = {}
+            for doc_id, tokens in enumerate(texts):
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for token, tf in counts.items():
+                    postings.setdefault(token, ([], []))
+                    postings[token][0].append(doc_id)
+                    postings[token][1].append(tf)
+
+            n_docs = len(docs)
+            lengths = np.array([len(t) for t in texts], dtype=np.float32)
+            avg_length = lengths.mean() if n_docs else 1.0
+            self._docs = docs
+            self._name_terms = name_terms
+            self._postings = {t: (np.array(d, dtype=np.int32), np.array(f, dtype=np.float32))
+                              for t, (d, f) in postings.items()}
+            self._idf = {t: float(np.log(1 + (n_docs - len(d) + 0.5) / (len(d) + 0.5)))
+                         for t, (d, _) in postings.items()}
+            self._norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * lengths / avg_length)
+            self._built_version = version
+            logger.info(f"Search index built: {n_docs} profiles, {len(postings)} terms")
+
+    def search(self, query, limit=SEARCH_MAX_MATCHES):
+        """Ranked [(kind, key, name, score)] with scores normalized to 0–1.
+
+        Short queries are treated as names: a profile only ranks if a query
+        term is in its name, scientific name or species names. Otherwise
+        'aphid' would surface Ants, whose description talks about aphids.
+        """
+        self._ensure_built()
+        terms = set(_search_tokens(query))
+        if not terms or not self._docs:
+            return []
+        scores = np.zeros(len(self._docs), dtype=np.float32)
+        # Normalise against a document holding every term at saturated frequency;
+        # terms the index has never seen carry the maximum idf, so they pull the score down
+        unseen_idf = float(np.log(1 + (len(self._docs) + 0.5) / 0.5))
+        max_score = sum(self._idf.get(t, unseen_idf) for t in terms) * (_BM25_K1 + 1)
+        for term in terms & self._postings.keys():
+            doc_ids, tf = self._postings[term]
+            scores[doc_ids] += self._idf[term] * tf * (_BM25_K1 + 1) / (tf + self._norm[doc_ids])
+        if len(terms) < 3:
+            scores *= np.array([bool(terms & names) for names in self._name_terms])
+        top = np.argsort(-scores)[:limit]
+        return [(*self._docs[i], round(float(scores[i] / max_score), 4)) for i in top if scores[i] > 0]
+
+
+_search_index = _ProfileSearchIndex(pest_info, _profiles)
+
+
+def _curated_search_result(canonical):
+    known = pest_info[canonical]
+    pest_key = canonical.lower().replace(' ', '_')
+    return {
+        'is_pest': True,
+        'is_known': True,
+        'pest_data': {
+            'name': known['name'],
+            'scientific_name': known['scientific_name'],
+            'image': f"{request.host_url}assets/images/pests/{known['image']}",
+            'description': known['description'],
+            'symptoms': known['symptoms'],
+            'organic_treatment': known.get('organic_treatment', []),
+            'chemical_treatment': known.get('chemical_treatment', []),
+            'prevention': known.get('prevention', []),
+            'common_species': known.get('common_species', []),
+            'threat_level': get_threat_level(known['name']),
+            'category': get_category_display(known['name']),
+            'info_url': f'/pest/{pest_key}',
+        }
+    }
+
+
+def _stored_search_result(pest_key, stored):
+    stored_data = dict(stored)
+    stored_data.setdefault('threat_level', 'medium')
+    stored_data.setdefault('category', 'Crawling Pest')
+    stored_data.setdefault('info_url', f'/pest/{pest_key}')
+    return {
+        'is_pest': True,
+        'is_known': False,
+        'pest_data': stored_data,
+    }
+
+
+def _search_local(pest_query):
+    """Answer a search from the curated list or stored profiles, or return None."""
+    # First, check if it's in our known pests
+    canonical = _catalog.resolve(pest_query)
+    if canonical:
+        return _curated_search_result(canonical)
+
+    # Then check profiles we've already generated
+    stored_key = pest_query.lower().replace(' ', '_')
+    stored = _profiles.profile(stored_key)
+    if stored:
+        return _stored_search_result(stored_key, stored)
+
+    # Then rank everything we have locally — only ask the model if nothing is close
+    matches = _search_index.search(pest_query)
+    if not matches or matches[0][3] < SEARCH_MIN_SCORE:
+        return None
+    kind, key, _, score = matches[0]
+    logger.info(f"Local search hit for '{pest_query}': {key} ({score:.2f})")
+    if kind == 'curated':
+        result = _curated_search_result(key)
+    else:
+        stored = _profiles.profile(key)
+        if not stored:
+            return None
+        result = _stored_search_result(key, stored)
+    result['matches'] = [
+        {'name': name, 'info_url': f"/pest/{k.lower().replace(' ', '_')}", 'score': sc}
+        for _, k, name, sc in matches if sc >= SEARCH_MIN_SCORE
+    ]
+    return result
+
+
+def _search_messages(pest_query):
+    # One call answers whether it's a pest and, if so, returns the full profile
+    prompt = f"""Is "{pest_query}" an insect, arthropod, or other creature that could be considered a pest (including agricultural pests, household pests, garden pests, etc.)? Respond ONLY in this exact format (fill in real values — no brackets in your output):
+
+IS_PEST: YES or NO
+PEST_NAME: the proper common name
+SCIENTIFIC_NAME: the scientific name
+THREAT_LEVEL: low, medium, or high
+CATEGORY: crawling, flying, larval, or soft-bodied
+DESCRIPTION: 2-3 sentences about the pest
+SYMPTOMS: symptom one ||| symptom two ||| symptom three ||| symptom four ||| symptom five
+ORGANIC_TREATMENT: method one ||| method two ||| method three ||| method four ||| method five
+CHEMICAL_TREATMENT: method one ||| method two ||| method three ||| method four ||| method five
+PREVENTION: tip one ||| tip two ||| tip three ||| tip four ||| tip five
+SPECIES_1_NAME: first common species name
+SPECIES_1_DESC: description of first species
+SPECIES_2_NAME: second common species name
+SPECIES_2_DESC: description of second species
+SPECIES_3_NAME: third common species name
+SPECIES_3_DESC: description of third species
+
+If the answer is NO, write only the IS_PEST line and stop.
+Respond YES if it's an insect, spider, mite, or similar creature that can be a pest. Include agricultural pests, household pests, and garden pests. Only respond NO if it's clearly not a pest at all (like a beneficial insect being asked about in a non-pest context, or not an insect/arthropod at all).
+Be specific and professional. Use ||| to separate list items."""
+    return [{'role': 'user', 'content': prompt}]
+
+
+def _search_answered_no(fields):
+    """True once the search reply has said IS_PEST: NO (nothing else follows)."""
+    return 'IS_PEST' in fields and 'YES' not in fields['IS_PEST'].upper()
+
+
+def _stream_search(pest_query, parser):
+    """Yield (FIELD, value) pairs from the single-pass search call, cutting the
+    generation off as soon as the model answers IS_PEST: NO."""
+    chunks = _ollama_chat_stream(
+        messages=_search_messages(pest_query),
+        priority=PRIORITY_TEXT,
+    )
+    try:
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+            if _search_answered_no(parser.fields):
+                logger.info(f"'{pest_query}' is not a pest — stopping generation early")
+                return
+        yield from parser.close()
+    finally:
+        chunks.close()
+
+
+def _run_search(pest_query):
+    parser = _LineFieldParser()
+    for _ in _stream_search(pest_query, parser):
+        pass
+    return _complete_search(pest_query, parser.complete_text.strip())
+
+
+def _complete_search(pest_query, response_text):
+    """Parse the single-pass search reply and store the profile it describes."""
+    logger.info(f"Custom search for '{pest_query}': {response_text[:100]}")
+
+    # Parse the verdict and search-only fields
+    is_pest_response = False
+    pest_name = pest_query
+    threat_level = 'medium'
+    category = 'Crawling Pest'
+
+    for line in response_text.split('\n'):
+        line = line.strip()
+        if line.startswith('IS_PEST:'):
+            is_pest_response = 'YES' in line.upper()
+        elif line.startswith('PEST_NAME:'):
+            pest_name = line.replace('PEST_NAME:', '').strip() or pest_query
+        elif line.startswith('THREAT_LEVEL:'):
+            threat = line.replace('THREAT_LEVEL:', '').strip().lower()
+            threat_level = threat if threat in ['low', 'medium', 'high'] else 'medium'
+        elif line.startswith('CATEGORY:'):
+            category_map = {
+                'crawling': 'Crawling Pest',
+                'flying': 'Flying Pest',
+                'larval': 'Larval Pest',
+                'soft-bodied': 'Soft-bodied Pest'
+            }
+            category = category_map.get(line.replace('CATEGORY:', '').strip().lower(), 'Crawling Pest')
+
+    if not is_pest_response:
+        return {'is_pest': False}
+
+    pest_key = pest_name.lower().replace(' ', '_')
+    full_pest_data = _parse_profile_reply(response_text, {
+        'name': pest_name,
+        'scientific_name': pest_name,
+        'image': None,
+        'description': '',
+        'symptoms': [],
+        'organic_treatment': [],
+        'chemical_treatment': [],
+        'prevention': [],
+        'common_species': [],
+        'threat_level': threat_level,
+        'category': category,
+        'info_url': f'/pest/{pest_key}',
+    })
+
+    if not full_pest_data['description']:
+        # Reply was cut short or malformed — don't store a hollow profile
+        return {'is_pest': False}
+
+    # A text search must not replace an image-backed profile or race an upload's job
+    if not _profiles.mark_complete_if_absent(pest_key, full_pest_data):
+        stored = _profiles.profile(pest_key)
+        if stored:
+            return _stored_search_result(pest_key, stored)
+
+    return {
+        'is_pest': True,
+        'is_known': False,
+        'pest_data': full_pest_data,
+    }
+
+
+def _sse(event, data):
+    """Format one Server-Sent Events message."""
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def _sse_response(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 @app.route('/search_pest', methods=['POST'])
 def search_pest():
@@ -1223,118 +3656,140 @@ def search_pest():
         return jsonify({'error': 'No search query provided'})
     
     try:
-        # First, check if it's in our known pests
-        pest_query_normalized = pest_query.title()
-        if pest_query_normalized in pest_info:
-            known = pest_info[pest_query_normalized]
-            pest_key = pest_query_normalized.lower().replace(' ', '_')
-            return jsonify({
-                'is_pest': True,
-                'is_known': True,
-                'pest_data': {
-                    'name': known['name'],
-                    'scientific_name': known['scientific_name'],
-                    'image': f"{request.host_url}assets/images/pests/{known['image']}",
-                    'description': known['description'],
-                    'symptoms': known['symptoms'],
-                    'organic_treatment': known.get('organic_treatment', []),
-                    'chemical_treatment': known.get('chemical_treatment', []),
-                    'prevention': known.get('prevention', []),
-                    'common_species': known.get('common_species', []),
-                    'threat_level': get_threat_level(known['name']),
-                    'category': get_category_display(known['name']),
-                    'info_url': f'/pest/{pest_key}',
-                }
-            })
-        
-        # Use Gemini to verify if it's an insect/arthropod and get information
-        prompt = f"""Is "{pest_query}" an insect, arthropod, or other creature that could be considered a pest (including agricultural pests, household pests, garden pests, etc.)? Respond ONLY in this exact format:
-
-IS_PEST: [YES or NO]
-PEST_NAME: [proper common name if YES, empty if NO]
-SCIENTIFIC_NAME: [scientific name if YES, empty if NO]
-DESCRIPTION: [2-3 sentences about the pest if YES, empty if NO]
-THREAT_LEVEL: [low, medium, or high if YES, empty if NO]
-CATEGORY: [crawling, flying, larval, or soft-bodied if YES, empty if NO]
-SYMPTOMS: [5 common damage symptoms or problems they cause, separated by ||| if YES, empty if NO]
-
-Respond YES if it's an insect, spider, mite, or similar creature that can be a pest. Include agricultural pests, household pests, and garden pests. Only respond NO if it's clearly not a pest at all (like a beneficial insect being asked about in a non-pest context, or not an insect/arthropod at all)."""
-
-        response = ollama.chat(
-            model=OLLAMA_MODEL,
-            messages=[{'role': 'user', 'content': prompt}],
-            options={'num_ctx': 2048},
-            keep_alive='30m',
-        )
-        response_text = response.message.content.strip()
-        logger.info(f"Custom search for '{pest_query}': {response_text[:100]}")
-        
-        # Parse the response
-        is_pest_response = False
-        pest_data = {}
-        
-        for line in response_text.split('\n'):
-            line = line.strip()
-            if line.startswith('IS_PEST:'):
-                is_pest_response = 'YES' in line.upper()
-            elif line.startswith('PEST_NAME:'):
-                pest_data['name'] = line.replace('PEST_NAME:', '').strip()
-            elif line.startswith('SCIENTIFIC_NAME:'):
-                pest_data['scientific_name'] = line.replace('SCIENTIFIC_NAME:', '').strip()
-            elif line.startswith('DESCRIPTION:'):
-                pest_data['description'] = line.replace('DESCRIPTION:', '').strip()
-            elif line.startswith('THREAT_LEVEL:'):
-                threat = line.replace('THREAT_LEVEL:', '').strip().lower()
-                pest_data['threat_level'] = threat if threat in ['low', 'medium', 'high'] else 'medium'
-            elif line.startswith('CATEGORY:'):
-                category = line.replace('CATEGORY:', '').strip().lower()
-                category_map = {
-                    'crawling': 'Crawling Pest',
-                    'flying': 'Flying Pest',
-                    'larval': 'Larval Pest',
-                    'soft-bodied': 'Soft-bodied Pest'
-                }
-                pest_data['category'] = category_map.get(category, 'Crawling Pest')
-            elif line.startswith('SYMPTOMS:'):
-                symptoms_text = line.replace('SYMPTOMS:', '').strip()
-                pest_data['symptoms'] = [s.strip() for s in symptoms_text.split('|||') if s.strip()]
-        
-        if not is_pest_response:
-            return jsonify({'is_pest': False})
-        
-        # Generate full pest information and store in session
-        pest_name = pest_data.get('name', pest_query)
-        scientific_name = pest_data.get('scientific_name', '')
-        
-        # Generate comprehensive information
-        full_pest_data = generate_pest_info_text(pest_name, scientific_name)
-        
-        if not full_pest_data:
-            return jsonify({'is_pest': False})
-        
-        pest_key = pest_name.lower().replace(' ', '_')
-
-        # Merge initial parse data into full_pest_data for fields generate_pest_info_text doesn't set
-        if 'threat_level' not in full_pest_data or not full_pest_data['threat_level']:
-            full_pest_data['threat_level'] = pest_data.get('threat_level', 'medium')
-        if 'category' not in full_pest_data or not full_pest_data['category']:
-            full_pest_data['category'] = pest_data.get('category', 'Crawling Pest')
-        full_pest_data['image'] = None
-        full_pest_data['info_url'] = f'/pest/{pest_key}'
-
-        _dynamic_pests[pest_key] = full_pest_data
-        _generation_jobs[pest_key] = 'complete'
-
-        return jsonify({
-            'is_pest': True,
-            'is_known': False,
-            'pest_data': full_pest_data,
-        })
+        result = _search_local(pest_query)
+        if result is None:
+            # Identical concurrent searches share one model call
+            result = _ollama_flight.do(f'search:{_normalize_name(pest_query)}', _run_search, pest_query)
+        return jsonify(result)
         
+    except SchedulerBusy as e:
+        logger.warning(f'Search shed: {e}')
+        return jsonify({'error': 'Server is busy, please try again shortly'}), 503
     except Exception as e:
         logger.error(f'Error during custom search: {str(e)}', exc_info=True)
         return jsonify({'error': f'Error processing search: {str(e)}'})
 
+@app.route('/search_pest_stream', methods=['POST'])
+def search_pest_stream():
+    """Streaming /search_pest: emits `field` events as reply lines complete, then `result`."""
+    data = request.get_json()
+    pest_query = data.get('query', '').strip()
+
+    if not pest_query:
+        return jsonify({'error': 'No search query provided'})
+
+    def events():
+        try:
+            result = _search_local(pest_query)
+            if result is None:
+                parser = _LineFieldParser()
+                for name, value in _stream_search(pest_query, parser):
+                    yield _sse('field', {'field': name.lower(), 'value': value})
+                result = _complete_search(pest_query, parser.complete_text.strip())
+            yield _sse('result', result)
+        except SchedulerBusy as e:
+            logger.warning(f'Search shed: {e}')
+            yield _sse('error', {'error': 'Server is busy, please try again shortly'})
+        except Exception as e:
+            logger.error(f'Error during custom search: {str(e)}', exc_info=True)
+            yield _sse('error', {'error': f'Error processing search: {str(e)}'})
+
+    return _sse_response(events())
+
+def _bg_generate(pk, pn, sn, ib, itp):
+    try:
+        generated = generate_pest_info(pn, sn, ib, is_traditional_pest=itp)
+        if generated:
+            _profiles.mark_complete(pk, generated)
+            logger.info(f'Background generation complete for {pn}')
+        else:
+            _profiles.mark_error(pk)
+    except Exception as exc:
+        logger.error(f'Background generation failed for {pn}: {exc}')
+        _profiles.mark_error(pk)
+
+
+def _queue_generation(pest_key, pest_name, scientific_name, image, is_traditional_pest):
+    _scheduler.submit(PRIORITY_BACKGROUND, _bg_generate, pest_key, pest_name, scientific_name, image, is_traditional_pest)
+
+
+def _prediction_response(image, prediction, queue_generation=_queue_generation):
+    """Build the /predict JSON body, queueing profile generation for new creatures.
+
+    queue_generation(pest_key, pest_name, scientific_name, image, is_traditional_pest)
+    starts the background job; it raises SchedulerBusy when shedding load.
+    """
+    pest_name, confidence, is_known_pest, scientific_name, description, threat_level, is_traditional_pest = prediction
+
+    # No creature detected
+    if pest_name is None:
+        return {
+            'class_name': None,
+            'confidence': f'{confidence:.2%}',
+            'is_pest': False,
+            'is_new': False,
+            'message': 'No creature detected',
+            'info_url': None,
+            'generation_status': None,
+            'threat_level': 'none',
+            'is_traditional_pest': True,
+        }
+
+    pest_key = pest_name.lower().replace(' ', '_')
+
+    existing_status = None if is_known_pest else _profiles.status(pest_key)
+    if existing_status in ('pending', 'complete'):
+        # Profile already generated or in progress (e.g. a repeat upload) — don't queue it again
+        logger.info(f'Profile for {pest_name} already {existing_status}, skipping generation')
+        stored = _profiles.profile(pest_key)
+        if stored and not str(stored.get('image') or '').startswith('dynamic_pests/'):
+            # Prewarmed text-only profile — the first upload becomes its picture
+            _profiles.mark_complete(pest_key, {**stored, 'image': image.store(pest_key)})
+        info_url = f'/pest/{pest_key}'
+        message = 'PEST DETECTED' if is_traditional_pest else 'CREATURE DETECTED'
+        generation_status = existing_status
+
+    elif not is_known_pest:
+        logger.info(f'Unknown creature detected: {pest_name}, starting background generation...')
+
+        _pending_image = image.store(pest_key)
+
+        _profiles.mark_pending(pest_key, {
+            'name': pest_name,
+            'scientific_name': scientific_name or '',
+            'image': _pending_image,
+        })
+
+        try:
+            queue_generation(pest_key, pest_name, scientific_name, image, is_traditional_pest)
+        except SchedulerBusy as exc:
+            logger.warning(f'Background generation for {pest_name} shed: {exc}')
+            _profiles.mark_error(pest_key)
+
+        info_url = f'/pest/{pest_key}'
+        message = 'PEST DETECTED' if is_traditional_pest else 'CREATURE DETECTED'
+        generation_status = 'pending'
+
+    else:
+        info_url = f'/pest/{pest_key}'
+        message = 'PEST DETECTED'
+        generation_status = 'complete'
+
+    logger.info(f'Prediction complete: {pest_name} known={is_known_pest} threat={threat_level} confidence={confidence:.2%}')
+
+    return {
+        'class_name': pest_name,
+        'confidence': f'{confidence:.2%}',
+        'is_pest': True,
+        'is_new': not is_known_pest,
+        'message': message,
+        'info_url': info_url,
+        'generation_status': generation_status,
+        'threat_level': threat_level,
+        'is_traditional_pest': is_traditional_pest,
+    }
+
+
 @app.route('/predict', methods=['POST'])
 def predict():
     if 'file' not in request.files:
@@ -1345,84 +3800,134 @@ def predict():
         return jsonify({'error': 'No file selected'})
     
     try:
-        img_bytes = file.read()
-        pest_name, confidence, is_known_pest, scientific_name, description, threat_level, is_traditional_pest = predict_image(img_bytes)
-
-        # No creature detected
-        if pest_name is None:
-            return jsonify({
-                'class_name': None,
-                'confidence': f'{confidence:.2%}',
-                'is_pest': False,
-                'is_new': False,
-                'message': 'No creature detected',
-                'info_url': None,
-                'generation_status': None,
-                'threat_level': 'none',
-                'is_traditional_pest': True,
-            })
-
-        pest_key = pest_name.lower().replace(' ', '_')
-
-        if not is_known_pest:
-            logger.info(f'Unknown creature detected: {pest_name}, starting background generation...')
-
-            _dyn_dir = os.path.join('public_assets', 'images', 'dynamic_pests')
-            os.makedirs(_dyn_dir, exist_ok=True)
-            _img_filename = pest_key + '.jpg'
-            Image.open(io.BytesIO(img_bytes)).convert('RGB').save(
-                os.path.join(_dyn_dir, _img_filename), 'JPEG', quality=95
-            )
-            _pending_image = f'dynamic_pests/{_img_filename}'
+        image = _UploadImage(file.read())
+        return jsonify(_prediction_response(image, predict_image(image)))
 
-            _generation_jobs[pest_key] = 'pending'
-            _pending_metadata[pest_key] = {
-                'name': pest_name,
-                'scientific_name': scientific_name or '',
-                'image': _pending_image,
-            }
+    except SchedulerBusy as e:
+        logger.warning(f'Prediction shed: {e}')
+        return jsonify({'error': 'Server is busy, please try again shortly'}), 503
+    except Exception as e:
+        logger.error(f'Error during prediction: {str(e)}', exc_info=True)
+        return jsonify({'error': f'Error processing image: {str(e)}'})
 
-            def _bg_generate(pk, pn, sn, ib, itp):
-                try:
-                    generated = generate_pest_info(pn, sn, ib, is_traditional_pest=itp)
-                    if generated:
-                        _dynamic_pests[pk] = generated
-                        _generation_jobs[pk] = 'complete'
-                        logger.info(f'Background generation complete for {pn}')
-                    else:
-                        _generation_jobs[pk] = 'error'
-                except Exception as exc:
-                    logger.error(f'Background generation failed for {pn}: {exc}')
-                    _generation_jobs[pk] = 'error'
-
-            threading.Thread(target=_bg_generate, args=(pest_key, pest_name, scientific_name, img_bytes, is_traditional_pest), daemon=True).start()
-
-            info_url = f'/pest/{pest_key}'
-            message = 'PEST DETECTED' if is_traditional_pest else 'CREATURE DETECTED'
-            generation_status = 'pending'
+@app.route('/predict_stream', methods=['POST'])
+def predict_stream():
+    """Streaming /predict: emits `field` events as reply lines complete, then `result`."""
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'})
 
-        else:
-            info_url = f'/pest/{pest_key}'
-            message = 'PEST DETECTED'
-            generation_status = 'complete'
+    file = request.files['file']
+    if not file.filename:
+        return jsonify({'error': 'No file selected'})
 
-        logger.info(f'Prediction complete: {pest_name} known={is_known_pest} threat={threat_level} confidence={confidence:.2%}')
+    image = _UploadImage(file.read())
 
-        return jsonify({
-            'class_name': pest_name,
-            'confidence': f'{confidence:.2%}',
-            'is_pest': True,
-            'is_new': not is_known_pest,
-            'message': message,
-            'info_url': info_url,
-            'generation_status': generation_status,
-            'threat_level': threat_level,
-            'is_traditional_pest': is_traditional_pest,
-        })
+    def events():
+        try:
+            for kind, *payload in predict_image_stream(image):
+                if kind == 'field':
+                    name, value = payload
+                    yield _sse('field', {'field': name.lower(), 'value': value})
+                else:
+                    yield _sse('result', _prediction_response(image, payload[0]))
+        except SchedulerBusy as e:
+            logger.warning(f'Prediction shed: {e}')
+            yield _sse('error', {'error': 'Server is busy, please try again shortly'})
+        except Exception as e:
+            logger.error(f'Error during prediction: {str(e)}', exc_info=True)
+            yield _sse('error', {'error': f'Error processing image: {str(e)}'})
+
+    return _sse_response(events())
+
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({'error': f'Upload is larger than {MAX_REQUEST_BYTES // (1024 * 1024)} MB'}), 413
+
+def _batch_uploads():
+    """(filename, bytes) pairs from a /predict_batch request — multipart files
+    and/or .zip archives of images.
+
+    Every image is read with a bounded read, never trusting a zip's declared
+    sizes, and the images together may not decompress past MAX_REQUEST_BYTES.
+    """
+    uploads = []
+    total = 0
+
+    def add(filename, stream):
+        nonlocal total
+        if len(uploads) >= BATCH_MAX_IMAGES:
+            raise ValueError(f'A batch can hold at most {BATCH_MAX_IMAGES} images')
+        # Read one byte past the limit, so an oversized file is never held whole
+        limit = min(BATCH_MAX_IMAGE_BYTES, MAX_REQUEST_BYTES - total)
+        img_bytes = stream.read(limit + 1)
+        if len(img_bytes) > BATCH_MAX_IMAGE_BYTES:
+            raise ValueError(f'{filename} is larger than {BATCH_MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+        if len(img_bytes) > limit:
+            raise RequestEntityTooLarge()
+        total += len(img_bytes)
+        uploads.append((filename, img_bytes))
+
+    for file in request.files.getlist('files') + request.files.getlist('file'):
+        if not file.filename:
+            continue
+        if not file.filename.lower().endswith('.zip'):
+            add(file.filename, file.stream)
+            continue
+        with zipfile.ZipFile(file.stream) as archive:
+            for member in archive.infolist():
+                if member.is_dir() or not member.filename.lower().endswith(BATCH_EXTENSIONS):
+                    continue
+                with archive.open(member) as stream:
+                    add(member.filename, stream)
+    return uploads
+
+
+@app.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Classify many images in one request; results stream back as NDJSON, one
+    line per image in completion order."""
+    try:
+        uploads = _batch_uploads()
+    except (ValueError, zipfile.BadZipFile) as e:
+        return jsonify({'error': str(e)}), 400
+    if not uploads:
+        return jsonify({'error': 'No file uploaded'})
 
-    except Exception as e:
-        logger.error(f'Error during prediction: {str(e)}', exc_info=True)
-        return jsonify({'error': f'Error processing image: {str(e)}'})
+    # Identical images are classified once and reported for every filename
+    groups = OrderedDict()   # digest -> [(index, filename)]
+    unique = {}              # digest -> _UploadImage
+    for index, (filename, img_bytes) in enumerate(uploads):
+        image = _UploadImage(img_bytes)
+        groups.setdefault(image.digest, []).append((index, filename))
+        unique.setdefault(image.digest, image)
+    logger.info(f'Batch of {len(uploads)} images ({len(unique)} unique)')
+
+    def lines():
+        # A small window of workers decodes ahead and keeps the scheduler queue
+        # non-empty, so the model never idles between images
+        pool = ThreadPoolExecutor(max_workers=BATCH_WINDOW, thread_name_prefix='batch')
+        try:
+            futures = {pool.submit(predict_image, unique[d], PRIORITY_BATCH): d for d in groups}
+            for future in as_completed(futures):
+                digest = futures[future]
+                try:
+                    body = _prediction_response(unique[digest], future.result())
+                except SchedulerBusy:
+                    body = {'error': 'Server is busy, please try again shortly'}
+                except Exception as e:
+                    logger.error(f'Error during batch prediction: {str(e)}', exc_info=True)
+                    body = {'error': f'Error processing image: {str(e)}'}
+                for index, filename in groups[digest]:
+                    yield json.dumps({'index': index, 'filename': filename, **body}) + '\n'
+        finally:
+            # Also runs when the client disconnects and the generator is closed:
+            # images not yet started are dropped instead of classified for nobody
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
 
 if __name__ == '__main__':
+    # With the reloader, only the child process serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        _lifecycle.start()
     app.run(debug=True, host='0.0.0.0', port=8000)
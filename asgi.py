@@ -0,0 +1,406 @@
+"""Async serving mode for PestHub: `uvicorn asgi:application --port 8000`.
+
+/predict, /search_pest and /pest_status run as coroutines on ollama.AsyncClient
+(via the app's backend pool), so a client waiting on the model costs a
+coroutine rather than an OS thread. Inference still goes through the app's
+priority scheduler, and caching, stores and parsing are shared with app.py.
+Every other route is the Flask app, run on a small thread pool so pages stay
+responsive while inference is saturated. Streaming Flask routes hold a thread
+for as long as the model generates, so they get a pool of their own.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.wrappers import Request
+
+import app as pesthub
+from app import (
+    CLASSIFY_NUM_PREDICT, CLASSIFY_SCHEMA, MAX_REQUEST_BYTES, OLLAMA_MODEL, PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE, PRIORITY_TEXT, STATUS_RETRY_AFTER, STATUS_WAIT_TIMEOUT,
+    SchedulerBusy, _JsonFieldParser, _LineFieldParser, _UploadImage, _cascade, _classification_cache,
+    _classification_complete, _classification_conversation, _classification_messages,
+    _complete_search, _fast_tier_accepts, _fast_tier_done, _fast_tier_failed,
+    _image_profile, _image_profile_messages, _interpret_classification,
+    _lookup_classification, _normalize_name, _ollama_pool, _prediction_response,
+    _profile_prompt, _profiles, _scheduler, _search_answered_no, _search_local,
+    _search_messages,
+)
+
+logger = logging.getLogger(__name__)
+
+FLASK_THREADS = 16          # threads serving the remaining (sync) Flask routes
+FLASK_STREAM_THREADS = 16   # threads serving the streaming Flask routes
+FLASK_STREAM_PATHS = ('/predict_stream', '/search_pest_stream', '/predict_batch')
+
+_flask_pool = ThreadPoolExecutor(max_workers=FLASK_THREADS, thread_name_prefix='flask')
+_flask_stream_pool = ThreadPoolExecutor(max_workers=FLASK_STREAM_THREADS, thread_name_prefix='flask-stream')
+_inflight = {}      # coalescing key -> asyncio.Task
+_background = set()  # running profile-generation tasks (kept referenced)
+_status_waiters = {}  # pest_key -> {(loop, asyncio.Event)} of held /pest_status requests
+_status_waiters_lock = threading.Lock()
+
+
+def _wake_status_waiters(pest_key):
+    """Profile store listener: wake long-polls on pest_key. Runs on the saving thread."""
+    with _status_waiters_lock:
+        waiters = list(_status_waiters.get(pest_key, ()))
+    for loop, changed in waiters:
+        loop.call_soon_threadsafe(changed.set)
+
+
+_profiles.listeners.append(_wake_status_waiters)
+
+
+async def _chat(messages, options, priority):
+    """Async chat on the backend pool, run in a scheduler slot."""
+    async with _scheduler.slot(priority):
+        return await _ollama_pool.achat(model=OLLAMA_MODEL, messages=messages, options=options)
+
+
+async def _chat_stream(messages, options, priority, model=OLLAMA_MODEL, format=None):
+    """Yield content chunks of a streamed chat run in a scheduler slot.
+
+    Closing the generator early closes the HTTP stream, which makes Ollama
+    abort the generation.
+    """
+    async with _scheduler.slot(priority):
+        parts = _ollama_pool.achat_stream(model=model, messages=messages, options=options,
+                                          format=format)
+        async with contextlib.aclosing(parts):
+            async for part in parts:
+                yield part.message.content or ''
+
+
+async def _stream_fields(messages, options, priority, parser, done, model=OLLAMA_MODEL, format=None):
+    """Feed a streamed reply into parser until done(parser.fields) or the end."""
+    chunks = _chat_stream(messages, options, priority, model=model, format=format)
+    async with contextlib.aclosing(chunks):
+        async for chunk in chunks:
+            parser.feed(chunk)
+            if done(parser.fields):
+                return
+    parser.close()
+
+
+async def _coalesce(key, factory):
+    """Run factory() once for concurrent callers with the same key."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one caller disconnecting must not cancel the others' result
+    return await asyncio.shield(task)
+
+
+async def predict_image(image, priority=PRIORITY_INTERACTIVE):
+    """Async app.predict_image."""
+    cached, digest, phash, img_b64 = await asyncio.to_thread(_lookup_classification, image)
+    if cached is not None:
+        return cached
+
+    options = {'num_predict': CLASSIFY_NUM_PREDICT}
+
+    async def classify_fast():
+        # Same contract as app._classify_fast
+        model = _cascade.fast_model
+        if not model:
+            return None
+        started = time.perf_counter()
+        parser = _JsonFieldParser()
+        try:
+            await _stream_fields(_classification_messages(img_b64), options, priority,
+                                 parser, _fast_tier_done, model=model, format=CLASSIFY_SCHEMA)
+        except SchedulerBusy:
+            raise
+        except Exception as e:
+            _fast_tier_failed(e, started)
+            return None
+        accepted = _fast_tier_accepts(parser.fields)
+        _cascade.record('fast', 'accepted' if accepted else 'escalated', started)
+        return parser if accepted else None
+
+    async def classify():
+        fast = await classify_fast()
+        if fast is not None:
+            result = _interpret_classification(fast.fields)
+            _classification_cache.put(digest, phash, result)
+            return result, None
+
+        logger.info("Sending image to Ollama for analysis")
+        started = time.perf_counter()
+        parser = _JsonFieldParser()
+        await _stream_fields(_classification_messages(img_b64), options, priority,
+                             parser, _classification_complete, format=CLASSIFY_SCHEMA)
+        logger.info(f"Ollama response: {parser.text}")
+        result = _interpret_classification(parser.fields)
+        _cascade.record('full', 'answered', started)
+        _classification_cache.put(digest, phash, result)
+        return result, parser.fields
+
+    result, fields = await _coalesce(f'classify:{digest}', classify)
+    if fields is not None:
+        image.conversation = _classification_conversation(img_b64, fields)
+    return result
+
+
+async def generate_pest_info(pest_name, scientific_name, image, is_traditional_pest=True):
+    """Async app.generate_pest_info."""
+    try:
+        image_url = image.stored or await asyncio.to_thread(image.store, pest_name.lower().replace(' ', '_'))
+        prompt = _profile_prompt(pest_name, scientific_name, is_traditional_pest)
+        messages = await asyncio.to_thread(_image_profile_messages, image, prompt)
+        response = await _chat(messages, None, PRIORITY_BACKGROUND)
+        return _image_profile(pest_name, scientific_name, image_url, is_traditional_pest, response)
+    except Exception as e:
+        logger.error(f"Error generating pest info: {str(e)}", exc_info=True)
+        return None
+
+
+async def _bg_generate(pk, pn, sn, image, itp):
+    try:
+        generated = await generate_pest_info(pn, sn, image, is_traditional_pest=itp)
+        if generated:
+            await asyncio.to_thread(_profiles.mark_complete, pk, generated)
+            logger.info(f'Background generation complete for {pn}')
+        else:
+            await asyncio.to_thread(_profiles.mark_error, pk)
+    except Exception as exc:
+        logger.error(f'Background generation failed for {pn}: {exc}')
+        await asyncio.to_thread(_profiles.mark_error, pk)
+
+
+async def search_pest(pest_query):
+    """Async /search_pest body: local retrieval first, then one coalesced model call."""
+    result = await asyncio.to_thread(_search_local, pest_query)
+    if result is not None:
+        return result
+
+    async def run():
+        parser = _LineFieldParser()
+        await _stream_fields(_search_messages(pest_query), None,
+                             PRIORITY_TEXT, parser, _search_answered_no)
+        return await asyncio.to_thread(_complete_search, pest_query, parser.complete_text.strip())
+
+    return await _coalesce(f'search:{_normalize_name(pest_query)}', run)
+
+
+# --- Routes ------------------------------------------------------------------
+
+async def _predict_route(request):
+    if 'file' not in request.files:
+        return 200, {'error': 'No file uploaded'}
+    file = request.files['file']
+    if not file.filename:
+        return 200, {'error': 'No file selected'}
+
+    loop = asyncio.get_running_loop()
+
+    def queue_generation(*args):
+        # Called from _prediction_response on a worker thread
+        def start():
+            task = loop.create_task(_bg_generate(*args))
+            _background.add(task)
+            task.add_done_callback(_background.discard)
+        loop.call_soon_threadsafe(start)
+
+    try:
+        image = _UploadImage(file.read())
+        prediction = await predict_image(image)
+        return 200, await asyncio.to_thread(_prediction_response, image, prediction, queue_generation)
+    except SchedulerBusy as e:
+        logger.warning(f'Prediction shed: {e}')
+        return 503, {'error': 'Server is busy, please try again shortly'}
+    except Exception as e:
+        logger.error(f'Error during prediction: {str(e)}', exc_info=True)
+        return 200, {'error': f'Error processing image: {str(e)}'}
+
+
+async def _search_route(request):
+    data = request.get_json(silent=True) or {}
+    pest_query = data.get('query', '').strip()
+    if not pest_query:
+        return 200, {'error': 'No search query provided'}
+    try:
+        return 200, await search_pest(pest_query)
+    except SchedulerBusy as e:
+        logger.warning(f'Search shed: {e}')
+        return 503, {'error': 'Server is busy, please try again shortly'}
+    except Exception as e:
+        logger.error(f'Error during custom search: {str(e)}', exc_info=True)
+        return 200, {'error': f'Error processing search: {str(e)}'}
+
+
+async def _wait_settled(pest_key, timeout):
+    """pest_key's status once it leaves 'pending', or after timeout seconds."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waiter = (loop, asyncio.Event())
+    with _status_waiters_lock:
+        _status_waiters.setdefault(pest_key, set()).add(waiter)
+    try:
+        while True:
+            waiter[1].clear()   # before reading, so a change right after still wakes us
+            status = await asyncio.to_thread(_profiles.status, pest_key)
+            remaining = deadline - loop.time()
+            if status != 'pending' or remaining <= 0:
+                return status
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(waiter[1].wait(), remaining)
+    finally:
+        with _status_waiters_lock:
+            waiters = _status_waiters.get(pest_key)
+            waiters.discard(waiter)
+            if not waiters:
+                del _status_waiters[pest_key]
+
+
+async def _status_route(request, pest_key):
+    # Waiting costs a coroutine here, so there's no cap on held requests
+    wait = min(request.args.get('wait', 0, type=float), STATUS_WAIT_TIMEOUT)
+    status = await asyncio.to_thread(_profiles.status, pest_key)
+    if status == 'pending' and wait > 0:
+        status = await _wait_settled(pest_key, wait)
+    if status is None:
+        return 200, {'status': 'not_found'}
+    if status == 'pending' and wait <= 0:
+        return 200, {'status': status, 'retry_after': STATUS_RETRY_AFTER}
+    return 200, {'status': status}
+
+
+def _route(method, path):
+    """The async handler for a request, or None to hand it to Flask."""
+    if method == 'POST' and path == '/predict':
+        return _predict_route
+    if method == 'POST' and path == '/search_pest':
+        return _search_route
+    if method == 'GET' and path.startswith('/pest_status/') and '/' not in path[len('/pest_status/'):]:
+        pest_key = path[len('/pest_status/'):]
+        return lambda request: _status_route(request, pest_key)
+    return None
+
+
+# --- ASGI plumbing -----------------------------------------------------------
+
+async def _read_body(receive, limit):
+    """The request body, or None once it grows past limit bytes."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if len(body) > limit:
+            return None
+        if not message.get('more_body'):
+            break
+    return bytes(body)
+
+
+def _environ(scope, body):
+    """PEP 3333 environ for an ASGI HTTP scope."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').lower()
+        value = value.decode('latin-1')
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'content-length':
+            key = 'HTTP_' + name.upper().replace('-', '_')
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status, 'headers': [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('latin-1')),
+    ]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+_WSGI_END = object()
+
+
+async def _run_flask(environ, send, pool=_flask_pool):
+    """Run the Flask app on the thread pool, streaming its body back chunk by chunk."""
+    loop = asyncio.get_running_loop()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'] = int(status.split(' ', 1)[0])
+        started['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+        return lambda data: None
+
+    result = await loop.run_in_executor(pool, pesthub.app, environ, start_response)
+    chunks = iter(result)
+    try:
+        chunk = await loop.run_in_executor(pool, next, chunks, _WSGI_END)
+        await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+        while chunk is not _WSGI_END:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await loop.run_in_executor(pool, next, chunks, _WSGI_END)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(result, 'close'):
+            await loop.run_in_executor(pool, result.close)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                pesthub._lifecycle.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.gather(*_background, return_exceptions=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    body = await _read_body(receive, MAX_REQUEST_BYTES)
+    if body is None:
+        await _send_json(send, 413, {'error': f'Upload is larger than {MAX_REQUEST_BYTES // (1024 * 1024)} MB'})
+        return
+    environ = _environ(scope, body)
+    handler = _route(scope['method'], scope['path'])
+    if handler is None:
+        streaming = scope['path'] in FLASK_STREAM_PATHS
+        await _run_flask(environ, send, _flask_stream_pool if streaming else _flask_pool)
+        return
+    # Parsing a multipart upload is CPU work — keep it off the event loop
+    request = await asyncio.to_thread(Request, environ)
+    if request.mimetype.startswith('multipart/'):
+        await asyncio.to_thread(lambda: request.files)
+    status, payload = await handler(request)
+    await _send_json(send, status, payload)
@@ -0,0 +1,120 @@
+"""Image preprocessing for PestHub.
+
+Kept free of app side effects (Ollama startup, threads, database) so the
+functions can run in a process pool without re-initialising the app.
+Pillow is imported on first use, so importing this module stays cheap.
+"""
+import numpy as np
+import io
+import base64
+import time
+
+MODEL_IMAGE_SIZE = 336      # longest side of the image sent to the vision model
+MODEL_JPEG_QUALITY = 85
+
+
+def perceptual_hash(image) -> int:
+    """64-bit difference hash (dHash) — robust to re-encoding and small shifts."""
+    from PIL import Image
+    pixels = np.asarray(image.convert('L').resize((9, 8), Image.BILINEAR))
+    # Row-major, first pixel pair in the most significant bit
+    return int.from_bytes(np.packbits(pixels[:, :-1] > pixels[:, 1:]).tobytes(), 'big')
+
+
+def frame_stats(image, grid=4) -> dict:
+    """Cheap statistics for spotting unusable frames.
+
+    `sharpness` is the variance of the Laplacian in the sharpest cell of a
+    grid x grid split, so a small in-focus creature on a blurred background
+    still counts as sharp. It is None for images under 3 px on a side,
+    which have no Laplacian to measure.
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.float32)
+    laplacian = (4 * gray[1:-1, 1:-1] - gray[:-2, 1:-1] - gray[2:, 1:-1]
+                 - gray[1:-1, :-2] - gray[1:-1, 2:])
+    cells = [cell for band in np.array_split(laplacian, grid, axis=0)
+             for cell in np.array_split(band, grid, axis=1) if cell.size]
+    low, high = np.percentile(gray, (1, 99))
+    return {
+        'mean': float(gray.mean()),
+        'stddev': float(gray.std()),
+        'p1': float(low),
+        'p99': float(high),
+        'sharpness': float(max(cell.var() for cell in cells)) if cells else None,
+    }
+
+
+def open_rgb(image_bytes, draft_size=None):
+    """Decode an upload to RGB. For JPEGs, draft_size lets libjpeg downscale
+    while decoding (by 1/2, 1/4 or 1/8) to the smallest size still >= draft_size."""
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_bytes))
+    if draft_size and image.format == 'JPEG':
+        image.draft('RGB', draft_size)
+    return image.convert('RGB')
+
+
+def prepare_model_input(image_bytes):
+    """Decode, thumbnail and encode an upload for the vision model.
+
+    Returns (img_b64, phash, frame, timings): frame is frame_stats() of the
+    thumbnail and timings maps each stage to milliseconds.
+    """
+    from PIL import Image
+    size = (MODEL_IMAGE_SIZE, MODEL_IMAGE_SIZE)
+    started = time.perf_counter()
+    image = open_rgb(image_bytes, size)
+    decoded = time.perf_counter()
+
+    # draft() already did the heavy reduction, so a bilinear pass is enough
+    image.thumbnail(size, Image.BILINEAR, reducing_gap=2.0)
+    resized = time.perf_counter()
+
+    buf = io.BytesIO()
+    image.save(buf, format='JPEG', quality=MODEL_JPEG_QUALITY)
+    img_b64 = base64.b64encode(buf.getvalue()).decode('utf-8')
+    encoded = time.perf_counter()
+
+    phash = perceptual_hash(image)
+    hashed = time.perf_counter()
+
+    frame = frame_stats(image)
+    measured = time.perf_counter()
+
+    return img_b64, phash, frame, {
+        'decode': (decoded - started) * 1000,
+        'resize': (resized - decoded) * 1000,
+        'encode': (encoded - resized) * 1000,
+        'hash': (hashed - encoded) * 1000,
+        'frame': (measured - hashed) * 1000,
+    }
+
+
+def encode_jpeg(image_bytes, quality=95):
+    """Re-encode an upload as an RGB JPEG for storage."""
+    buf = io.BytesIO()
+    open_rgb(image_bytes).save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
+
+
+def webp_variants(image_bytes, widths, quality):
+    """Resize an image to each of widths and encode it as WebP.
+
+    Never upscales: widths at or above the source width collapse into one
+    variant at the source width. Returns {actual_width: webp_bytes}.
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(image_bytes))
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+    variants = {}
+    for width in sorted(widths):
+        width = min(width, image.width)
+        if width in variants:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        buf = io.BytesIO()
+        resized.save(buf, 'WEBP', quality=quality, method=4)
+        variants[width] = buf.getvalue()
+    return variants
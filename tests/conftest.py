@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Flask test client that doesn't start Ollama or the background jobs."""
+    import app
+    monkeypatch.setattr(app._lifecycle, 'started_at', 0.0)
+    return app.app.test_client()
+
+
+@pytest.fixture
+def profiles(tmp_path, monkeypatch):
+    """A fresh profile store in tmp_path, installed as app._profiles."""
+    import app
+    store = app._ProfileStore(str(tmp_path / 'profiles.db'), 16, 4)
+    monkeypatch.setattr(app, '_profiles', store)
+    return store
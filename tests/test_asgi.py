@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+
+import pytest
+from werkzeug.wrappers import Request
+
+import app
+import asgi
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = app._ProfileStore(str(tmp_path / 'profiles.db'), 16, 4)
+    store.listeners.append(asgi._wake_status_waiters)
+    monkeypatch.setattr(asgi, '_profiles', store)
+    return store
+
+
+def _status(pest_key, wait):
+    return asgi._status_route(Request.from_values(query_string=f'wait={wait}'), pest_key)
+
+
+def test_long_poll_wakes_when_profile_completes(store):
+    store.mark_pending('ants', {})
+
+    async def run():
+        poll = asyncio.ensure_future(_status('ants', 10))
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await asyncio.to_thread(store.mark_complete, 'ants', {'name': 'Ants'})
+        result = await poll
+        return result, time.monotonic() - started
+
+    (status, payload), elapsed = asyncio.run(run())
+    assert payload == {'status': 'complete'} and elapsed < 1
+    assert asgi._status_waiters == {}
+
+
+def test_long_poll_times_out_while_pending(store):
+    store.mark_pending('ants', {})
+    status, payload = asyncio.run(_status('ants', 0.1))
+    assert payload == {'status': 'pending'}
+    assert asgi._status_waiters == {}
+
+
+def test_streaming_routes_use_their_own_pool():
+    assert '/predict_batch' in asgi.FLASK_STREAM_PATHS
+    assert asgi._flask_stream_pool is not asgi._flask_pool
+
+
+def _scope(method, path, query=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+            'headers': list(headers), 'http_version': '1.1', 'scheme': 'http',
+            'server': ('testserver', 8000), 'client': ('10.0.0.1', 5000)}
+
+
+def _call(scope, body=b''):
+    """Run the ASGI app for one request; return (status, headers, body)."""
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.application(scope, receive, send))
+    start, *bodies = sent
+    return start['status'], dict(start['headers']), b''.join(m.get('body', b'') for m in bodies)
+
+
+@pytest.mark.parametrize('method, path, handled', [
+    ('POST', '/predict', True),
+    ('POST', '/search_pest', True),
+    ('GET', '/pest_status/ants', True),
+    ('GET', '/pest_status/ants/extra', False),
+    ('GET', '/predict', False),
+    ('POST', '/predict_batch', False),
+    ('GET', '/about', False),
+])
+def test_only_model_routes_run_as_coroutines(method, path, handled):
+    assert (asgi._route(method, path) is not None) == handled
+
+
+def test_environ_carries_query_headers_and_body():
+    scope = _scope('POST', '/search_pest', b'a=1', [
+        (b'content-type', b'application/json'), (b'content-length', b'99'),
+        (b'accept', b'text/html'), (b'accept', b'application/json')])
+    environ = asgi._environ(scope, b'{"query": "ants"}')
+    assert environ['QUERY_STRING'] == 'a=1'
+    assert environ['CONTENT_TYPE'] == 'application/json'
+    assert environ['CONTENT_LENGTH'] == '17'
+    assert environ['HTTP_ACCEPT'] == 'text/html,application/json'
+    assert environ['REMOTE_ADDR'] == '10.0.0.1'
+    assert environ['wsgi.input'].read() == b'{"query": "ants"}'
+
+
+def test_search_route_answers_json(monkeypatch):
+    async def search_pest(query):
+        return {'is_pest': False, 'query': query}
+
+    monkeypatch.setattr(asgi, 'search_pest', search_pest)
+    status, headers, body = _call(_scope('POST', '/search_pest', headers=[
+        (b'content-type', b'application/json')]), b'{"query": " ants "}')
+    assert status == 200 and headers[b'content-type'] == b'application/json'
+    assert json.loads(body) == {'is_pest': False, 'query': 'ants'}
+
+
+def test_predict_route_classifies_the_upload(monkeypatch):
+    async def predict_image(image, priority=app.PRIORITY_INTERACTIVE):
+        return ('Ants', len(image.data))
+
+    monkeypatch.setattr(asgi, 'predict_image', predict_image)
+    monkeypatch.setattr(asgi, '_prediction_response', lambda image, prediction, queue: list(prediction))
+    body = (b'--x\r\nContent-Disposition: form-data; name="file"; filename="a.jpg"\r\n'
+            b'Content-Type: image/jpeg\r\n\r\nabc\r\n--x--\r\n')
+    status, _, payload = _call(_scope('POST', '/predict', headers=[
+        (b'content-type', b'multipart/form-data; boundary=x')]), body)
+    assert (status, json.loads(payload)) == (200, ['Ants', 3])
+
+
+def test_other_routes_are_served_by_flask(monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'started_at', 0.0)
+    status, _, body = _call(_scope('GET', '/healthz'))
+    assert status == 200 and json.loads(body)['status'] == 'ok'
+
+
+def test_oversized_body_gets_413(monkeypatch):
+    monkeypatch.setattr(asgi, 'MAX_REQUEST_BYTES', 10)
+    status, _, body = _call(_scope('POST', '/search_pest'), b'x' * 11)
+    assert status == 413 and 'error' in json.loads(body)
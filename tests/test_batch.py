@@ -0,0 +1,118 @@
+import io
+import json
+import threading
+import zipfile
+
+import pytest
+
+import app
+
+
+def _post(client, files, **kwargs):
+    return client.post('/predict_batch', data={'files': files},
+                       content_type='multipart/form-data', **kwargs)
+
+
+def test_plain_file_over_size_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_IMAGE_BYTES', 10)
+    response = _post(client, [(io.BytesIO(b'x' * 11), 'big.jpg')])
+    assert response.status_code == 400
+    assert 'big.jpg is larger than' in response.get_json()['error']
+
+
+def test_zip_member_over_size_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_IMAGE_BYTES', 10)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('big.jpg', b'x' * 11)
+    archive.seek(0)
+    response = _post(client, [(archive, 'images.zip')])
+    assert response.status_code == 400
+
+
+def test_decompressed_total_over_request_limit_gets_413(client, monkeypatch):
+    # Small zips of highly compressible members must not expand without bound
+    monkeypatch.setattr(app, 'MAX_REQUEST_BYTES', 25)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+        for i in range(3):
+            z.writestr(f'{i}.jpg', b'\0' * 10)
+    archive.seek(0)
+    response = _post(client, [(archive, 'images.zip')])
+    assert response.status_code == 413
+
+
+def test_zip_member_with_understated_size_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_IMAGE_BYTES', 10)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('big.jpg', b'x' * 11)
+    data = bytearray(archive.getvalue())
+    # Patch the central directory's uncompressed size (offset 24) down to 5
+    central = data.rfind(b'PK\x01\x02')
+    data[central + 24:central + 28] = (5).to_bytes(4, 'little')
+    response = _post(client, [(io.BytesIO(bytes(data)), 'images.zip')])
+    assert response.status_code == 400
+
+
+def test_request_over_content_length_gets_413(client, monkeypatch):
+    monkeypatch.setitem(app.app.config, 'MAX_CONTENT_LENGTH', 100)
+    response = _post(client, [(io.BytesIO(b'x' * 1000), 'a.jpg')])
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+
+def test_closing_the_stream_cancels_pending_images(client, monkeypatch):
+    release = threading.Event()
+    started = []
+
+    def predict_image(image, priority):
+        started.append(image.digest)
+        if len(started) > 1:
+            release.wait(5)
+        return {'is_pest': False}
+
+    monkeypatch.setattr(app, 'predict_image', predict_image)
+    monkeypatch.setattr(app, '_prediction_response', lambda image, prediction: prediction)
+    files = [(io.BytesIO(bytes([i]) * 8), f'{i}.jpg') for i in range(20)]
+    response = _post(client, files, buffered=False)
+    first = json.loads(next(response.response))
+    assert 'index' in first
+    response.close()
+    release.set()
+    assert len(started) <= 1 + app.BATCH_WINDOW
+
+
+def test_identical_images_are_classified_once_and_reported_per_filename(client, monkeypatch):
+    classified = []
+
+    def predict_image(image, priority):
+        classified.append(image.digest)
+        return {'is_pest': False, 'size': len(image.data)}
+
+    monkeypatch.setattr(app, 'predict_image', predict_image)
+    monkeypatch.setattr(app, '_prediction_response', lambda image, prediction: prediction)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as z:
+        z.writestr('copy.jpg', b'same')
+        z.writestr('notes.txt', b'not an image')
+    archive.seek(0)
+    files = [(io.BytesIO(b'same'), 'a.jpg'), (io.BytesIO(b'other!'), 'b.jpg'), (archive, 'more.zip')]
+    response = _post(client, files)
+    lines = sorted((json.loads(line) for line in response.data.splitlines()), key=lambda r: r['index'])
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert [(r['index'], r['filename'], r['size']) for r in lines] == [
+        (0, 'a.jpg', 4), (1, 'b.jpg', 6), (2, 'copy.jpg', 4)]
+    assert len(classified) == 2
+
+
+def test_failed_image_reports_an_error_line(client, monkeypatch):
+    def predict_image(image, priority):
+        raise RuntimeError('model went away')
+
+    monkeypatch.setattr(app, 'predict_image', predict_image)
+    response = _post(client, [(io.BytesIO(b'x'), 'a.jpg')])
+    (line,) = response.data.splitlines()
+    assert json.loads(line) == {'index': 0, 'filename': 'a.jpg',
+                                'error': 'Error processing image: model went away'}
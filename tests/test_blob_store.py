@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def store(tmp_path):
+    return app._BlobStore(str(tmp_path / 'dynamic_pests'), str(tmp_path / 'blobs.db'), quota=10)
+
+
+def test_put_dedupes_and_references(store):
+    path = store.put('ants', 'a' * 64, lambda: b'jpeg-a')
+    assert path == 'dynamic_pests/' + 'a' * 64 + '.jpg'
+    assert store.put('red_ants', 'a' * 64, lambda: pytest.fail('encoded twice')) == path
+    assert sorted(store.referrers(path)) == ['ants', 'red_ants']
+
+
+def test_reusing_an_orphaned_blob_protects_it_from_eviction(store):
+    store.put('old', 'b' * 64, lambda: b'x' * 8)
+    store.reference('old', None)
+    store.put('new', 'b' * 64, lambda: pytest.fail('encoded twice'))
+    store.put('bees', 'd' * 64, lambda: b'y' * 8)   # over quota
+    assert os.path.exists(store._file('b' * 64))
+    assert store.referrers(store.image_path('b' * 64)) == ['new']
+
+
+def test_failed_profile_releases_its_blob(store):
+    path = store.put('ants', 'a' * 64, lambda: b'x' * 8)
+    store.reference('ants', None)
+    store.put('bees', 'd' * 64, lambda: b'y' * 8)   # over quota, evicts the orphan
+    assert not os.path.exists(store._file('a' * 64))
+    assert store.referrers(path) == []
+
+
+def test_sync_follows_profile_images(store):
+    store.put('ants', 'a' * 64, lambda: b'jpeg')
+    store.put('bees', 'd' * 64, lambda: b'jpeg')
+    store.put('wasps', 'e' * 64, lambda: b'jpeg')
+    store.sync({'ants': 'dynamic_pests/' + 'd' * 64 + '.jpg', 'wasps': None, 'beetles': 'beetle.jpg'})
+    assert store.referrers(store.image_path('a' * 64)) == []
+    assert store.referrers(store.image_path('e' * 64)) == []
+    # bees has no profile row yet (its job only just stored the image): left alone
+    assert sorted(store.referrers(store.image_path('d' * 64))) == ['ants', 'bees']
+
+
+def test_profile_generation_reuses_the_stored_upload(store, monkeypatch):
+    monkeypatch.setattr(app, '_dynamic_images', store)
+    monkeypatch.setattr(app._image_variants, 'build_later', lambda path: None)
+    monkeypatch.setattr(app, '_preprocess', lambda fn, data, *args: data)
+    monkeypatch.setattr(app, '_image_profile_messages', lambda image, prompt: [])
+    monkeypatch.setattr(app, '_ollama_chat', lambda **kwargs: None)
+    monkeypatch.setattr(app, '_image_profile', lambda name, sci, url, trad, response: url)
+    image = app._UploadImage(b'jpeg bytes')
+    path = image.store('weevil')
+    assert app.generate_pest_info('Weevil', 'Curculionidae', image) == path
+    assert store.stats()['deduped'] == 0
+
+
+def test_least_recently_used_orphans_are_evicted_first(tmp_path):
+    store = app._BlobStore(str(tmp_path / 'dynamic_pests'), str(tmp_path / 'blobs.db'), quota=20)
+    evicted = []
+    store.listeners.append(evicted.append)
+    for key, digest in (('ants', 'a' * 64), ('bees', 'b' * 64)):
+        store.put(key, digest, lambda: b'x' * 8)
+        store.reference(key, None)
+    # Reusing the older blob makes it the most recently used one
+    store.put('red_ants', 'a' * 64, lambda: pytest.fail('encoded twice'))
+    store.reference('red_ants', None)
+    store.put('wasps', 'c' * 64, lambda: b'x' * 8)   # 24 bytes, 4 over quota
+    assert evicted == [store.image_path('b' * 64)]
+    assert os.path.exists(store._file('a' * 64)) and not os.path.exists(store._file('b' * 64))
+    assert store.stats() == {'blobs': 2, 'referenced': 1, 'bytes': 16, 'quota': 20,
+                             'deduped': 1, 'evicted': 1}
+
+
+def test_referenced_blobs_are_kept_over_quota(store):
+    for key, digest in (('ants', 'a' * 64), ('bees', 'b' * 64)):
+        store.put(key, digest, lambda: b'x' * 8)
+    assert store.stats()['evicted'] == 0
+    assert os.path.exists(store._file('a' * 64)) and os.path.exists(store._file('b' * 64))
+
+
+def test_writes_leave_no_temp_files(store):
+    store.put('ants', 'a' * 64, lambda: b'jpeg')
+    assert os.listdir(store.directory) == ['a' * 64 + '.jpg']
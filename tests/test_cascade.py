@@ -0,0 +1,76 @@
+import json
+
+import ollama
+import pytest
+
+import app
+
+FULL = {'match': True, 'pest': 'Ants', 'confidence': 0.95, 'threat': 'medium',
+        'scientific_name': 'Formicidae', 'creature': 'ant'}
+
+
+@pytest.fixture
+def cascade(monkeypatch):
+    cascade = app._CascadeStats('fast')
+    monkeypatch.setattr(app, '_cascade', cascade)
+    return cascade
+
+
+def _models(monkeypatch, replies):
+    """Stand in for the model: replies maps model name to a reply dict or exception."""
+    calls = []
+
+    def fake_stream(messages, options=None, priority=None, model=app.OLLAMA_MODEL, format=None):
+        calls.append(model)
+        reply = replies[model]
+        if isinstance(reply, Exception):
+            raise reply
+        yield json.dumps(reply)
+
+    monkeypatch.setattr(app, '_ollama_chat_stream', fake_stream)
+    return calls
+
+
+def test_confident_fast_answer_skips_the_full_model(cascade, monkeypatch):
+    calls = _models(monkeypatch, {'fast': {**FULL, 'confidence': 0.9}})
+    result, fields = app._classify_image('thumb')
+    assert calls == ['fast']
+    assert result[0] == 'Ants' and fields is None
+    assert cascade.stats()['tiers']['fast']['hit_rate'] == 1.0
+
+
+@pytest.mark.parametrize('fast_reply', [
+    {**FULL, 'confidence': 0.5},
+    {**FULL, 'pest': 'Bee Fly'},
+    {'match': False, 'pest': 'spider', 'confidence': 0.99},
+])
+def test_unsure_fast_answer_escalates(cascade, monkeypatch, fast_reply):
+    calls = _models(monkeypatch, {'fast': fast_reply, app.OLLAMA_MODEL: FULL})
+    result, fields = app._classify_image('thumb')
+    assert calls == ['fast', app.OLLAMA_MODEL]
+    assert result[0] == 'Ants' and fields['scientific_name'] == 'Formicidae'
+    tiers = cascade.stats()['tiers']
+    assert tiers['fast']['escalated'] == 1 and tiers['full']['answered'] == 1
+
+
+def test_fast_tier_error_escalates(cascade, monkeypatch):
+    calls = _models(monkeypatch, {'fast': ConnectionError('refused'), app.OLLAMA_MODEL: FULL})
+    assert app._classify_image('thumb')[0][0] == 'Ants'
+    assert calls == ['fast', app.OLLAMA_MODEL]
+    assert cascade.fast_model == 'fast'
+
+
+def test_missing_fast_model_turns_the_tier_off(cascade, monkeypatch):
+    calls = _models(monkeypatch, {'fast': ollama.ResponseError('model not found', 404),
+                                  app.OLLAMA_MODEL: FULL})
+    app._classify_image('thumb')
+    app._classify_image('thumb')
+    assert calls == ['fast', app.OLLAMA_MODEL, app.OLLAMA_MODEL]
+    assert cascade.fast_model is None
+
+
+def test_busy_scheduler_is_not_treated_as_a_fast_tier_failure(cascade, monkeypatch):
+    _models(monkeypatch, {'fast': app.SchedulerBusy('queue full')})
+    with pytest.raises(app.SchedulerBusy):
+        app._classify_image('thumb')
+    assert cascade.fast_model == 'fast'
@@ -0,0 +1,43 @@
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Ants', 'Ants'),
+    ('ant', 'Ants'),
+    ('  GRASSHOPPER ', 'Grasshoppers'),
+    ('earth-worms', 'Earthworms'),
+    ('Formicidae', 'Ants'),
+    ('Vespidae', 'Wasps'),
+])
+def test_exact_plural_and_scientific_forms_resolve(text, expected):
+    assert app._catalog.resolve(text, fuzzy=False) == expected
+
+
+def test_typos_resolve_through_the_trigram_index():
+    assert app._catalog.resolve('caterpilar') == 'Caterpillars'
+    assert app._catalog.resolve('grashopers') == 'Grasshoppers'
+    assert app._catalog.resolve('caterpilar', fuzzy=False) is None
+
+
+def test_unrelated_text_does_not_fuzzy_match():
+    assert app._catalog.resolve('spider') is None
+    assert app._catalog.resolve('') is None
+
+
+def test_name_shared_by_two_pests_is_ambiguous():
+    # Gastropoda is the scientific name of both Slugs and Snails
+    assert app._catalog.resolve('Gastropoda') is None
+    assert app._catalog.resolve('Slugs') == 'Slugs'
+    assert app._catalog.resolve('Snails') == 'Snails'
+
+
+def test_names_only_ignores_scientific_aliases():
+    assert app._catalog.resolve('Formicidae', names_only=True, fuzzy=False) is None
+    assert app._catalog.resolve('Ants', names_only=True) == 'Ants'
+
+
+def test_species_qualified_reply_falls_back_to_contained_name():
+    assert app._catalog.resolve('Leopard Slugs', fuzzy=False) is None
+    assert app._catalog.resolve_reply('Leopard Slugs') == 'Slugs'
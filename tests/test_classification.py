@@ -0,0 +1,80 @@
+import pytest
+
+import app
+
+
+def _match(pest):
+    return {'match': True, 'pest': pest, 'confidence': 0.9, 'threat': 'low',
+            'scientific_name': 'n/a', 'creature': 'none'}
+
+
+@pytest.mark.parametrize('reply, expected', [
+    ('Ants', 'Ants'),
+    ('Red Ants', 'Ants'),
+    ('Black ants', 'Ants'),
+    ('Ground Beetles', 'Beetles'),
+    ('Bumble Bees', 'Bees'),
+    ('Leopard Slugs', 'Slugs'),
+])
+def test_multi_word_species_resolve_to_curated_pest(reply, expected):
+    name, _, is_known, _, _, threat, is_traditional = app._interpret_classification(_match(reply))
+    assert (name, is_known, is_traditional) == (expected, True, True)
+    assert threat == app.get_threat_level(expected)
+
+
+def test_names_of_two_pests_are_not_guessed():
+    assert app._catalog.contained('Ant Beetle') is None
+    name, _, is_known, _, _, _, is_traditional = app._interpret_classification(_match('Ant Beetle'))
+    assert (name, is_known, is_traditional) == ('Ant Beetle', False, False)
+
+
+def test_fast_tier_accepts_exact_names_only():
+    assert app._fast_tier_accepts(_match('Ants'))
+    assert app._fast_tier_accepts(_match('ant'))
+    assert not app._fast_tier_accepts(_match('Bee Fly'))
+    assert not app._fast_tier_accepts(_match('Red Ants'))
+    assert not app._fast_tier_accepts(_match('Antz'))
+
+
+def test_schema_requires_every_field_the_reply_is_read_for():
+    assert set(app.CLASSIFY_SCHEMA['required']) == set(app.CLASSIFY_SCHEMA['properties'])
+
+
+def test_classification_requests_the_schema(monkeypatch):
+    sent = []
+
+    def fake_stream(**kwargs):
+        sent.append(kwargs)
+        yield '{"match": false, "pest": "none", "creature": "none"}'
+
+    monkeypatch.setattr(app, '_ollama_chat_stream', fake_stream)
+    list(app._stream_classification('thumb', app._JsonFieldParser()))
+    assert sent[0]['format'] is app.CLASSIFY_SCHEMA
+    assert sent[0]['messages'][0]['images'] == ['thumb']
+
+
+@pytest.mark.parametrize('pest', ['none', 'N/A', '', None])
+def test_unnamed_subject_falls_back_to_the_creature_field(pest):
+    fields = {'match': False, 'pest': pest, 'confidence': 0.8, 'threat': 'low',
+              'scientific_name': 'n/a', 'creature': 'garden spider'}
+    assert app._interpret_classification(fields) == (
+        'Garden Spider', 0.8, False, None, None, 'none', False)
+
+
+def test_no_creature_at_all():
+    fields = {'match': False, 'pest': 'none', 'confidence': 0.9, 'creature': 'none'}
+    assert app._interpret_classification(fields) == (None, 0.9, False, None, None, 'none', True)
+
+
+def test_non_list_creature_keeps_its_reported_details():
+    fields = {'match': False, 'pest': 'Spider', 'confidence': 0.7, 'threat': 'low',
+              'scientific_name': 'Araneae', 'creature': 'spider'}
+    assert app._interpret_classification(fields) == (
+        'Spider', 0.7, False, 'Araneae', None, 'low', False)
+
+
+def test_out_of_range_values_are_clamped_and_defaulted():
+    fields = {'match': False, 'pest': 'Spider', 'confidence': 7, 'threat': 'catastrophic',
+              'scientific_name': '', 'creature': 'spider'}
+    _, confidence, _, scientific_name, _, threat, _ = app._interpret_classification(fields)
+    assert (confidence, scientific_name, threat) == (1.0, None, 'medium')
@@ -0,0 +1,74 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import app
+
+PHOTO = os.path.join(os.path.dirname(os.path.abspath(app.__file__)), 'tuffants.jpeg')
+RESULT = ('Ants', 0.9, True, 'Formicidae', None, 'medium', True)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = app._ClassificationCache(8, 3600, app.PHASH_MAX_DISTANCE)
+    monkeypatch.setattr(app, '_classification_cache', cache)
+    return cache
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    calls = []
+
+    def classify(img_b64, priority):
+        calls.append(img_b64)
+        return RESULT, None
+
+    monkeypatch.setattr(app, '_classify_image', classify)
+    return calls
+
+
+def _photo_bytes(quality):
+    buf = io.BytesIO()
+    Image.open(PHOTO).convert('RGB').save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
+
+
+def test_exact_and_near_duplicate_hits(cache):
+    cache.put('a', 0b1010, RESULT)
+    assert cache.get('a') == RESULT
+    assert cache.get('b') is None
+    assert cache.get_similar(0b1011) == RESULT            # one bit away
+    assert cache.get_similar(0b1010 ^ 0b111110000) is None  # five bits away
+    assert cache.stats()['hits'] == 1 and cache.stats()['near_hits'] == 1
+
+
+def test_entries_expire_after_ttl(cache, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, 'monotonic', lambda: now[0])
+    cache.put('a', 0, RESULT)
+    now[0] += cache.ttl + 1
+    assert cache.get('a') is None
+    assert cache.get_similar(0) is None
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for i in range(cache.max_size):
+        cache.put(str(i), i << 20, RESULT)
+    cache.get('0')
+    cache.put('new', 1 << 40, RESULT)
+    assert cache.get('0') == RESULT and cache.get('1') is None
+
+
+def test_repeat_upload_skips_the_model(cache, model_calls):
+    data = _photo_bytes(90)
+    assert app.predict_image(app._UploadImage(data)) == RESULT
+    assert app.predict_image(app._UploadImage(data)) == RESULT
+    assert len(model_calls) == 1
+
+
+def test_re_encoded_upload_is_a_near_duplicate(cache, model_calls):
+    app.predict_image(app._UploadImage(_photo_bytes(90)))
+    assert app.predict_image(app._UploadImage(_photo_bytes(70))) == RESULT
+    assert len(model_calls) == 1 and cache.stats()['near_hits'] == 1
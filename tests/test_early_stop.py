@@ -0,0 +1,76 @@
+import json
+
+import app
+
+
+def _chunks(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_json_parser_reports_members_once_complete():
+    parser = app._JsonFieldParser()
+    assert parser.feed('{"match": tr') == []
+    assert parser.feed('ue, "pest": "Aph') == [('match', True)]
+    assert parser.feed('ids", "confidence": 8') == [('pest', 'Aphids')]
+    # A number is only known to be complete once a delimiter follows it
+    assert parser.feed('7') == []
+    assert parser.feed('}') == [('confidence', 87)]
+    assert parser.fields == {'match': True, 'pest': 'Aphids', 'confidence': 87}
+
+
+def test_json_parser_close_flushes_trailing_member():
+    parser = app._JsonFieldParser()
+    assert parser.feed('{"confidence": 42') == []
+    assert parser.close() == [('confidence', 42)]
+
+
+def test_line_parser_drops_partial_line_until_close():
+    parser = app._LineFieldParser()
+    assert parser.feed('PEST: Aphids\nCONFID') == [('PEST', 'Aphids')]
+    assert parser.complete_text == 'PEST: Aphids\n'
+    assert parser.close() == []
+    assert parser.feed('') == []
+
+
+def test_classification_complete_needs_fields_for_the_answer():
+    matched = {'match': True, 'pest': 'Aphids', 'confidence': 90}
+    assert not app._classification_complete(matched)
+    assert app._classification_complete({**matched, 'threat': 'high'})
+
+    other = {'match': False, 'pest': 'Ladybug', 'confidence': 80, 'threat': 'none'}
+    assert not app._classification_complete(other)
+    assert app._classification_complete({**other, 'scientific_name': 'Coccinellidae'})
+
+    nothing = {'match': False, 'pest': 'none', 'confidence': 80, 'threat': 'none'}
+    assert not app._classification_complete({**nothing, 'scientific_name': 'n/a'})
+    assert app._classification_complete({**nothing, 'creature': 'spider'})
+
+
+def test_stream_stops_consuming_once_fields_complete(monkeypatch):
+    reply = json.dumps({'match': True, 'pest': 'Aphids', 'confidence': 90,
+                        'threat': 'high', 'scientific_name': 'Aphidoidea',
+                        'description': 'x' * 500})
+    consumed = []
+    closed = []
+
+    def fake_stream(**kwargs):
+        try:
+            for chunk in _chunks(reply):
+                consumed.append(chunk)
+                yield chunk
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(app, '_ollama_chat_stream', fake_stream)
+    parser = app._JsonFieldParser()
+    fields = dict(app._stream_classification('b64', parser))
+
+    assert fields['threat'] == 'high'
+    assert 'description' not in fields
+    assert len(''.join(consumed)) < len(reply) - 400
+    assert closed == [True]
+
+
+def test_fast_tier_stops_on_a_no_match():
+    assert app._fast_tier_done({'match': False})
+    assert not app._fast_tier_done({'match': True, 'pest': 'Aphids'})
@@ -0,0 +1,123 @@
+import base64
+import io
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import app
+import image_pipeline
+
+
+def _jpeg(size, color=(120, 60, 30)):
+    buf = io.BytesIO()
+    Image.new('RGB', size, color).save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+@pytest.mark.parametrize('size', [(1, 1), (2, 300), (300, 2)])
+def test_frame_stats_of_tiny_images_has_no_sharpness(size):
+    stats = image_pipeline.frame_stats(Image.new('RGB', size, (120, 60, 30)))
+    assert stats['sharpness'] is None
+
+
+def test_prefilter_skips_blur_check_without_sharpness():
+    frame = {'mean': 128.0, 'stddev': 40.0, 'p1': 10.0, 'p99': 240.0, 'sharpness': None}
+    assert app._prefilter.check(frame) is None
+
+
+@pytest.mark.parametrize('size', [(1, 1), (2, 300)])
+def test_tiny_upload_is_prepared(size):
+    img_b64, _, frame, _ = image_pipeline.prepare_model_input(_jpeg(size))
+    assert img_b64 and frame['sharpness'] is None
+
+
+def test_perceptual_hash_of_uniform_frame_is_zero():
+    assert image_pipeline.perceptual_hash(Image.new('RGB', (64, 64), (90, 90, 90))) == 0
+
+
+def test_perceptual_hash_bit_order():
+    # Brighter on the left everywhere: every left > right comparison is set
+    gradient = Image.fromarray(np.tile(np.arange(255, 0, -28, dtype=np.uint8), (8, 1)))
+    assert image_pipeline.perceptual_hash(gradient) == 2 ** 64 - 1
+
+
+def test_prefilter_rejection_is_not_matched_by_similar_photos():
+    cache = app._ClassificationCache(8, 3600, app.PHASH_MAX_DISTANCE)
+    rejected = (None, app.PREFILTER_CONFIDENCE, False, None, None, 'none', True)
+    cache.put('blank', 0, rejected, similar=False)
+    assert cache.get('blank') == rejected
+    assert cache.get_similar(0b1111) is None
+    cache.put('photo', 0b1111, ('Ants',))
+    assert cache.get_similar(0b0111) == ('Ants',)
+
+
+def test_model_input_is_a_thumbnail_that_keeps_the_aspect_ratio():
+    img_b64, _, _, timings = image_pipeline.prepare_model_input(_jpeg((1600, 800)))
+    thumbnail = Image.open(io.BytesIO(base64.b64decode(img_b64)))
+    assert thumbnail.size == (image_pipeline.MODEL_IMAGE_SIZE, image_pipeline.MODEL_IMAGE_SIZE // 2)
+    assert set(timings) == {'decode', 'resize', 'encode', 'hash', 'frame'}
+
+
+def test_preprocess_runs_in_the_process_pool(monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=1)
+    monkeypatch.setattr(app, '_preprocess_pool', pool)
+    try:
+        assert app._preprocess(os.getpid) != os.getpid()
+    finally:
+        pool.shutdown()
+
+
+def test_broken_pool_falls_back_inline_and_is_replaced(monkeypatch):
+    class BrokenPool:
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_exception(BrokenProcessPool())
+            return future
+
+    monkeypatch.setattr(app, '_preprocess_pool', BrokenPool())
+    assert app._preprocess(os.getpid) == os.getpid()
+    assert app._preprocess_pool is None
+
+
+PHOTO = os.path.join(os.path.dirname(os.path.abspath(app.__file__)), 'tuffants.jpeg')
+
+
+def _frame(image):
+    return image_pipeline.frame_stats(image)
+
+
+def _speckle(low, high):
+    """Sharp, contrasty noise confined to one end of the brightness range."""
+    pixels = np.random.default_rng(0).choice(np.array([low, high], dtype=np.uint8), (252, 336))
+    return Image.fromarray(pixels)
+
+
+@pytest.mark.parametrize('image, reason', [
+    (Image.new('RGB', (336, 252), (128, 128, 128)), 'blank'),
+    (_speckle(0, 25), 'dark'),
+    (_speckle(236, 255), 'overexposed'),
+    (Image.fromarray(np.tile(np.linspace(40, 200, 336, dtype=np.uint8), (252, 1))), 'blurred'),
+])
+def test_unusable_frames_are_rejected(image, reason):
+    assert app._FramePrefilter().check(_frame(image)) == reason
+
+
+def test_real_photo_passes_the_prefilter():
+    with open(PHOTO, 'rb') as f:
+        _, _, frame, _ = image_pipeline.prepare_model_input(f.read())
+    assert app._FramePrefilter().check(frame) is None
+
+
+def test_rejected_frame_is_answered_without_the_model(monkeypatch):
+    monkeypatch.setattr(app, '_classification_cache', app._ClassificationCache(8, 3600, app.PHASH_MAX_DISTANCE))
+    monkeypatch.setattr(app, '_prefilter', app._FramePrefilter())
+    monkeypatch.setattr(app, '_prepare_model_input',
+                        lambda data: image_pipeline.prepare_model_input(data)[:3])
+    monkeypatch.setattr(app, '_classify_image', lambda *args: pytest.fail('model was called'))
+    result = app.predict_image(app._UploadImage(_jpeg((640, 480), (0, 0, 0))))
+    assert result == (None, app.PREFILTER_CONFIDENCE, False, None, None, 'none', True)
+    assert app._prefilter.stats() == {'checked': 1, 'rejected': {'blank': 1}}
@@ -0,0 +1,84 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+
+import app
+
+
+@pytest.fixture
+def variants(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, '_preprocess', lambda fn, *args: fn(*args))
+    (tmp_path / 'images' / 'pests').mkdir(parents=True)
+    _write(tmp_path / 'images' / 'pests' / 'ants.png', 500)
+    return app._ImageVariants(str(tmp_path / 'images'), str(tmp_path / 'variants'), (320, 640, 960), 70)
+
+
+def _write(path, width, color=(120, 60, 30)):
+    buf = io.BytesIO()
+    Image.new('RGB', (width, width // 2), color).save(buf, 'PNG')
+    path.write_bytes(buf.getvalue())
+
+
+def test_variants_are_content_hashed_and_never_upscaled(variants):
+    built = []
+    variants.listeners.append(built.append)
+    variants.build('pests/ants.png')
+    names = variants.variants('pests/ants.png')
+    assert sorted(names) == [320, 500]
+    assert all(name.startswith('pests-ants.') and name.endswith(f'.{w}.webp') for w, name in names.items())
+    assert Image.open(os.path.join(variants.variants_dir, names[320])).size == (320, 160)
+    assert built == ['pests/ants.png']
+
+
+def test_unchanged_images_reuse_their_variants(variants):
+    variants.build('pests/ants.png')
+    again = app._ImageVariants(variants.source_dir, variants.variants_dir, variants.widths, variants.quality)
+    again.build('pests/ants.png')
+    assert again.stats() == {'images': 1, 'encoded': 0, 'reused': 1, 'failed': 0}
+    assert again.variants('pests/ants.png') == variants.variants('pests/ants.png')
+
+
+def test_changed_image_gets_new_names(variants, tmp_path):
+    variants.build('pests/ants.png')
+    before = variants.variants('pests/ants.png')
+    _write(tmp_path / 'images' / 'pests' / 'ants.png', 500, (10, 200, 10))
+    variants.build('pests/ants.png')
+    assert set(variants.variants('pests/ants.png').values()).isdisjoint(before.values())
+
+
+def test_forget_deletes_the_files(variants):
+    variants.build('pests/ants.png')
+    names = variants.variants('pests/ants.png').values()
+    variants.forget('pests/ants.png')
+    assert not any(os.path.exists(os.path.join(variants.variants_dir, n)) for n in names)
+    assert variants.variants('pests/ants.png') == {}
+
+
+def test_unreadable_image_is_counted_as_failed(variants):
+    variants.build('pests/missing.png')
+    assert variants.stats()['failed'] == 1
+
+
+def test_image_src_picks_the_smallest_wide_enough_variant(variants, monkeypatch):
+    monkeypatch.setattr(app, '_image_variants', variants)
+    with app.app.test_request_context():
+        assert app.image_src('pests/ants.png') == '/assets/images/pests/ants.png'
+        variants.build('pests/ants.png')
+        names = variants.variants('pests/ants.png')
+        assert app.image_src('pests/ants.png', 300) == f'/assets/v/{names[320]}'
+        assert app.image_src('pests/ants.png', 640) == f'/assets/v/{names[500]}'
+        assert app.image_srcset('pests/ants.png') == (
+            f'/assets/v/{names[320]} 320w, /assets/v/{names[500]} 500w')
+
+
+def test_variants_are_served_as_immutable(client, variants, monkeypatch):
+    monkeypatch.setattr(app, 'VARIANTS_DIR', variants.variants_dir)
+    variants.build('pests/ants.png')
+    name = variants.variants('pests/ants.png')[320]
+    response = client.get(f'/assets/v/{name}')
+    assert response.status_code == 200 and response.mimetype == 'image/webp'
+    cache = response.cache_control
+    assert cache.public and cache.immutable and cache.max_age == app.VARIANT_MAX_AGE
+    response.close()
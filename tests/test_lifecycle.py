@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+import threading
+
+import app
+
+
+def test_ready_without_resident_model(monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'state', 'ready')
+    for backend in app._ollama_pool.backends:
+        monkeypatch.setattr(backend, 'healthy', True)
+        monkeypatch.setattr(backend, 'resident', [])
+    assert app._lifecycle.ready()
+
+
+def test_not_ready_without_healthy_backend(monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'state', 'ready')
+    for backend in app._ollama_pool.backends:
+        monkeypatch.setattr(backend, 'healthy', False)
+    assert not app._lifecycle.ready()
+
+
+def test_not_ready_before_warmup(monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'state', 'warming')
+    for backend in app._ollama_pool.backends:
+        monkeypatch.setattr(backend, 'healthy', True)
+    assert not app._lifecycle.ready()
+
+
+def test_import_opens_no_database_and_starts_no_threads(tmp_path):
+    code = ('import os, threading, app; '
+            'print(os.path.exists(app.PROFILE_DB_PATH), len(threading.enumerate()))')
+    existed = os.path.exists(app.PROFILE_DB_PATH)
+    out = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, capture_output=True, text=True,
+                         env={**os.environ, 'PYTHONPATH': os.path.dirname(os.path.abspath(app.__file__))})
+    assert out.stdout.split() == [str(existed), '1']
+
+
+def test_healthz_answers_while_ollama_is_down(client, monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'state', 'starting')
+    for backend in app._ollama_pool.backends:
+        monkeypatch.setattr(backend, 'healthy', False)
+    response = client.get('/healthz')
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['status'] == 'ok' and body['state'] == 'starting'
+    assert [b['healthy'] for b in body['ollama']] == [False] * len(app._ollama_pool.backends)
+
+
+def test_readyz_is_503_until_ready(client, monkeypatch):
+    monkeypatch.setattr(app._lifecycle, 'state', 'warming')
+    for backend in app._ollama_pool.backends:
+        monkeypatch.setattr(backend, 'healthy', True)
+        monkeypatch.setattr(backend, 'resident', [app.OLLAMA_MODEL])
+    response = client.get('/readyz')
+    assert response.status_code == 503 and response.get_json()['ready'] is False
+
+    monkeypatch.setattr(app._lifecycle, 'state', 'ready')
+    response = client.get('/readyz')
+    body = response.get_json()
+    assert response.status_code == 200 and body['ready'] is True
+    assert body['model'] == app.OLLAMA_MODEL
+    assert body['ollama'][0]['resident'] == [app.OLLAMA_MODEL]
+
+
+def test_start_runs_once(monkeypatch, profiles):
+    lifecycle = app._Lifecycle()
+    runs = []
+    monkeypatch.setattr(lifecycle, '_run', lambda: runs.append(1))
+    monkeypatch.setattr(app._dynamic_images, 'sync', lambda images: None)
+    assert lifecycle.start() and not lifecycle.start()
+    assert lifecycle.state == 'starting'
+    for thread in threading.enumerate():
+        if thread.name == 'startup':
+            thread.join(5)
+    assert runs == [1]
@@ -0,0 +1,159 @@
+import ollama
+
+import app
+
+
+def _pool():
+    return app._OllamaPool(['http://gpu1:11434', 'http://gpu2:11434'], app._residency)
+
+
+def _classify(img):
+    return {'model': app.OLLAMA_MODEL,
+            'messages': [{'role': 'user', 'content': 'classify', 'images': [img]}]}
+
+
+def _follow_up(img):
+    kwargs = _classify(img)
+    kwargs['messages'] += [{'role': 'assistant', 'content': '{}'},
+                           {'role': 'user', 'content': 'profile'}]
+    return kwargs
+
+
+def test_follow_up_turn_returns_to_the_classifying_backend():
+    pool = _pool()
+    first = pool._acquire(session=pool._session(_classify('img-a')))
+    # The classifying backend is now the busier one; the follow-up still goes there
+    again = pool._acquire(session=pool._session(_follow_up('img-a')))
+    assert again is first
+
+
+def test_other_images_and_text_calls_use_least_loaded():
+    pool = _pool()
+    first = pool._acquire(session=pool._session(_classify('img-a')))
+    other = pool._acquire(session=pool._session(_classify('img-b')))
+    assert other is not first
+    assert pool._session({'model': 'm', 'messages': [{'role': 'user', 'content': 'hi'}]}) is None
+
+
+def test_models_do_not_share_affinity():
+    fast = {**_classify('img-a'), 'model': 'fast'}
+    assert _pool()._session(fast) != _pool()._session(_classify('img-a'))
+
+
+def test_unhealthy_pinned_backend_is_not_used():
+    pool = _pool()
+    session = pool._session(_classify('img-a'))
+    first = pool._acquire(session=session)
+    first.healthy = False
+    assert pool._acquire(session=session) is not first
+
+
+def test_unstarted_stream_holds_no_backend_slot():
+    pool = _pool()
+    stream = pool.chat(stream=True, **_classify('img-a'))
+    assert all(b.outstanding == 0 for b in pool.backends)
+    stream.close()
+    assert all(b.outstanding == 0 for b in pool.backends)
+
+
+class _FakeClient:
+    def __init__(self, pool):
+        self.pool = pool
+        self.outstanding_seen = []
+
+    def chat(self, **kwargs):
+        self.outstanding_seen.append(sum(b.outstanding for b in self.pool.backends))
+        if kwargs.get('stream'):
+            return iter([{'message': {'content': 'hi'}}, {'done': True}])
+        return {'message': {'content': 'hi'}}
+
+
+def test_stream_holds_its_slot_while_iterated_and_releases_it():
+    pool = _pool()
+    client = _FakeClient(pool)
+    for backend in pool.backends:
+        backend._client = client
+    parts = list(pool.chat(stream=True, **_classify('img-a')))
+    assert len(parts) == 2 and client.outstanding_seen == [1]
+    assert all(b.outstanding == 0 for b in pool.backends)
+
+
+class _FailingClient:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def chat(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+class _HealthClient:
+    def __init__(self, models=(), error=None):
+        self.models = list(models)
+        self.error = error
+
+    def ps(self):
+        if self.error:
+            raise self.error
+        return {'models': [{'model': m} for m in self.models]}
+
+
+def test_refused_connection_ejects_and_retries_on_another_backend():
+    pool = _pool()
+    down, up = pool.backends
+    down._client = _FailingClient(ConnectionError('refused'))
+    up._client = _FakeClient(pool)
+    for _ in range(2):
+        assert pool.chat(**_classify('img-a')) == {'message': {'content': 'hi'}}
+    assert not down.healthy and down.failures == 1
+    assert up.healthy and up.requests == 2
+
+
+def test_server_errors_eject_only_after_repeated_failures():
+    pool = _pool()
+    backend = pool.backends[0]
+    for _ in range(app.OLLAMA_EJECT_AFTER):
+        assert backend.healthy
+        pool._acquire()
+        pool._release(backend, ollama.ResponseError('boom', 500))
+    assert not backend.healthy
+    assert backend.consecutive_failures == app.OLLAMA_EJECT_AFTER
+
+
+def test_request_errors_do_not_eject():
+    pool = _pool()
+    backend = pool.backends[0]
+    for _ in range(app.OLLAMA_EJECT_AFTER + 1):
+        pool._acquire()
+        pool._release(backend, ollama.ResponseError('bad request', 400))
+    assert backend.healthy and backend.failures == 0
+
+
+def test_ejected_backend_is_readmitted_after_passing_checks():
+    pool = _pool()
+    backend = pool.backends[0]
+    backend.healthy = False
+    backend.consecutive_failures = 5
+    backend._health_client = _HealthClient([app.OLLAMA_MODEL])
+    assert pool.check(backend, readmit_after=2)
+    assert not backend.healthy
+    assert pool.check(backend, readmit_after=2)
+    assert backend.healthy and backend.consecutive_failures == 0
+    assert backend.resident == [app.OLLAMA_MODEL]
+
+
+def test_failed_health_check_ejects_and_resets_passes():
+    pool = _pool()
+    backend = pool.backends[0]
+    backend.consecutive_passes = 1
+    backend._health_client = _HealthClient(error=ConnectionError('refused'))
+    assert not pool.check(backend)
+    assert not backend.healthy and backend.consecutive_passes == 0
+
+
+def test_calls_still_go_out_when_every_backend_is_ejected():
+    pool = _pool()
+    for backend in pool.backends:
+        backend.healthy = False
+    assert pool._acquire() in pool.backends
@@ -0,0 +1,39 @@
+import threading
+import time
+
+import app
+
+
+def test_unknown_pest_is_not_found(client, profiles):
+    assert client.get('/pest_status/ghost').get_json() == {'status': 'not_found'}
+
+
+def test_plain_poll_of_pending_job_asks_to_retry(client, profiles):
+    profiles.mark_pending('aphid', {})
+    assert client.get('/pest_status/aphid').get_json() == {
+        'status': 'pending', 'retry_after': app.STATUS_RETRY_AFTER}
+
+
+def test_long_poll_returns_once_the_job_completes(client, profiles):
+    profiles.mark_pending('aphid', {})
+    timer = threading.Timer(0.1, profiles.mark_complete, ('aphid', {'name': 'Aphid'}))
+    timer.start()
+    started = time.monotonic()
+    body = client.get('/pest_status/aphid?wait=5').get_json()
+    timer.join()
+    assert body == {'status': 'complete'}
+    assert time.monotonic() - started < 4
+
+
+def test_long_poll_that_times_out_reports_pending_without_retry_hint(client, profiles):
+    profiles.mark_pending('aphid', {})
+    assert client.get('/pest_status/aphid?wait=0.05').get_json() == {'status': 'pending'}
+
+
+def test_long_poll_over_the_waiter_cap_falls_back_to_polling(client, profiles, monkeypatch):
+    monkeypatch.setattr(profiles, 'max_waiters', 0)
+    profiles.mark_pending('aphid', {})
+    started = time.monotonic()
+    body = client.get('/pest_status/aphid?wait=5').get_json()
+    assert body == {'status': 'pending', 'retry_after': app.STATUS_RETRY_AFTER}
+    assert time.monotonic() - started < 1
@@ -0,0 +1,64 @@
+import json
+
+import app
+
+
+class _Image:
+    """Stands in for _UploadImage: only conversation and model_input() are used."""
+
+    def __init__(self, conversation):
+        self.conversation = conversation
+
+    def model_input(self):
+        return 'thumb', 0
+
+
+FIELDS = {'match': True, 'pest': 'Ants', 'confidence': 0.9, 'threat': 'medium',
+          'scientific_name': 'Formicidae', 'creature': 'Ant'}
+
+
+def test_assistant_turn_is_the_parsed_fields():
+    conversation = app._classification_conversation('thumb', {'match': True, 'pest': 'Ants'})
+    assert json.loads(conversation[-1]['content']) == {'match': True, 'pest': 'Ants'}
+
+
+def test_profile_follows_the_classification_when_it_fits():
+    image = _Image(app._classification_conversation('thumb', FIELDS))
+    prompt = app._profile_prompt('Ants', 'Formicidae', True)
+    messages = app._image_profile_messages(image, prompt)
+    assert messages[:2] == image.conversation
+    assert messages[-1] == {'role': 'user', 'content': prompt}
+
+
+def test_profile_falls_back_to_standalone_prompt_when_too_long(monkeypatch):
+    monkeypatch.setitem(app.MODEL_OPTIONS, 'num_ctx', 1024)
+    image = _Image(app._classification_conversation('thumb', FIELDS))
+    prompt = app._profile_prompt('Ants', 'Formicidae', True)
+    assert app._image_profile_messages(image, prompt) == [
+        {'role': 'user', 'content': prompt, 'images': ['thumb']}]
+
+
+def test_profile_without_a_classification_starts_fresh():
+    prompt = app._profile_prompt('Ants', 'Formicidae', True)
+    assert app._image_profile_messages(_Image(None), prompt) == [
+        {'role': 'user', 'content': prompt, 'images': ['thumb']}]
+
+
+def _classify_with(monkeypatch, fields):
+    cache = app._ClassificationCache(8, 3600, app.PHASH_MAX_DISTANCE)
+    monkeypatch.setattr(app, '_classification_cache', cache)
+    monkeypatch.setattr(app, '_lookup_classification', lambda image: (None, 'digest', 0, 'thumb'))
+    monkeypatch.setattr(app, '_classify_image', lambda img_b64, priority: (('Ants',), fields))
+    image = _Image(None)
+    assert app.predict_image(image) == ('Ants',)
+    return image
+
+
+def test_full_model_answer_is_kept_for_follow_up_turns(monkeypatch):
+    image = _classify_with(monkeypatch, FIELDS)
+    assert image.conversation == app._classification_conversation('thumb', FIELDS)
+
+
+def test_fast_tier_answer_leaves_no_conversation(monkeypatch):
+    # The fast tier ran a different model, whose KV cache the profile call can't reuse
+    assert _classify_with(monkeypatch, None).conversation is None
@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def store(tmp_path):
+    return app._ProfileStore(str(tmp_path / 'profiles.db'), 16, 4)
+
+
+def test_profiles_survive_a_new_store_on_the_same_file(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    app._ProfileStore(path, 16, 4).mark_complete('aphid', {'name': 'Aphid'})
+    assert app._ProfileStore(path, 16, 4).profile('aphid') == {'name': 'Aphid'}
+
+
+def test_recover_leaves_jobs_of_live_processes_alone(store):
+    store.mark_pending('ours', {})
+    sibling = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        host = app._PROCESS_OWNER.rsplit(':', 2)[0]
+        store.mark_pending('sibling', {})
+        store.mark_pending('dead', {})
+        store.mark_pending('legacy', {})
+        with store._lock:
+            store._db.execute('UPDATE profiles SET owner = ? WHERE pest_key = ?', (f'{host}:{sibling.pid}:1', 'sibling'))
+            store._db.execute('UPDATE profiles SET owner = ? WHERE pest_key = ?', (f'{host}:{os.getpid()}:1', 'dead'))
+            store._db.execute('UPDATE profiles SET owner = NULL WHERE pest_key = ?', ('legacy',))
+            store._db.commit()
+        store._cache.clear()
+        store.recover()
+        assert {k: store.status(k) for k in ('ours', 'sibling', 'dead', 'legacy')} == {
+            'ours': 'pending', 'sibling': 'pending', 'dead': 'error', 'legacy': 'error'}
+    finally:
+        sibling.kill()
+        sibling.wait()
+    store.recover()
+    assert store.status('sibling') == 'error'
+
+
+def test_images_reports_pending_complete_and_failed_rows(store):
+    store.mark_pending('ants', {'image': 'dynamic_pests/a.jpg'})
+    store.mark_complete('bees', {'image': 'dynamic_pests/b.jpg'})
+    store.mark_error('wasps')
+    assert store.images() == {'ants': 'dynamic_pests/a.jpg', 'bees': 'dynamic_pests/b.jpg', 'wasps': None}
+
+
+def test_old_database_gains_the_owner_column(tmp_path):
+    path = str(tmp_path / 'old.db')
+    db = sqlite3.connect(path)
+    db.execute('CREATE TABLE profiles (pest_key TEXT PRIMARY KEY, status TEXT NOT NULL, '
+               "metadata TEXT NOT NULL DEFAULT '{}', profile TEXT, updated_at REAL NOT NULL)")
+    db.execute("INSERT INTO profiles VALUES ('ants', 'pending', '{}', NULL, 0)")
+    db.commit()
+    db.close()
+    store = app._ProfileStore(path, 16, 4)
+    store.recover()
+    assert store.status('ants') == 'error'
+
+
+def test_rows_beyond_the_memory_cache_are_read_back(tmp_path):
+    store = app._ProfileStore(str(tmp_path / 'profiles.db'), 2, 4)
+    for i in range(5):
+        store.mark_complete(f'pest_{i}', {'name': f'Pest {i}'})
+    assert len(store._cache) == 2
+    assert store.profile('pest_0') == {'name': 'Pest 0'}
+    assert sorted(k for k, _ in store.completed()) == [f'pest_{i}' for i in range(5)]
+
+
+def test_profile_is_only_served_once_complete(store):
+    store.mark_pending('aphid', {'name': 'Aphid'})
+    assert store.status('aphid') == 'pending' and store.profile('aphid') is None
+    assert store.metadata('aphid') == {'name': 'Aphid'}
+    store.mark_error('aphid')
+    assert store.profile('aphid') is None
+    assert store.metadata('aphid') == {'name': 'Aphid'}   # kept for the error page
+
+
+def test_listeners_run_on_every_change(store):
+    seen = []
+    store.listeners.append(seen.append)
+    store.mark_pending('aphid', {})
+    store.mark_complete('aphid', {})
+    assert seen == ['aphid', 'aphid'] and store.version == 1
+
+
+def test_waiter_wakes_when_the_job_settles(store):
+    store.mark_pending('aphid', {})
+    threading.Timer(0.05, store.mark_complete, ('aphid', {'name': 'Aphid'})).start()
+    assert store.wait_until_settled('aphid', 5) == ('complete', True)
+
+
+def test_waiters_beyond_the_cap_fall_back_to_polling(tmp_path):
+    store = app._ProfileStore(str(tmp_path / 'profiles.db'), 16, 0)
+    store.mark_pending('aphid', {})
+    assert store.wait_until_settled('aphid', 5) == ('pending', False)
@@ -0,0 +1,66 @@
+import gzip
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def pages(profiles, monkeypatch):
+    pages = app._RenderCache(8)
+    monkeypatch.setattr(app, '_rendered_pages', pages)
+    profiles.listeners.append(pages.invalidate)
+    return pages
+
+
+def _profile(description):
+    return {'name': 'Aphid', 'scientific_name': 'Aphidoidea', 'image': None,
+            'description': description, 'symptoms': [], 'organic_treatment': [],
+            'chemical_treatment': [], 'prevention': [], 'common_species': [],
+            'threat_level': 'high', 'category': 'Soft-bodied Pest'}
+
+
+def test_matching_etag_gets_304(client, pages):
+    first = client.get('/pests')
+    assert first.status_code == 200 and first.headers['ETag']
+    again = client.get('/pests', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+    assert pages.stats()['hits'] == 1
+
+
+def test_gzip_variant_has_its_own_etag(client, pages):
+    plain = client.get('/pests')
+    zipped = client.get('/pests', headers={'Accept-Encoding': 'gzip'})
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(zipped.data) == plain.data
+    assert zipped.headers['ETag'] != plain.headers['ETag']
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+
+
+def test_profile_change_invalidates_the_page(client, profiles, pages):
+    profiles.mark_complete('aphid', _profile('Sap-sucking insects.'))
+    first = client.get('/pest/aphid')
+    assert b'Sap-sucking insects.' in first.data
+    profiles.mark_complete('aphid', _profile('Tiny green bugs.'))
+    second = client.get('/pest/aphid', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200 and b'Tiny green bugs.' in second.data
+
+
+def test_render_overlapping_an_invalidation_is_not_cached():
+    pages = app._RenderCache(8)
+
+    def render():
+        pages.invalidate('aphid')
+        return 'stale'
+
+    assert pages.get('aphid', render).body == b'stale'
+    assert pages.get('aphid', lambda: 'fresh').body == b'fresh'
+
+
+def test_least_recently_used_page_is_evicted():
+    pages = app._RenderCache(2)
+    for key in ('a', 'b', 'a', 'c'):
+        pages.get(key, lambda: key)
+    assert pages.stats()['size'] == 2
+    pages.get('b', lambda: 'b')
+    assert pages.stats()['misses'] == 4
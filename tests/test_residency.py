@@ -0,0 +1,103 @@
+import app
+
+
+def _residency():
+    return app._ModelResidency(app.MODEL_OPTIONS, app.RESIDENCY_WINDOW)
+
+
+def test_first_call_after_warmup_keeps_default():
+    residency = _residency()
+    residency.prepare({'model': 'm', 'messages': []}, record=False,
+                      keep_alive=app.KEEP_ALIVE_DEFAULT)
+    kwargs = residency.prepare({'model': 'm', 'messages': []})
+    assert kwargs['keep_alive'] == app.KEEP_ALIVE_DEFAULT
+
+
+def test_quiet_traffic_never_shortens_keep_alive():
+    residency = _residency()
+    for _ in range(3):
+        kwargs = residency.prepare({'model': 'm', 'messages': []})
+        assert kwargs['keep_alive'] == app.KEEP_ALIVE_DEFAULT
+
+
+def test_busy_traffic_pins_from_prior_calls():
+    residency = _residency()
+    seen = [residency.prepare({'model': 'm', 'messages': []})['keep_alive']
+            for _ in range(app.RESIDENCY_BUSY_CALLS + 1)]
+    assert seen[app.RESIDENCY_BUSY_CALLS - 1] == app.KEEP_ALIVE_DEFAULT
+    assert seen[app.RESIDENCY_BUSY_CALLS] == app.KEEP_ALIVE_PINNED
+
+
+def test_options_profile_wins_over_call_options():
+    kwargs = _residency().prepare({'model': 'm', 'options': {'num_ctx': 8192, 'num_predict': 5}})
+    assert kwargs['options'] == {'num_ctx': 2048, 'num_predict': 5}
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+
+
+class _Backend:
+    def __init__(self, host, resident=()):
+        self.host = host
+        self.resident = list(resident)
+        self.client = _Client()
+
+
+class _Pool:
+    def __init__(self, *backends):
+        self.backends = list(backends)
+
+
+def _pin(residency, model='m'):
+    residency.prepare({'model': model, 'messages': []}, keep_alive=app.KEEP_ALIVE_PINNED)
+
+
+def test_pinned_model_is_released_once_traffic_stops(monkeypatch):
+    residency = _residency()
+    pool = _Pool(_Backend('http://gpu1'), _Backend('http://gpu2'))
+    _pin(residency)
+    residency.maintain(pool)
+    assert all(not b.client.calls for b in pool.backends)
+
+    monkeypatch.setattr(app, 'RESIDENCY_RELEASE_AFTER', 0)
+    residency.maintain(pool)
+    for backend in pool.backends:
+        (call,) = backend.client.calls
+        assert call['model'] == 'm' and call['keep_alive'] == app.KEEP_ALIVE_IDLE
+    assert residency.stats()['pinned'] == []
+    residency.maintain(pool)
+    assert all(len(b.client.calls) == 1 for b in pool.backends)
+
+
+def test_default_keep_alive_models_are_not_released(monkeypatch):
+    monkeypatch.setattr(app, 'RESIDENCY_RELEASE_AFTER', 0)
+    residency = _residency()
+    residency.prepare({'model': 'm', 'messages': []})
+    pool = _Pool(_Backend('http://gpu1'))
+    residency.maintain(pool)
+    assert pool.backends[0].client.calls == []
+
+
+def test_loads_and_reloads_are_told_apart():
+    residency = _residency()
+    backend = _Backend('http://gpu1', resident=['warm'])
+    seconds = app.RESIDENCY_LOAD_SECONDS + 1
+    residency.observe(backend, 'cold', {'load_duration': seconds * 1e9})
+    residency.observe(backend, 'warm', {'load_duration': seconds * 1e9})
+    residency.observe(backend, 'warm', {'load_duration': 1e6})   # already loaded: no event
+    stats = residency.stats()
+    assert stats['events'] == {'load': 1, 'reload': 1, 'unload': 0}
+    assert [e['kind'] for e in stats['recent_events']] == ['load', 'reload']
+    assert stats['load_seconds'] == round(2 * seconds, 1)
+
+
+def test_health_check_records_unloads():
+    residency = _residency()
+    residency.observe_resident(_Backend('http://gpu1'), ['a', 'b'], ['b', 'c'])
+    (event,) = residency.stats()['recent_events']
+    assert (event['kind'], event['model']) == ('unload', 'a')
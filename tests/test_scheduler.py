@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def scheduler():
+    return app._InferenceScheduler(1, 8)
+
+
+def _block(scheduler):
+    """Occupy the only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+    scheduler.submit(app.PRIORITY_INTERACTIVE, lambda: (started.set(), release.wait(5)))
+    assert started.wait(5)
+    return release
+
+
+def test_higher_priority_runs_first(scheduler):
+    release = _block(scheduler)
+    order = []
+    futures = [scheduler.submit(p, order.append, p) for p in
+               (app.PRIORITY_BACKGROUND, app.PRIORITY_TEXT, app.PRIORITY_INTERACTIVE)]
+    release.set()
+    for future in futures:
+        future.result(5)
+    assert order == [app.PRIORITY_INTERACTIVE, app.PRIORITY_TEXT, app.PRIORITY_BACKGROUND]
+
+
+def test_background_is_shed_before_interactive(scheduler):
+    release = _block(scheduler)
+    try:
+        for _ in range(4):   # half of max_queue: the background share
+            scheduler.submit(app.PRIORITY_BACKGROUND, lambda: None)
+        with pytest.raises(app.SchedulerBusy):
+            scheduler.submit(app.PRIORITY_BACKGROUND, lambda: None)
+        scheduler.submit(app.PRIORITY_INTERACTIVE, lambda: None)
+        assert scheduler.stats()['shed'] == 1
+    finally:
+        release.set()
+
+
+def test_full_queue_sheds_interactive_too(scheduler):
+    release = _block(scheduler)
+    try:
+        for _ in range(scheduler.max_queue):
+            scheduler.submit(app.PRIORITY_INTERACTIVE, lambda: None)
+        with pytest.raises(app.SchedulerBusy):
+            scheduler.submit(app.PRIORITY_INTERACTIVE, lambda: None)
+    finally:
+        release.set()
+
+
+def test_nested_call_on_a_worker_runs_inline(scheduler):
+    def outer():
+        return scheduler.run(app.PRIORITY_BACKGROUND, lambda: 'inner')
+    assert scheduler.run(app.PRIORITY_INTERACTIVE, outer) == 'inner'
+
+
+def test_task_errors_reach_the_caller(scheduler):
+    with pytest.raises(ZeroDivisionError):
+        scheduler.run(app.PRIORITY_INTERACTIVE, lambda: 1 / 0)
+    assert scheduler.stats()['completed'] == 1
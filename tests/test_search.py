@@ -0,0 +1,79 @@
+import pytest
+
+import app
+
+REPLY = """IS_PEST: YES
+PEST_NAME: Aphid
+THREAT_LEVEL: high
+CATEGORY: soft-bodied
+SCIENTIFIC_NAME: Aphidoidea
+DESCRIPTION: Small sap-sucking insects.
+CONCERNS: curled leaves ||| sticky honeydew
+MANAGEMENT: neem oil ||| insecticidal soap
+PREVENTION: encourage ladybugs ||| inspect new plants
+"""
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = app._ProfileStore(str(tmp_path / 'profiles.db'), 16, 4)
+    monkeypatch.setattr(app, '_profiles', store)
+    return store
+
+
+def test_search_reply_is_stored_as_a_profile(store):
+    result = app._complete_search('aphid', REPLY)
+    assert result['is_pest'] and result['pest_data']['description'] == 'Small sap-sucking insects.'
+    assert store.profile('aphid')['scientific_name'] == 'Aphidoidea'
+
+
+def test_search_does_not_replace_an_image_backed_profile(store):
+    store.mark_complete('aphid', {'name': 'Aphid', 'image': 'dynamic_pests/abc.jpg'})
+    result = app._complete_search('aphid', REPLY)
+    assert store.profile('aphid')['image'] == 'dynamic_pests/abc.jpg'
+    assert result['pest_data']['image'] == 'dynamic_pests/abc.jpg'
+
+
+def test_search_does_not_race_a_pending_upload_job(store):
+    store.mark_pending('aphid', {'name': 'Aphid'})
+    assert app._complete_search('aphid', REPLY)['is_pest']
+    assert store.status('aphid') == 'pending'
+
+
+def test_search_replaces_a_failed_job(store):
+    store.mark_error('aphid')
+    app._complete_search('aphid', REPLY)
+    assert store.status('aphid') == 'complete'
+
+
+def test_search_answered_no():
+    assert app._complete_search('rock', 'IS_PEST: NO') == {'is_pest': False}
+
+
+def _fake_model(monkeypatch, reply):
+    """Stand in for the model; returns the list of lines each call handed out."""
+    calls = []
+
+    def fake_stream(messages, **kwargs):
+        consumed = []
+        calls.append(consumed)
+        for line in reply.splitlines(keepends=True):
+            consumed.append(line)
+            yield line
+
+    monkeypatch.setattr(app, '_ollama_chat_stream', fake_stream)
+    return calls
+
+
+def test_search_route_makes_one_model_call(client, store, monkeypatch):
+    calls = _fake_model(monkeypatch, REPLY)
+    body = client.post('/search_pest', json={'query': 'aphid'}).get_json()
+    assert len(calls) == 1
+    assert body['is_pest'] and body['pest_data']['name'] == 'Aphid'
+    assert store.status('aphid') == 'complete'
+
+
+def test_search_stops_generating_once_answered_no(client, store, monkeypatch):
+    calls = _fake_model(monkeypatch, 'IS_PEST: NO\nPEST_NAME: Rock\nDESCRIPTION: not a creature\n')
+    assert client.post('/search_pest', json={'query': 'rock'}).get_json() == {'is_pest': False}
+    assert calls == [['IS_PEST: NO\n']]
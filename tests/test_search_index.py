@@ -0,0 +1,46 @@
+import app
+
+
+def _aphid():
+    return {'name': 'Aphids', 'scientific_name': 'Aphidoidea',
+            'description': 'Small sap-sucking insects that cluster on new shoots.',
+            'symptoms': ['Curled leaves', 'Sticky honeydew'], 'common_species': []}
+
+
+def test_name_query_ranks_the_named_profile_first(profiles):
+    index = app._ProfileSearchIndex(app.pest_info, profiles)
+    (kind, key, name, score), *_ = index.search('bees')
+    assert (kind, key, name) == ('curated', 'Bees', 'Bees')
+    assert 0 < score <= 1
+
+
+def test_short_query_only_matches_names():
+    # Ants' description mentions aphids, but a name query must not surface it
+    assert app._ProfileSearchIndex(app.pest_info, app._ProfileStore(':memory:', 4, 4)).search('aphid') == []
+
+
+def test_longer_query_ranks_by_description():
+    index = app._ProfileSearchIndex(app.pest_info, app._ProfileStore(':memory:', 4, 4))
+    results = index.search('insects that chew holes in cabbage leaves at night')
+    assert results[0][1] == 'Caterpillars'
+    scores = [score for *_, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_index_picks_up_newly_completed_profiles(profiles):
+    index = app._ProfileSearchIndex(app.pest_info, profiles)
+    assert index.search('aphid') == []
+    profiles.mark_complete('aphids', _aphid())
+    kind, key, name, _ = index.search('aphid')[0]
+    assert (kind, key, name) == ('dynamic', 'aphids', 'Aphids')
+
+
+def test_search_local_answers_from_stored_profiles(profiles, monkeypatch):
+    monkeypatch.setattr(app, '_search_index', app._ProfileSearchIndex(app.pest_info, profiles))
+    profiles.mark_complete('aphids', _aphid())
+    with app.app.test_request_context():
+        assert app._search_local('Ants')['pest_data']['name'] == 'Ants'
+        assert app._search_local('aphids')['pest_data']['name'] == 'Aphids'
+        hit = app._search_local('aphid honeydew')
+        assert hit['is_known'] is False and hit['matches'][0]['info_url'] == '/pest/aphids'
+        assert app._search_local('zebra') is None
@@ -0,0 +1,79 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_calls_share_one_run():
+    flight = app._SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    def call():
+        return flight.do('key', slow)
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(call) for _ in range(4)]
+        _wait_for(lambda: flight.stats()['shared'] == 3)
+        release.set()
+        assert [f.result() for f in futures] == ['answer'] * 4
+    assert len(calls) == 1
+    assert flight.stats()['calls'] == 1 and flight.stats()['in_flight'] == 0
+
+
+def test_leader_error_reaches_every_caller():
+    flight = app._SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError('model down')
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, 'key', fail) for _ in range(3)]
+        _wait_for(lambda: flight.stats()['shared'] == 2)
+        release.set()
+        for future in futures:
+            with pytest.raises(RuntimeError):
+                future.result()
+
+
+def test_calls_after_completion_run_again():
+    flight = app._SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+
+
+def test_identical_ollama_chats_reach_the_model_once(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def chat(**kwargs):
+        calls.append(kwargs)
+        release.wait(5)
+        return {'message': {'content': 'hi'}}
+
+    monkeypatch.setattr(app._ollama_pool, 'chat', chat)
+    monkeypatch.setattr(app, '_ollama_flight', app._SingleFlight())
+    messages = [{'role': 'user', 'content': 'describe aphids'}]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(app._ollama_chat, messages) for _ in range(3)]
+        _wait_for(lambda: app._ollama_flight.stats()['shared'] == 2)
+        release.set()
+        assert all(f.result() == {'message': {'content': 'hi'}} for f in futures)
+    assert len(calls) == 1
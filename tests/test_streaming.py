@@ -0,0 +1,55 @@
+import io
+import json
+
+import app
+
+SEARCH_REPLY = ['IS_PEST: YES\nPEST_NAME: Aph', 'id\nTHREAT_LEVEL: high\n',
+                'DESCRIPTION: Small sap-sucking insects.\n']
+
+
+def _events(response):
+    events = []
+    for block in response.get_data(as_text=True).strip().split('\n\n'):
+        event, data = block.split('\n')
+        events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return events
+
+
+def test_sse_message_format():
+    assert app._sse('field', {'a': 1}) == 'event: field\ndata: {"a": 1}\n\n'
+
+
+def test_predict_stream_sends_fields_then_the_result(client, monkeypatch):
+    def predict_image_stream(image):
+        yield 'field', 'PEST', 'Ants'
+        yield 'field', 'CONFIDENCE', 0.9
+        yield 'result', ('Ants', 0.9, True, None, None, 'medium', True)
+
+    monkeypatch.setattr(app, 'predict_image_stream', predict_image_stream)
+    monkeypatch.setattr(app, '_prediction_response', lambda image, prediction: {'class_name': prediction[0]})
+    response = client.post('/predict_stream', data={'file': (io.BytesIO(b'jpeg'), 'a.jpg')})
+    assert response.mimetype == 'text/event-stream'
+    assert _events(response) == [
+        ('field', {'field': 'pest', 'value': 'Ants'}),
+        ('field', {'field': 'confidence', 'value': 0.9}),
+        ('result', {'class_name': 'Ants'}),
+    ]
+
+
+def test_predict_stream_reports_errors_as_events(client, monkeypatch):
+    def predict_image_stream(image):
+        raise app.SchedulerBusy('full')
+        yield
+
+    monkeypatch.setattr(app, 'predict_image_stream', predict_image_stream)
+    response = client.post('/predict_stream', data={'file': (io.BytesIO(b'jpeg'), 'a.jpg')})
+    assert _events(response) == [('error', {'error': 'Server is busy, please try again shortly'})]
+
+
+def test_search_stream_emits_each_line_as_it_completes(client, profiles, monkeypatch):
+    monkeypatch.setattr(app, '_search_local', lambda query: None)
+    monkeypatch.setattr(app, '_ollama_chat_stream', lambda messages, priority: (c for c in SEARCH_REPLY))
+    events = _events(client.post('/search_pest_stream', json={'query': 'aphid'}))
+    assert [e for e, _ in events] == ['field'] * 4 + ['result']
+    assert events[1][1] == {'field': 'pest_name', 'value': 'Aphid'}
+    assert events[-1][1]['pest_data']['description'] == 'Small sap-sucking insects.'
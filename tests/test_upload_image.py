@@ -0,0 +1,31 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app
+
+
+def test_thumbnail_is_prepared_once_for_every_use(monkeypatch):
+    prepared = []
+    gate = threading.Event()
+
+    def prepare(data):
+        prepared.append(data)
+        gate.wait(5)
+        return 'b64', 0b1010, {'mean': 100.0}
+
+    monkeypatch.setattr(app, '_prepare_model_input', prepare)
+    image = app._UploadImage(b'jpeg bytes')
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(image.model_input) for _ in range(3)]
+        futures.append(pool.submit(image.frame_stats))
+        gate.set()
+        results = [f.result() for f in futures]
+    assert results == [('b64', 0b1010)] * 3 + [{'mean': 100.0}]
+    assert prepared == [b'jpeg bytes']
+
+
+def test_digest_is_the_sha256_of_the_upload():
+    image = app._UploadImage(b'jpeg bytes')
+    assert image.digest == hashlib.sha256(b'jpeg bytes').hexdigest()
+    assert image.stored is None and image.conversation is None
@@ -0,0 +1,61 @@
+import app
+
+
+def test_entries_resolving_to_curated_pests_are_skipped(tmp_path):
+    path = tmp_path / 'watchlist.txt'
+    path.write_text('# comment\n'
+                    'Japanese Beetle | Popillia japonica | pest\n'
+                    'Aphid | Aphidoidea | pest\n'
+                    'Spider | Araneae | creature\n', encoding='utf-8')
+    assert app._load_watchlist(str(path)) == [
+        ('Aphid', 'Aphidoidea', True),
+        ('Spider', 'Araneae', False),
+    ]
+
+
+def test_shipped_watchlist_has_no_curated_names():
+    for name, _, _ in app._load_watchlist():
+        assert app._catalog.resolve_reply(name) is None
+
+
+ENTRIES = [('Aphid', 'Aphidoidea', True), ('Garden Spider', 'Araneus', False), ('Thrips', 'Thysanoptera', True)]
+
+
+def _prewarmer(profiles, monkeypatch, reply=lambda name: {'name': name}):
+    generated = []
+
+    def generate(name, scientific_name, is_traditional_pest, priority, interrupt):
+        generated.append((name, priority))
+        return reply(name)
+
+    monkeypatch.setattr(app, 'generate_pest_info_text', generate)
+    return app._Prewarmer(profiles, app._scheduler), generated
+
+
+def test_warm_all_generates_only_pending_entries(profiles, monkeypatch):
+    profiles.mark_complete('aphid', {'name': 'Aphid'})
+    profiles.mark_pending('thrips', {})
+    profiles.mark_error('garden_spider')
+    prewarmer, generated = _prewarmer(profiles, monkeypatch)
+    assert list(prewarmer.warm_all(ENTRIES)) == [(ENTRIES[1], True)]
+    assert generated == [('Garden Spider', app.PRIORITY_PREWARM)]
+    assert profiles.profile('garden_spider') == {'name': 'Garden Spider'}
+    assert prewarmer.pending(ENTRIES) == []
+
+
+def test_prewarm_does_not_overwrite_a_job_started_meanwhile(profiles, monkeypatch):
+    def reply(name):
+        profiles.mark_pending('aphid', {'name': 'from an upload'})
+        return {'name': name}
+
+    prewarmer, _ = _prewarmer(profiles, monkeypatch, reply)
+    assert prewarmer.warm(ENTRIES[0])
+    assert profiles.status('aphid') == 'pending'
+    assert prewarmer.stats()['generated'] == 0
+
+
+def test_interrupted_prewarm_is_counted(profiles, monkeypatch):
+    prewarmer, _ = _prewarmer(profiles, monkeypatch, lambda name: None)
+    assert not prewarmer.warm(ENTRIES[0], interrupt=lambda: True)
+    assert prewarmer.stats() == {'generated': 0, 'interrupted': 1}
+    assert profiles.status('aphid') is None